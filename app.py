@@ -1,10 +1,13 @@
 import os
 from flask import Flask
-from extensions import db, migrate
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import Config
-from extensions import db, migrate, bcrypt, jwt, mail
+from extensions import db, bcrypt, jwt, mail
 from celery_config import init_celery
+from utils.db_engines import engine_options, REPLICA_BIND
+from utils import sql_profiler, metrics, compression
+from utils.json_provider import OrjsonProvider
 from routes.ai_routes import ai_bp
 from routes.auth_routes import auth_bp
 from routes.admin_routes import admin_bp
@@ -14,6 +17,7 @@ from routes.contact_routes import contact_bp
 
 def create_app(config_class=Config, config_override=None):
     app = Flask(__name__)
+    app.json = OrjsonProvider(app)
 
     CORS(app, resources={
         r"/*": {
@@ -27,15 +31,33 @@ def create_app(config_class=Config, config_override=None):
     app.config.from_object(config_class)
     if config_override:
         app.config.update(config_override)
+    if app.config['TRUSTED_PROXIES']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'])
+
+    # Pool sizing and timeouts for this kind of process, plus the optional read replica
+    profile, pgbouncer = app.config['DB_ENGINE_PROFILE'], app.config['DB_PGBOUNCER']
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS',
+                          engine_options(app.config.get('SQLALCHEMY_DATABASE_URI'), profile, pgbouncer))
+    replica_url = app.config.get('DATABASE_REPLICA_URL')
+    if replica_url:
+        app.config.setdefault('SQLALCHEMY_BINDS', {})[REPLICA_BIND] = {
+            "url": replica_url, **engine_options(replica_url, profile, pgbouncer)
+        }
 
     # Initialize extensions
     db.init_app(app)
-    migrate.init_app(app, db)
+    if os.environ.get("FLASK_RUN_FROM_CLI") == "true":
+        # Only `flask db ...` needs Alembic; servers and workers don't import it
+        from flask_migrate import Migrate
+        Migrate(app, db)
     bcrypt.init_app(app)
     jwt.init_app(app)
     mail.init_app(app)
 
     init_celery(app)
+    sql_profiler.init_app(app)
+    metrics.init_app(app)
+    compression.init_app(app) # Registered after metrics so it runs first: timings include compressing
 
     import tasks
 
@@ -48,7 +70,17 @@ def create_app(config_class=Config, config_override=None):
 
     return app
 
-app = create_app()
+_app = None
+
+def get_app():
+    """
+    This process's app, built on first call. wsgi.py and the Celery worker
+    both use it, so a process never builds the app twice.
+    """
+    global _app
+    if _app is None:
+        _app = create_app()
+    return _app
 
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    get_app().run(debug=True)
@@ -0,0 +1,101 @@
+# benchmarks/bench_analysis.py
+"""
+Throughput of the analysis pipeline (run_ai_analysis) offline: Gemini,
+Aerial View and Cloudinary are the fake or replayed providers from
+sevices/providers.py, with their latency and failure rates, so runs cost no
+quota and repeat exactly for a given --seed (fully so with --concurrency 1).
+
+    python -m benchmarks.bench_analysis --analyses 50 --concurrency 10
+    python -m benchmarks.bench_analysis --latency-scale 1          # production-like waits
+    python -m benchmarks.bench_analysis --mode replay              # responses recorded with EXTERNAL_PROVIDERS=record
+
+--concurrency plays the part of the Celery worker's concurrency. To time
+the real drain worker instead, queue analyses and run
+`EXTERNAL_PROVIDERS=fake python run_tasks.py`.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_endpoints import CENTRE, percentile
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--analyses', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=10, help="Analyses run at once (worker concurrency)")
+    parser.add_argument('--mode', choices=['fake', 'replay'], default='fake')
+    parser.add_argument('--latency-scale', type=float, default=0.1,
+                        help="Multiplier on the configured provider latencies (1 = production-like, 0 = none)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--database-url', help="Empty database to use (default: a temporary SQLite file)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='solarmatch-bench-'), 'bench.db')}"
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('REDIS_URL', 'redis://localhost:6379/0')
+
+    from app import create_app
+    from extensions import db
+    from models.user import User
+    from models.analysis import AnalysisRequest, AnalysisResult
+    from sevices import providers
+    import tasks
+
+    app = create_app(config_override={
+        "SQLALCHEMY_DATABASE_URI": database_url,
+        "EXTERNAL_PROVIDERS": args.mode,
+        "FAKE_PROVIDER_LATENCY_SCALE": args.latency_scale,
+        "FAKE_PROVIDER_SEED": args.seed,
+    })
+
+    with app.app_context():
+        db.create_all()
+        try:
+            customer = User(full_name="Bench Customer", email="analysis@bench.test", password_hash="x",
+                            user_name="BEN-analysis", role="customer")
+            db.session.add(customer)
+            db.session.flush()
+            pending = [AnalysisRequest(user_id=customer.id, address=f"Bench Plot {n}, Nairobi",
+                                       latitude=CENTRE[0] + n * 0.001, longitude=CENTRE[1] - n * 0.001,
+                                       energy_consumption=200 + n * 10, roof_type_manual="Iron Sheets",
+                                       roof_image_url=f"https://res.cloudinary.com/solarmatch-fake/image/upload/roof_analysis/bench{n}.jpg")
+                       for n in range(args.analyses)]
+            db.session.add_all(pending + [AnalysisResult(request=req, status='PENDING') for req in pending])
+            db.session.commit()
+            request_ids = [req.id for req in pending]
+            providers.reseed(args.seed)
+
+            def run(request_id):
+                start = time.perf_counter()
+                with app.app_context():
+                    tasks.run_ai_analysis.run(request_id)
+                    db.session.remove()
+                return time.perf_counter() - start
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                durations = sorted(pool.map(run, request_ids))
+            elapsed = time.perf_counter() - started
+
+            statuses = dict(db.session.query(AnalysisResult.status, db.func.count()).group_by(AnalysisResult.status).all())
+        finally:
+            db.session.remove()
+            db.drop_all()
+
+    print(f"{args.analyses} analyses in {elapsed:.1f}s at concurrency {args.concurrency} "
+          f"({args.mode}, latency x{args.latency_scale}): {args.analyses / elapsed:.2f} analyses/s")
+    print(f"per analysis: p50 {percentile(durations, 50):.2f}s, p95 {percentile(durations, 95):.2f}s, "
+          f"p99 {percentile(durations, 99):.2f}s")
+    print(f"completed {statuses.get('COMPLETED', 0)}, failed {statuses.get('FAILED', 0)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
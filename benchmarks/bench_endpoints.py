@@ -0,0 +1,363 @@
+# benchmarks/bench_endpoints.py
+"""
+Endpoint benchmarks: seeds a dataset, serves the app from a threaded
+server in this process and drives the hot endpoints from several client
+threads, reporting throughput and p50/p95/p99 latency per endpoint.
+
+Roof uploads go to the fake Cloudinary provider with no added latency
+(sevices/providers.py), the Celery analysis task is stubbed and mail is
+suppressed, so only our own code and the database are measured.
+
+    python -m benchmarks.bench_endpoints                  # run and print the results
+    python -m benchmarks.bench_endpoints --save-baseline  # store them in benchmarks/baseline.json
+    python -m benchmarks.bench_endpoints --compare        # compare with the baseline, exit 1 on a regression
+
+Defaults to a throwaway SQLite file; pass --database-url to run against an
+empty Postgres database (its tables are created and dropped again).
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest import mock
+
+import requests
+
+BASELINE_PATH = Path(__file__).with_name('baseline.json')
+PASSWORD = 'bench-password'
+SCENARIOS = [
+    'analysis_submit', 'analysis_latest', 'installers', 'installer_leads', 'installer_reports',
+    'admin_users', 'admin_stats', 'login_confirm',
+]
+# Nairobi, where seeded customers and installers are scattered
+CENTRE = (-1.2921, 36.8219)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--customers', type=int, default=2000)
+    parser.add_argument('--installers', type=int, default=200)
+    parser.add_argument('--analyses-per-customer', type=int, default=2)
+    parser.add_argument('--leads-per-customer', type=int, default=2)
+    parser.add_argument('--requests', type=int, default=200, help="Timed requests per endpoint")
+    parser.add_argument('--warmup', type=int, default=10, help="Untimed requests per endpoint first")
+    parser.add_argument('--concurrency', type=int, default=8, help="Client threads")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help="Comma-separated subset to run")
+    parser.add_argument('--database-url', help="Empty database to seed (default: a temporary SQLite file)")
+    parser.add_argument('--output', help="Also write the results as JSON here")
+    parser.add_argument('--baseline', default=str(BASELINE_PATH))
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true', help="Compare with the baseline; exit 1 on a regression")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed p95 slowdown / throughput drop as a fraction of the baseline")
+    args = parser.parse_args(argv)
+    args.scenarios = [s for s in args.scenarios.split(',') if s]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+    return args
+
+
+# --- Dataset ---
+
+def seed(db, bcrypt, args):
+    """Bulk-inserts the dataset. Every user's password is PASSWORD."""
+    from sqlalchemy import insert, select
+    from models.user import User
+    from models.analysis import AnalysisRequest, AnalysisResult
+    from models.quote_request import QuoteRequest
+    from sevices import stats_service, installer_stats_service, lead_scoring
+
+    rng = random.Random(42)
+    password_hash = bcrypt.generate_password_hash(PASSWORD).decode('utf-8') # Once: bcrypt is slow on purpose
+    now = datetime.now(timezone.utc)
+
+    def user(n, role, **extra):
+        return {"full_name": f"Bench {role.title()} {n}", "email": f"{role}{n}@bench.test", "password_hash": password_hash,
+                "user_name": f"BEN-{role}-{n}", "role": role, "contract_accepted": True,
+                "created_at": now - timedelta(minutes=n), **extra}
+
+    db.session.execute(insert(User), [user(0, 'admin')] + [
+        user(n, 'installer', installer_category=rng.choice(['Residential', 'Commercial']), county="Nairobi",
+             latitude=CENTRE[0] + rng.uniform(-0.3, 0.3), longitude=CENTRE[1] + rng.uniform(-0.3, 0.3),
+             service_radius_km=50)
+        for n in range(args.installers)
+    ] + [user(n, 'customer', county="Nairobi") for n in range(args.customers)])
+    rows = db.session.execute(select(User.id, User.user_name, User.role).where(User.email.like('%@bench.test'))).all()
+    ids = {role: [(uid, name) for uid, name, r in rows if r == role] for role in ('admin', 'installer', 'customer')}
+
+    requests_ = [{
+        "user_id": uid, "address": "Nairobi", "latitude": CENTRE[0] + rng.uniform(-0.2, 0.2),
+        "longitude": CENTRE[1] + rng.uniform(-0.2, 0.2), "energy_consumption": rng.randint(150, 1500),
+        "roof_type_manual": "Iron Sheets", "created_at": now - timedelta(hours=n, minutes=rng.randint(0, 59))
+    } for uid, _ in ids['customer'] for n in range(args.analyses_per_customer)]
+    db.session.execute(insert(AnalysisRequest), requests_)
+    analyses = db.session.execute(select(AnalysisRequest.id, AnalysisRequest.energy_consumption)).all()
+
+    figures = [(rng.randint(20, 100), rng.uniform(2, 15), rng.uniform(40000, 300000), rng.uniform(2.5, 12))
+               for _ in analyses]
+    scores = lead_scoring.score_batch(*map(list, zip(*figures)), [consumption for _, consumption in analyses])
+    db.session.execute(insert(AnalysisResult), [{
+        "request_id": rid, "status": "COMPLETED", "solar_suitability_score": suitability, "system_size_kw": size,
+        "annual_savings_ksh": savings, "payback_period_years": payback, "panel_count": int(size * 2),
+        "annual_production_kwh": size * 1500, "lead_score": score, "lead_tier": tier, "completed_at": now
+    } for (rid, _), (suitability, size, savings, payback), (score, tier) in zip(analyses, figures, scores)])
+
+    installer_ids = [uid for uid, _ in ids['installer']]
+    db.session.execute(insert(QuoteRequest), [{
+        "customer_id": uid, "installer_id": installer_id, "status": rng.choice(['New', 'New', 'Contacted', 'Qualified'])
+    } for uid, _ in ids['customer']
+      for installer_id in rng.sample(installer_ids, min(args.leads_per_customer, len(installer_ids)))])
+    db.session.commit()
+
+    stats_service.rebuild_rollups()
+    installer_stats_service.rebuild_installer_stats()
+    return ids
+
+
+# --- Scenarios ---
+# Each takes the client state and returns the response that decides success
+
+def _get(state, path, role):
+    return state.http().get(state.url + path, headers=state.auth(role))
+
+
+def analysis_submit(state):
+    lat, lon = state.point()
+    return state.http().post(state.url + '/api/analysis/submit', headers=state.auth('customer'), data={
+        "address": "Bench Road, Nairobi", "latitude": lat, "longitude": lon,
+        "energyConsumption": 600, "roofType": "Tiles",
+    }, files={"roofImage": ("roof.jpg", b"\xff\xd8\xff\xe0 bench roof", "image/jpeg")})
+
+
+def analysis_latest(state):
+    return _get(state, '/api/analysis/latest', 'customer')
+
+
+def installers(state):
+    lat, lon = state.point()
+    return _get(state, f'/api/installers?lat={lat}&lon={lon}', 'customer')
+
+
+def installer_leads(state):
+    return _get(state, '/api/installer-leads', 'installer')
+
+
+def installer_reports(state):
+    return _get(state, '/api/installer-reports', 'installer')
+
+
+def admin_users(state):
+    return _get(state, '/api/admin/users', 'admin')
+
+
+def admin_stats(state):
+    return _get(state, '/api/admin/stats', 'admin')
+
+
+def login_confirm(state):
+    # A different customer per login, so concurrent logins never race for one user's code
+    user_id, user_name = state.next_login()
+    response = state.http().post(state.url + '/api/auth/login', json={"user_name": user_name, "password": PASSWORD})
+    if response.status_code != 200:
+        return response
+    return state.http().post(state.url + '/api/auth/confirm', json={"user_name": user_name, "code": state.login_code(user_id)})
+
+
+class ClientState:
+    """What the client threads share: server URL, seeded users and their tokens."""
+
+    def __init__(self, app, db, url, ids):
+        from flask_jwt_extended import create_access_token
+
+        self.app, self.db, self.url = app, db, url
+        with app.app_context():
+            self.tokens = {role: [create_access_token(identity=str(uid)) for uid, _ in users]
+                           for role, users in ids.items()}
+        self._logins = itertools.cycle(ids['customer'])
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def http(self):
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def auth(self, role):
+        return {"Authorization": f"Bearer {random.choice(self.tokens[role])}"}
+
+    def point(self):
+        return CENTRE[0] + random.uniform(-0.2, 0.2), CENTRE[1] + random.uniform(-0.2, 0.2)
+
+    def next_login(self):
+        with self._lock:
+            return next(self._logins)
+
+    def login_code(self, user_id):
+        # Stands in for the user reading the email
+        from models.login_code import LoginCode
+        with self.app.app_context():
+            return self.db.session.query(LoginCode.code).filter_by(user_id=user_id, used=False).order_by(
+                LoginCode.id.desc()
+            ).scalar()
+
+
+# --- Running and reporting ---
+
+def percentile(sorted_values, pct):
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    return statistics.quantiles(sorted_values, n=100, method='inclusive')[pct - 1]
+
+
+def run_scenario(name, state, args):
+    scenario = globals()[name]
+    for _ in range(args.warmup):
+        scenario(state)
+
+    def timed(_):
+        start = time.perf_counter()
+        try:
+            ok = scenario(state).status_code < 400
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        samples = list(pool.map(timed, range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(seconds * 1000 for seconds, _ in samples)
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for _, ok in samples if not ok),
+        "rps": round(len(samples) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+
+
+def print_results(results):
+    print(f"{'endpoint':<18} {'reqs':>6} {'errors':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, r in results.items():
+        print(f"{name:<18} {r['requests']:>6} {r['errors']:>6} {r['rps']:>8} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9}")
+
+
+def compare(results, baseline, tolerance):
+    """
+    Markdown table of the run against the baseline, ready to paste into a
+    pull request, and whether any endpoint regressed: p95 slower or
+    throughput lower by more than `tolerance`, or new errors.
+    """
+    lines = ["| endpoint | p95 ms (baseline) | req/s (baseline) | errors | |", "| --- | --- | --- | --- | --- |"]
+    regressed = False
+    for name, r in results.items():
+        base = baseline.get(name)
+        if base is None:
+            lines.append(f"| {name} | {r['p95_ms']} (–) | {r['rps']} (–) | {r['errors']} | new |")
+            continue
+        slower = r['p95_ms'] > base['p95_ms'] * (1 + tolerance)
+        fewer = r['rps'] < base['rps'] * (1 - tolerance)
+        failing = r['errors'] > base.get('errors', 0)
+        bad = slower or fewer or failing
+        regressed |= bad
+        lines.append(
+            f"| {name} | {r['p95_ms']} ({base['p95_ms']}, {_change(r['p95_ms'], base['p95_ms'])}) "
+            f"| {r['rps']} ({base['rps']}, {_change(r['rps'], base['rps'])}) | {r['errors']} "
+            f"| {'REGRESSION' if bad else 'ok'} |"
+        )
+    return "\n".join(lines), regressed
+
+
+def _change(value, base):
+    return f"{(value - base) / base * 100:+.0f}%" if base else "–"
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='solarmatch-bench-')
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    # Config reads these when it is imported; nothing is queued (the task is stubbed)
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('REDIS_URL', 'redis://localhost:6379/0')
+
+    from werkzeug.serving import make_server
+    from app import create_app
+    from extensions import db, bcrypt
+    import tasks
+
+    app = create_app(config_override={
+        "SQLALCHEMY_DATABASE_URI": database_url,
+        "MAIL_SUPPRESS_SEND": True,
+        "MAIL_DEFAULT_SENDER": "bench@solarmatch.test",
+        "SQL_REQUEST_STATEMENT_BUDGET": 0, # Don't log budget warnings for every request
+        "RATE_LIMIT_ENABLED": False, # The same few users log in and submit hundreds of times
+        "EXTERNAL_PROVIDERS": "fake",
+        "FAKE_PROVIDER_LATENCY_SCALE": 0,
+        "FAKE_PROVIDER_ERROR_RATE": {},
+    })
+    queue = mock.patch.object(tasks.run_ai_analysis, 'delay', return_value=None)
+
+    with app.app_context():
+        db.create_all()
+        try:
+            started = time.perf_counter()
+            ids = seed(db, bcrypt, args)
+            print(f"Seeded {args.customers} customers, {args.installers} installers in {time.perf_counter() - started:.1f}s "
+                  f"({database_url.split('://')[0]})", file=sys.stderr)
+
+            server = make_server('127.0.0.1', 0, app, threaded=True)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            state = ClientState(app, db, f"http://127.0.0.1:{server.server_port}", ids)
+
+            # Keep the per-request access log and the routes' print()s out of the report
+            logging.getLogger('werkzeug').setLevel(logging.ERROR)
+            results = {}
+            with queue, open(os.devnull, 'w') as quiet, contextlib.redirect_stdout(quiet):
+                for name in args.scenarios:
+                    results[name] = run_scenario(name, state, args)
+                    print(f"  {name}: {results[name]['rps']} req/s", file=sys.stderr)
+            server.shutdown()
+        finally:
+            db.session.remove()
+            db.drop_all()
+
+    report = {
+        "dataset": {k: getattr(args, k) for k in ('customers', 'installers', 'analyses_per_customer', 'leads_per_customer')},
+        "load": {"requests": args.requests, "concurrency": args.concurrency},
+        "database": database_url.split('://')[0],
+        "results": results,
+    }
+    print_results(results)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+    if args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Baseline saved to {args.baseline}")
+    if args.compare:
+        baseline = json.loads(Path(args.baseline).read_text())
+        if (baseline['dataset'], baseline['load'], baseline['database']) != (report['dataset'], report['load'], report['database']):
+            print("Warning: the baseline was recorded with a different dataset, load or database", file=sys.stderr)
+        table, regressed = compare(results, baseline['results'], args.tolerance)
+        print()
+        print(table)
+        return 1 if regressed else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
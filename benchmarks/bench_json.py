@@ -0,0 +1,99 @@
+# benchmarks/bench_json.py
+"""
+Serialization time and bytes on the wire for a large list response: a
+page of --rows users shaped like GET /api/admin/users, through Flask's
+stdlib JSON provider and the orjson one (utils/json_provider.py), then
+compressed as utils/compression.py would.
+
+    python -m benchmarks.bench_json
+    python -m benchmarks.bench_json --rows 20000 --repeat 50
+
+The stdlib provider gets created_at already as .isoformat() strings, as
+the views build them for it; orjson is timed both ways.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.bench_endpoints import percentile
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=30, help="Timed runs of each serializer")
+    return parser.parse_args(argv)
+
+
+def user_rows(count):
+    """Rows like get_all_users returns, with created_at still a datetime."""
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [{
+        "id": n,
+        "full_name": f"Customer Number {n}",
+        "email": f"customer{n}@example.co.ke",
+        "user_name": f"CUS-{n:06d}",
+        "role": "banned" if n % 50 == 0 else "customer",
+        "phone": f"+2547{n:08d}",
+        "is_verified": n % 3 != 0,
+        "created_at": start + timedelta(minutes=17 * n, microseconds=n),
+    } for n in range(count)]
+
+
+def timed(fn, repeat):
+    """(median, p95) seconds of fn() over `repeat` runs, and its last result."""
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        seconds.append(time.perf_counter() - start)
+    seconds.sort()
+    return statistics.median(seconds), percentile(seconds, 95), result
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+    from flask.json.provider import DefaultJSONProvider
+    from app import create_app
+    from utils.compression import compress
+
+    app = create_app()
+    stdlib, fast = DefaultJSONProvider(app), app.json
+    rows = user_rows(args.rows)
+    pagination = {"total_items": args.rows, "total_pages": 1, "current_page": 1, "per_page": args.rows}
+
+    def page(provider, users):
+        return provider.response({"users": users, "pagination": pagination}).get_data()
+
+    def isoformatted():
+        return [{**row, "created_at": row["created_at"].isoformat()} for row in rows]
+
+    serializers = [
+        ("stdlib json, isoformat() strings", lambda: page(stdlib, isoformatted())),
+        ("orjson, isoformat() strings", lambda: page(fast, isoformatted())),
+        ("orjson, datetime objects", lambda: page(fast, rows)),
+    ]
+
+    print(f"Serializing {args.rows} users (median / p95 of {args.repeat}):")
+    with app.app_context():
+        body = None
+        for name, fn in serializers:
+            median, p95, body = timed(fn, args.repeat)
+            print(f"  {name:<34} {median * 1000:8.1f} ms {p95 * 1000:8.1f} ms")
+
+        print(f"\nBytes on the wire ({len(body) / 1024:.0f} KiB of JSON):")
+        print(f"  {'identity':<34} {len(body):>10,} B")
+        for encoding in ('gzip', 'br'):
+            median, _, compressed = timed(lambda: compress(body, encoding, app.config), args.repeat)
+            print(f"  {encoding:<34} {len(compressed):>10,} B  ({len(compressed) / len(body):.1%}, "
+                  f"{median * 1000:.1f} ms to compress)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,69 @@
+# benchmarks/bench_rate_limit.py
+"""
+Time one rate limit check (utils/rate_limit.py) adds to a request: the
+Lua script against REDIS_URL, and the in-memory fallback used while Redis
+is down. Checks use the analysis_submit limits (three windows) with
+--keys distinct users, so most are let through like in production.
+
+    REDIS_URL=redis://localhost:6379/0 python -m benchmarks.bench_rate_limit
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+from benchmarks.bench_endpoints import percentile
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--checks', type=int, default=20000)
+    parser.add_argument('--keys', type=int, default=1000, help="Distinct users the checks are spread over")
+    return parser.parse_args(argv)
+
+
+def run(check, app, args):
+    """Sorted per-check latencies in microseconds."""
+    limits = [(requests, seconds) for _scope, requests, seconds in app.config['RATE_LIMITS']['analysis_submit']]
+    prefix = f"ratelimit:bench:{uuid.uuid4().hex}"
+    keysets = [[f"{prefix}:{n}:{seconds}" for _, seconds in limits] for n in range(args.keys)]
+    samples = []
+    for n in range(args.checks):
+        start = time.perf_counter()
+        check(keysets[n % args.keys], limits)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return sorted(samples), keysets
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+    from app import create_app
+    from utils import rate_limit
+    from utils.redis_client import get_redis
+
+    app = create_app()
+    with app.app_context():
+        backends = [("in-memory fallback", rate_limit._local_check)]
+        client = get_redis()
+        if client is None:
+            print("REDIS_URL is not set: timing the in-memory fallback only", file=sys.stderr)
+        else:
+            client.ping()
+            backends.insert(0, ("redis (Lua script)", rate_limit.check))
+
+        print(f"{args.checks} checks over {args.keys} users, 3 windows each:")
+        for name, check in backends:
+            samples, keysets = run(check, app, args)
+            print(f"  {name:<20} p50 {percentile(samples, 50):7.1f} us   p99 {percentile(samples, 99):7.1f} us")
+            if check is rate_limit.check:
+                for n in range(0, len(keysets), 500):
+                    client.delete(*(key for keys in keysets[n:n + 500] for key in keys))
+        rate_limit.reset()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,218 @@
+# benchmarks/bench_workers.py
+"""
+Requests one gunicorn worker keeps in flight, sync vs gevent: starts
+gunicorn with the repo's gunicorn.conf.py and a single worker of each
+class, and drives POST /api/analysis/submit at rising client concurrency.
+The roof upload goes to the fake Cloudinary with its production-like
+latency (sevices/providers.py), so the route mostly waits on the network,
+like the login and contact routes do on SMTP.
+
+    python -m benchmarks.bench_workers
+    python -m benchmarks.bench_workers --concurrency 1,25,100 --seconds 20
+
+"In flight" is how many requests the worker was handling at once, on
+average: the seconds it spent in requests (from its /metrics request
+duration histogram) over the wall time. Client latency also includes
+time spent queued before the worker accepted the request. Requests the
+worker can't get to within --timeout count as errors.
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+from benchmarks.bench_endpoints import CENTRE, percentile
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--worker-classes', default='sync,gevent')
+    parser.add_argument('--concurrency', default='1,10,50', help="Comma-separated client counts to run in turn")
+    parser.add_argument('--seconds', type=float, default=10, help="How long each client count keeps sending")
+    parser.add_argument('--timeout', type=float, default=30, help="Client timeout per request")
+    parser.add_argument('--latency-scale', type=float, default=1.0,
+                        help="Multiplier on the fake upload latency (1 = production-like)")
+    parser.add_argument('--worker-connections', type=int, default=100, help="gevent worker_connections")
+    args = parser.parse_args(argv)
+    args.worker_classes = [w for w in args.worker_classes.split(',') if w]
+    args.concurrency = [int(c) for c in args.concurrency.split(',') if c]
+    return args
+
+
+def worker_app():
+    """What gunicorn serves here (`benchmarks.bench_workers:worker_app()`): analyses are submitted but not queued."""
+    from app import get_app
+    import tasks
+
+    tasks.run_ai_analysis.delay = lambda request_id: None
+    app = get_app()
+    app.config['FAKE_PROVIDER_ERROR_RATE'] = {}
+    return app
+
+
+# --- Gunicorn ---
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _metrics(url, timeout):
+    return requests.get(url + '/metrics', headers={"Authorization": f"Bearer {os.environ['METRICS_TOKEN']}"},
+                        timeout=timeout)
+
+
+def start_gunicorn(worker_class, env, log_path):
+    port = _free_port()
+    env = dict(env, GUNICORN_WORKER_CLASS=worker_class)
+    with open(log_path, 'w') as log:
+        # gunicorn.conf.py is picked up from the project root, as in production
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--workers', '1', '--bind', f'127.0.0.1:{port}',
+             'benchmarks.bench_workers:worker_app()'],
+            cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT
+        )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            _metrics(url, timeout=1)
+            return process, url
+        except requests.ConnectionError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"gunicorn ({worker_class}) did not start, see {log_path}")
+
+
+def stop_gunicorn(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def busy_seconds(url):
+    """Total time the worker has spent handling requests so far."""
+    from prometheus_client.parser import text_string_to_metric_families
+
+    # A sync worker answers only after the requests queued before this one
+    for family in text_string_to_metric_families(_metrics(url, timeout=600).text):
+        if family.name == 'solarmatch_http_request_duration_seconds':
+            return sum(sample.value for sample in family.samples
+                       if sample.name.endswith('_sum') and sample.labels['route'] != '/metrics')
+    return 0.0
+
+
+# --- Load ---
+
+def run_level(url, token, clients, args):
+    """Each client submits analyses back to back for args.seconds; returns the results for this client count."""
+    stop_at = time.perf_counter() + args.seconds
+
+    def client(n):
+        http = requests.Session()
+        samples = []
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            try:
+                ok = http.post(url + '/api/analysis/submit', headers={"Authorization": f"Bearer {token}"}, data={
+                    "address": "Bench Road, Nairobi", "latitude": CENTRE[0], "longitude": CENTRE[1],
+                    "energyConsumption": 600, "roofType": "Tiles",
+                }, files={"roofImage": ("roof.jpg", f"bench roof {n}-{len(samples)}".encode(), "image/jpeg")},
+                    timeout=args.timeout).status_code == 201
+            except requests.RequestException:
+                ok = False
+            samples.append((time.perf_counter() - start, ok))
+        return samples
+
+    busy = busy_seconds(url)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        samples = [sample for client_samples in pool.map(client, range(clients)) for sample in client_samples]
+    elapsed = time.perf_counter() - started
+    # Includes requests clients gave up on, which the worker still handles
+    busy = busy_seconds(url) - busy
+    drained = time.perf_counter() - started
+
+    completed = sorted(seconds for seconds, ok in samples if ok)
+    rps = len(completed) / elapsed
+    return {
+        "clients": clients,
+        "requests": len(samples),
+        "errors": len(samples) - len(completed),
+        "rps": round(rps, 1),
+        "p50_ms": round(percentile(completed, 50) * 1000) if completed else None,
+        "p95_ms": round(percentile(completed, 95) * 1000) if completed else None,
+        "in_flight": round(busy / drained, 1),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='solarmatch-bench-')
+    database_url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    env = {key: value for key, value in os.environ.items() if key not in ('REDIS_URL', 'DB_ENGINE_PROFILE')}
+    env.update({
+        "DATABASE_URL": database_url,
+        "SECRET_KEY": os.environ.get('SECRET_KEY', 'bench-workers-secret-key-which-is-long-enough'),
+        "EXTERNAL_PROVIDERS": "fake",
+        "RATE_LIMIT_ENABLED": "false", # One customer submits hundreds of analyses
+        "FAKE_PROVIDER_LATENCY_SCALE": str(args.latency_scale),
+        "GUNICORN_WORKER_CONNECTIONS": str(args.worker_connections),
+        "PROMETHEUS_MULTIPROC_DIR": os.path.join(workdir, 'metrics'),
+        "METRICS_TOKEN": os.urandom(16).hex(),
+    })
+    os.environ.update(env)
+
+    from flask_jwt_extended import create_access_token
+    from app import create_app
+    from extensions import db
+    from models.user import User
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        customer = User(full_name="Bench Customer", email="workers@bench.test", password_hash="x",
+                        user_name="BEN-workers", role="customer")
+        db.session.add(customer)
+        db.session.commit()
+        token = create_access_token(identity=str(customer.id))
+        db.session.remove()
+
+    results = {}
+    for worker_class in args.worker_classes:
+        log_path = os.path.join(workdir, f'gunicorn-{worker_class}.log')
+        process, url = start_gunicorn(worker_class, env, log_path)
+        try:
+            results[worker_class] = []
+            for clients in args.concurrency:
+                results[worker_class].append(run_level(url, token, clients, args))
+                print(f"  {worker_class} x{clients}: {results[worker_class][-1]['rps']} req/s", file=sys.stderr)
+        finally:
+            stop_gunicorn(process)
+
+    print(f"One worker, POST /api/analysis/submit, upload latency x{args.latency_scale}, {args.seconds:g}s per row")
+    print(f"{'worker':<8} {'clients':>7} {'reqs':>6} {'errors':>6} {'req/s':>7} {'p50 ms':>7} {'p95 ms':>7} {'in flight':>9}")
+    for worker_class, rows in results.items():
+        for r in rows:
+            print(f"{worker_class:<8} {r['clients']:>7} {r['requests']:>6} {r['errors']:>6} {r['rps']:>7} "
+                  f"{r['p50_ms'] or '-':>7} {r['p95_ms'] or '-':>7} {r['in_flight']:>9}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
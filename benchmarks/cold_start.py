@@ -0,0 +1,85 @@
+# benchmarks/cold_start.py
+"""
+Cold start: time from launching a fresh Python process to the app's first
+response, and which packages the import phase spends its time in
+(from `python -X importtime`).
+
+    python -m benchmarks.cold_start                 # median of 5 cold starts
+    python -m benchmarks.cold_start --imports 20    # plus the 20 slowest packages to import
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Runs in the child: what gunicorn does (import wsgi) followed by one request
+FIRST_RESPONSE = """
+import time
+started = time.time()
+from wsgi import app
+imported = time.time()
+response = app.test_client().get('/')
+print(started, imported, time.time(), response.status_code)
+"""
+
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _env():
+    env = dict(os.environ)
+    # Just enough configuration to build the app; nothing is connected to
+    env.setdefault('DATABASE_URL', 'sqlite://')
+    env.setdefault('SECRET_KEY', 'cold-start-secret-key-which-is-long-enough')
+    return env
+
+
+def cold_start():
+    """(seconds to first response, of which importing wsgi) for one new process."""
+    launched = time.time()
+    out = subprocess.run([sys.executable, '-c', FIRST_RESPONSE], cwd=ROOT, env=_env(),
+                         capture_output=True, text=True, check=True).stdout
+    started, imported, responded, _status = out.strip().splitlines()[-1].split()
+    return float(responded) - launched, float(imported) - float(started)
+
+
+def import_profile():
+    """Self import time summed per top-level package, slowest first, in seconds."""
+    err = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import wsgi'], cwd=ROOT, env=_env(),
+                         capture_output=True, text=True, check=True).stderr
+    per_package = defaultdict(int)
+    for line in err.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match:
+            self_us, _cumulative, _indent, module = match.groups()
+            per_package[module.split('.')[0]] += int(self_us)
+    return sorted(((name, us / 1e6) for name, us in per_package.items()), key=lambda item: -item[1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--imports', type=int, default=0, metavar='N', help="Also list the N slowest packages to import")
+    args = parser.parse_args(argv)
+
+    cold_start() # Warm the OS file cache and .pyc files so runs are comparable
+    runs = [cold_start() for _ in range(args.runs)]
+    print(f"cold start to first response: median {statistics.median(r[0] for r in runs):.2f}s "
+          f"(importing wsgi {statistics.median(r[1] for r in runs):.2f}s) over {args.runs} runs")
+
+    if args.imports:
+        profile = import_profile()
+        print(f"\nimport time by package (self time, total {sum(s for _, s in profile):.2f}s):")
+        for name, seconds in profile[:args.imports]:
+            print(f"  {seconds * 1000:8.1f} ms  {name}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,34 +1,72 @@
 # celery_config.py
-from celery import Celery
+from celery import Celery, Task
+from kombu.simple import SimpleQueue
 import os
 
+# May be unset (tests, scripts, the CLI): the app still imports, and init_celery
+# warns, but nothing can be queued until a broker is configured
 redis_url = os.environ.get('REDIS_URL')
-if not redis_url:
-    raise ValueError("REDIS_URL environment variable is not set.")
+
+# The Flask app tasks run in, set by init_celery
+_flask_app = None
+
+def flask_app():
+    """
+    The app tasks run in. A worker never calls create_app itself, so the
+    first task builds this process's app (app.get_app), once.
+    """
+    if _flask_app is None:
+        from app import get_app
+        get_app()
+    return _flask_app
+
+class ContextTask(Task):
+    def __call__(self, *args, **kwargs):
+        from utils.sql_profiler import profile_task
+        from utils.metrics import task_timer
+
+        with flask_app().app_context(), task_timer(self.name), profile_task(self.name):
+            return self.run(*args, **kwargs)
 
 # Create the Celery instance here, at the module level
 celery = Celery(
     __name__,  # Use a generic name
     broker=redis_url,
     backend=redis_url,
-    include=['tasks']
+    include=['tasks'],
+    task_cls=ContextTask
 )
 celery.conf.update(
     broker_connection_retry_on_startup=True
 )
 
+# The queue tasks go to unless routed elsewhere
+DEFAULT_QUEUE = 'celery'
+
+def queue_depth(queue_name=DEFAULT_QUEUE):
+    """Number of tasks waiting in a queue, read from the broker without a worker. Raises at once if it is unreachable."""
+    with celery.broker_connection() as conn:
+        conn.ensure_connection(max_retries=0)
+        return SimpleQueue(conn, queue_name).qsize()
+
 def init_celery(app):
     """
     Initializes the Celery instance with the Flask app context.
     """
-    celery.conf.update(app.config)
-    celery.main = app.import_name  # Link it to the app
+    global _flask_app
 
-    class ContextTask(celery.Task):
-        def __call__(self, *args, **kwargs):
-            with app.app_context():
-                return self.run(*args, **kwargs)
+    # Only pass CELERY_* settings through, renamed to Celery 5's lowercase
+    # keys (CELERY_RESULT_BACKEND -> result_backend). Passing the whole Flask
+    # config mixes old and new style keys, which Celery refuses.
+    celery.conf.update({
+        key[len('CELERY_'):].lower(): value
+        for key, value in app.config.items()
+        if key.startswith('CELERY_') and value is not None
+    })
+    celery.main = app.import_name  # Link it to the app
+    if not celery.conf.broker_url:
+        app.logger.warning("No Celery broker configured (REDIS_URL is not set); background tasks cannot be queued.")
 
-    celery.Task = ContextTask
+    _flask_app = app
     # We return the app, not celery, just to be conventional
-    return app
\ No newline at end of file
+    return app
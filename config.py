@@ -9,8 +9,114 @@ class Config:
         SQLALCHEMY_DATABASE_URI = SQLALCHEMY_DATABASE_URI.replace("postgres://", "postgresql://", 1)
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Engine settings (utils/db_engines.py): 'web' for gunicorn, 'worker' for
+    # Celery workers, 'cron-drain' for run_tasks.py. DB_PGBOUNCER=true when
+    # DATABASE_URL points at PgBouncer in transaction pooling mode.
+    DB_ENGINE_PROFILE = os.getenv("DB_ENGINE_PROFILE", "web")
+    DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() == "true"
+    # Optional streaming replica for read-only listings (@use_replica views)
+    DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+    if DATABASE_REPLICA_URL and DATABASE_REPLICA_URL.startswith("postgres://"):
+        DATABASE_REPLICA_URL = DATABASE_REPLICA_URL.replace("postgres://", "postgresql://", 1)
     SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
 
+    # SQL statement budgets (utils/sql_profiler.py). Requests and tasks over
+    # budget, or repeating one statement SQL_REPEAT_THRESHOLD times (an N+1),
+    # are logged. SQL_PROFILE_HEADER adds a Server-Timing header (always on in debug).
+    SQL_PROFILING = os.getenv("SQL_PROFILING", "true").lower() == "true"
+    SQL_PROFILE_HEADER = os.getenv("SQL_PROFILE_HEADER", "false").lower() == "true"
+    SQL_REQUEST_STATEMENT_BUDGET = 25
+    SQL_TASK_STATEMENT_BUDGET = 500
+    SQL_REPEAT_THRESHOLD = 5
+
+    # Prometheus metrics at /metrics (utils/metrics.py). Scrapers must send
+    # "Authorization: Bearer <METRICS_TOKEN>"; without a token the endpoint is
+    # served only in debug and tests.
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+    METRICS_QUEUES = ['celery'] # Celery queues whose depth is reported
+
+    # Shared Redis for caches and the activity feed (optional: features fall back to the DB)
+    REDIS_URL = os.getenv("REDIS_URL")
+
+    # Two-tier read cache (utils/cache.py): per-process L1 in front of Redis
+    CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+    CACHE_L1_TTL = 10 # Max seconds an entry lives in a worker's memory, bounds staleness if a pub/sub message is missed
+    CACHE_LOCK_TIMEOUT = 10 # Seconds a worker may hold a key's recompute lock
+    CACHE_LOCK_WAIT = 2 # Seconds other workers wait for that recompute before doing it themselves
+
+    # Gemini, Aerial View and Cloudinary (sevices/providers.py): 'live', 'fake' (local
+    # stand-ins), 'record' (live, saving responses to PROVIDER_FIXTURES_DIR) or 'replay'
+    EXTERNAL_PROVIDERS = os.getenv("EXTERNAL_PROVIDERS", "live")
+    PROVIDER_FIXTURES_DIR = os.getenv("PROVIDER_FIXTURES_DIR", "fixtures/providers")
+    # Fake and replay calls: latency as (median seconds, log-normal sigma), share of calls that fail
+    FAKE_PROVIDER_LATENCY = {
+        'solar_analysis': (6.0, 0.4), 'ar_layout': (9.0, 0.4), 'roof_model': (0.5, 0.3), 'roof_upload': (0.8, 0.5),
+    }
+    FAKE_PROVIDER_ERROR_RATE = {'solar_analysis': 0.02, 'ar_layout': 0.03, 'roof_model': 0.01, 'roof_upload': 0.005}
+    FAKE_PROVIDER_LATENCY_SCALE = float(os.getenv("FAKE_PROVIDER_LATENCY_SCALE", "1.0")) # 0 turns the waits off
+    FAKE_PROVIDER_SEED = int(os.getenv("FAKE_PROVIDER_SEED", "0"))
+
+    # Installer matching (sevices/installer_matching.py)
+    DEFAULT_SERVICE_RADIUS_KM = 50.0 # For installers who haven't set their own
+    INSTALLER_INDEX_MAX_AGE = 300 # Seconds before the in-memory index is rebuilt regardless
+    INSTALLER_MATCH_LIMIT = 10 # Default top-k; callers may ask for up to 50
+
+    # Automatic lead routing (sevices/lead_routing.py) for analyses submitted with autoRoute
+    AUTO_ROUTE_INSTALLERS = 3 # Installers each routed analysis is sent to
+    AUTO_ROUTE_CATEGORY = 'Residential' # Customers don't pick one, so prefer installers offering this
+    INSTALLER_OPEN_LEAD_CAPACITY = 30 # Installers with this many New/Contacted leads aren't routed more
+    QUOTE_REQUEST_MAX_INSTALLERS = 10 # Installers a customer can ask in one POST /quote-requests
+
+    # Installer ratings: Bayesian average pulled towards REVIEW_PRIOR_MEAN,
+    # as if every installer started with REVIEW_PRIOR_WEIGHT reviews of that score
+    REVIEW_PRIOR_MEAN = 4.0
+    REVIEW_PRIOR_WEIGHT = 5
+
+    # Installer contract signatures (stored as bytes, served by GET /installers/<id>/contract/signature)
+    SIGNATURE_MAX_BYTES = 512 * 1024
+
+    # Admin recent-activity feed
+    ACTIVITY_FEED_SIZE = 20 # Length of the capped Redis list
+    ACTIVITY_RETENTION_DAYS = 90 # Older events are moved to activity_events_archive
+
+    # Bulk installer CSV import
+    INSTALLER_IMPORT_MAX_ROWS = 2000
+    INSTALLER_IMPORT_BATCH_SIZE = 500 # Rows per multi-row INSERT
+    WELCOME_EMAIL_BATCH_SIZE = 50 # Emails per Celery task / SMTP connection
+
+    # HTTP caching. Every cacheable endpoint needs a JWT, so responses are private
+    # to the browser, which always revalidates (cheap 304s)
+    PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+    # Response compression (utils/compression.py): brotli or gzip, as negotiated,
+    # for these types once a body reaches COMPRESS_MIN_SIZE bytes
+    COMPRESS_ENABLED = os.getenv("COMPRESS_ENABLED", "true").lower() == "true"
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+    COMPRESS_MIMETYPES = ['application/json', 'text/csv', 'text/plain', 'text/html']
+    COMPRESS_GZIP_LEVEL = 6
+    COMPRESS_BROTLI_QUALITY = 4 # 0-11; above ~5 costs more CPU than it saves on the wire
+
+    # Sliding-window rate limits (utils/rate_limit.py): name -> [(scope, requests, seconds)],
+    # scope 'user', 'ip' or 'user_ip'. A request over any of them gets 429 with Retry-After.
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMITS = {
+        'analysis_submit': [('user', 5, 3600), ('user', 20, 86400), ('ip', 20, 3600)], # Paid Gemini / Aerial View work
+        # Per account *and* address, so failed attempts from elsewhere can't lock the owner out
+        'login': [('user_ip', 5, 900), ('ip', 20, 900)], # Each one emails a code and stores it
+        'login_confirm': [('user_ip', 10, 900), ('ip', 30, 900)], # Guessing 6-digit codes
+        'contact': [('ip', 5, 3600)], # Relays mail
+    }
+    # Proxies in front of the app (the host's load balancer) whose X-Forwarded-For
+    # gives the client address for 'ip' limits. Set it in every deployment behind
+    # one: at 0, a client-sent X-Forwarded-For is ignored but everyone shares the
+    # proxy's address.
+    TRUSTED_PROXIES = int(os.getenv("TRUSTED_PROXIES", "0"))
+
+    # kg of CO2 avoided per kWh of solar production, used for the admin CO2 stats
+    GRID_CO2_KG_PER_KWH = float(os.getenv("GRID_CO2_KG_PER_KWH", "0.5"))
+
     # --- Flask-Mail Configuration for Gmail ---
     MAIL_SERVER = 'smtp.gmail.com'
     MAIL_PORT = 587 # Use 465 for SSL, 587 for TLS
@@ -0,0 +1,55 @@
+# gunicorn.conf.py
+# Loaded automatically by `gunicorn wsgi:app` from the project root.
+import glob
+import os
+import tempfile
+
+# Prometheus multiprocess mode (utils/metrics.py): every worker writes its
+# metrics to files in this directory and /metrics adds them up. It has to be
+# set before the app, and so prometheus_client, is imported. Start Celery
+# workers on the same host with the same value to include task metrics.
+metrics_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'solarmatch-metrics')
+)
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+
+# 'sync' workers handle one request at a time. 'gevent' workers keep up to
+# worker_connections requests in flight each, switching between them while
+# they wait on Cloudinary, SMTP, Redis or Postgres (see post_fork).
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', '100'))
+
+
+def on_starting(server):
+    os.makedirs(metrics_dir, exist_ok=True)
+    # In-flight gauges left by workers of a previous master would never go
+    # back down. Counter and histogram files are kept: summing them keeps the
+    # totals monotonic across restarts, and Celery workers' files stay valid.
+    for path in glob.glob(os.path.join(metrics_dir, 'gauge_live*.db')):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def _gevent(worker):
+    return worker.cfg.worker_class_str == 'gevent'
+
+
+def post_fork(server, worker):
+    # Runs before the worker imports the app, so Config sees the profile
+    if _gevent(worker):
+        os.environ.setdefault('DB_ENGINE_PROFILE', 'web-gevent')
+
+
+def post_worker_init(worker):
+    # The gevent worker has monkey-patched sockets, ssl, time.sleep and
+    # threading by now, so smtplib, requests (Cloudinary) and redis-py yield
+    # while they wait. psycopg2 is a C extension and needs its own hook.
+    if _gevent(worker):
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
@@ -0,0 +1,30 @@
+"""Seed the about_content row
+
+Revision ID: a2bc165af3d6
+Revises: b17a6d80b020
+Create Date: 2026-10-19 12:41:09.762614
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a2bc165af3d6'
+down_revision = 'b17a6d80b020'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # GET /api/admin/about used to create this row on first read; seed it instead
+    op.execute(
+        "INSERT INTO about_content (id, mission, vision, updated_at) "
+        "SELECT 1, '', '', CURRENT_TIMESTAMP "
+        "WHERE NOT EXISTS (SELECT 1 FROM about_content WHERE id = 1)"
+    )
+
+
+def downgrade():
+    # Keep the row: it may hold real content by now
+    pass
@@ -0,0 +1,38 @@
+"""Add user search and keyset pagination indexes
+
+Revision ID: e884d26b0e17
+Revises: 9e64ce4b2d85
+Create Date: 2026-10-19 09:12:41.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e884d26b0e17'
+down_revision = '9e64ce4b2d85'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index('ix_users_role_created_at', ['role', 'created_at', 'id'], unique=False)
+
+    # Trigram index for the admin search. The expression must match
+    # User.search_text() exactly or the planner will not use it.
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute(
+            "CREATE INDEX ix_users_search_trgm ON users "
+            "USING gin (lower(full_name || ' ' || email || ' ' || user_name) gin_trgm_ops)"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_users_search_trgm")
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_role_created_at')
@@ -4,4 +4,7 @@ from .user import User
 from .login_code import LoginCode
 from .analysis import AnalysisRequest, AnalysisResult
 from .content import Faq, SustainabilityTip, AboutContent
-from .quote_request import QuoteRequest
\ No newline at end of file
+from .quote_request import QuoteRequest
+from .review import InstallerReview
+from .stats import DailyRollup, RollupTotal, InstallerStats, LeadStatusCount
+from .activity import ActivityEvent, ActivityEventArchive
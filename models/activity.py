@@ -0,0 +1,34 @@
+from extensions import db
+from datetime import datetime, timezone
+
+
+class ActivityEventColumns:
+    """Columns shared by the live event log and its archive."""
+    type = db.Column(db.String(50), nullable=False) # e.g. user_registered, analysis_complete
+    text = db.Column(db.String(255), nullable=False) # What the dashboard shows, e.g. "Jane Doe"
+
+    # Plain ids rather than foreign keys: the log is append-only and must
+    # outlive the users/requests it mentions
+    actor_id = db.Column(db.Integer, nullable=True)
+    subject_id = db.Column(db.Integer, nullable=True)
+
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, index=True, default=lambda: datetime.now(timezone.utc))
+
+
+class ActivityEvent(ActivityEventColumns, db.Model):
+    __tablename__ = 'activity_events'
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    def __repr__(self):
+        return f'<ActivityEvent {self.type} {self.text}>'
+
+
+class ActivityEventArchive(ActivityEventColumns, db.Model):
+    __tablename__ = 'activity_events_archive'
+
+    # Copied from activity_events, never generated here
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+
+    def __repr__(self):
+        return f'<ActivityEventArchive {self.type} {self.text}>'
@@ -1,8 +1,12 @@
 from extensions import db # Assuming you have db = SQLAlchemy() in your __init__.py
-from sqlalchemy.sql import func
+from datetime import datetime, timezone
 
 class AnalysisRequest(db.Model):
     __tablename__ = 'analysis_requests'
+    __table_args__ = (
+        # "Latest analysis for this user" lookups
+        db.Index('ix_analysis_requests_user_created', 'user_id', 'created_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -12,13 +16,20 @@ class AnalysisRequest(db.Model):
     energy_consumption = db.Column(db.Integer)
     roof_type_manual = db.Column(db.String(50)) # User's selection
     roof_image_url = db.Column(db.String(500)) # URL from Cloudinary
-    created_at = db.Column(db.DateTime(timezone=True), default=func.now())
+    # Customer asked for their quote requests to be sent for them once the analysis completes
+    auto_route = db.Column(db.Boolean, default=False, server_default=db.false(), nullable=False)
+    # Python-side default: SQLite's CURRENT_TIMESTAMP drops the microseconds that keyset cursors compare on
+    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     
     # Relationship to the results
     result = db.relationship('AnalysisResult', backref='request', uselist=False, lazy=True)
 
 class AnalysisResult(db.Model):
     __tablename__ = 'analysis_results'
+    __table_args__ = (
+        # Report listings ordered or filtered by lead score
+        db.Index('ix_analysis_results_status_lead_score', 'status', 'lead_score', 'request_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     request_id = db.Column(db.Integer, db.ForeignKey('analysis_requests.id'), nullable=False, unique=True)
@@ -44,4 +55,11 @@ class AnalysisResult(db.Model):
     financial_summary_text = db.Column(db.Text, nullable=True)
     environmental_summary_text = db.Column(db.Text, nullable=True)
 
-    solar_suitability_score = db.Column(db.Integer, nullable=True) # Score 0-100
\ No newline at end of file
+    solar_suitability_score = db.Column(db.Integer, nullable=True) # Score 0-100
+
+    # Lead potential for installers, set once when the analysis completes (sevices/lead_scoring.py)
+    lead_score = db.Column(db.Float, nullable=True) # 0-100
+    lead_tier = db.Column(db.String(10), nullable=True) # High, Medium, Low
+
+    # Set by the background task when the result reaches COMPLETED or FAILED
+    completed_at = db.Column(db.DateTime(timezone=True), nullable=True)
\ No newline at end of file
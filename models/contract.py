@@ -1,6 +1,25 @@
+import base64
+import binascii
+import re
+import zlib
 from extensions import db
 from datetime import datetime, timezone
 
+# data:<mimetype>;base64,<payload> as sent by the signature pad
+DATA_URI = re.compile(r'^data:(image/[\w.+-]+);base64,(.+)$', re.DOTALL)
+
+
+def parse_data_uri(data_uri):
+    """(mimetype, raw bytes) from a Base64 image data URI. Raises ValueError."""
+    match = DATA_URI.match(data_uri or '')
+    if not match:
+        raise ValueError("Signature must be a base64 image data URI")
+    try:
+        return match.group(1), base64.b64decode(match.group(2), validate=True)
+    except binascii.Error:
+        raise ValueError("Signature is not valid base64")
+
+
 class SignedContract(db.Model):
     __tablename__ = 'signed_contracts'
 
@@ -11,9 +30,14 @@ class SignedContract(db.Model):
     # (One user can only have one signed contract)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, unique=True)
     
-    # Store the Base64 data URI of the signature image
-    # db.Text is used because Base64 strings can be very long
-    signature_image = db.Column(db.Text, nullable=False)
+    # The signature image as raw bytes (zlib-compressed when that makes it
+    # smaller), not a Base64 string. Deferred with raiseload: loading a
+    # contract (or user.contract) never pulls it, and touching it without
+    # undefer() raises instead of quietly running another query.
+    signature_data = db.deferred(db.Column(db.LargeBinary, nullable=False), raiseload=True)
+    signature_mimetype = db.Column(db.String(50), nullable=False, default='image/png')
+    signature_compressed = db.Column(db.Boolean, nullable=False, default=False)
+    signature_size = db.Column(db.Integer, nullable=False, default=0) # Bytes once decompressed
     
     ip_address = db.Column(db.String(45), nullable=True) # IPs can be IPv6
     
@@ -23,5 +47,29 @@ class SignedContract(db.Model):
     # The timestamp when our server saved it
     created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
+    def set_signature(self, mimetype, image):
+        compressed = zlib.compress(image, 9)
+        self.signature_compressed = len(compressed) < len(image)
+        self.signature_data = compressed if self.signature_compressed else image
+        self.signature_mimetype = mimetype
+        self.signature_size = len(image)
+
+    def iter_signature(self, chunk_size=16384):
+        """
+        The image bytes in chunks, decompressing as it goes. Needs
+        signature_data loaded; reads it now, so the chunks can be sent
+        after the session is gone.
+        """
+        data, compressed = self.signature_data, self.signature_compressed
+
+        def chunks():
+            decompressor = zlib.decompressobj() if compressed else None
+            for start in range(0, len(data), chunk_size):
+                chunk = data[start:start + chunk_size]
+                yield decompressor.decompress(chunk) if decompressor else chunk
+            if decompressor:
+                yield decompressor.flush()
+        return chunks()
+
     def __repr__(self):
-        return f'<SignedContract for User {self.user_id}>'
\ No newline at end of file
+        return f'<SignedContract for User {self.user_id}>'
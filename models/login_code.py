@@ -3,6 +3,10 @@ from datetime import datetime, timezone
 
 class LoginCode(db.Model):
     __tablename__ = "login_codes"
+    __table_args__ = (
+        # 2FA confirmation looks the code up by (user_id, code)
+        db.Index('ix_login_codes_user_code', 'user_id', 'code'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -1,8 +1,22 @@
 from extensions import db
 from datetime import datetime, timezone
 
+# Lead pipeline, in order. A lead counts as converted from 'Qualified' on;
+# 'Completed' means the installation was done and the customer may review it.
+LEAD_STATUSES = ['New', 'Contacted', 'Qualified', 'Completed', 'Lost']
+CONVERTED_STATUSES = {'Qualified', 'Completed'}
+
 class QuoteRequest(db.Model):
     __tablename__ = 'quote_requests'
+    __table_args__ = (
+        # Installer lead inbox: newest first, optionally filtered by status, keyset on (created_at, id)
+        db.Index('ix_quote_requests_installer_created', 'installer_id', 'created_at', 'id'),
+        db.Index('ix_quote_requests_installer_status_created', 'installer_id', 'status', 'created_at', 'id'),
+        # Roof reports: EXISTS probe / index-only scan of an installer's customers
+        db.Index('ix_quote_requests_installer_customer', 'installer_id', 'customer_id'),
+        # One lead per customer/installer pair; inserts use ON CONFLICT DO NOTHING on it
+        db.UniqueConstraint('customer_id', 'installer_id', name='uq_quote_requests_customer_installer'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     
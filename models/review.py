@@ -0,0 +1,20 @@
+from extensions import db
+from datetime import datetime, timezone
+
+class InstallerReview(db.Model):
+    __tablename__ = 'installer_reviews'
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # One review per completed job
+    quote_request_id = db.Column(db.Integer, db.ForeignKey('quote_requests.id'), nullable=False, unique=True)
+    installer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+
+    rating = db.Column(db.Integer, nullable=False) # 1 to 5
+    comment = db.Column(db.Text, nullable=True)
+
+    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        return f'<InstallerReview {self.rating}/5 for {self.installer_id}>'
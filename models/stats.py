@@ -0,0 +1,64 @@
+from extensions import db
+
+
+class DailyRollup(db.Model):
+    """One pre-aggregated counter per (UTC day, metric), e.g. ('2025-11-02', 'users.new.customer')."""
+    __tablename__ = 'daily_rollups'
+
+    day = db.Column(db.Date, primary_key=True)
+    metric = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Float, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<DailyRollup {self.day} {self.metric}={self.value}>'
+
+
+class RollupTotal(db.Model):
+    """All-time running value per metric, so totals never need a full COUNT(*)."""
+    __tablename__ = 'rollup_totals'
+
+    metric = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Float, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<RollupTotal {self.metric}={self.value}>'
+
+
+class InstallerStats(db.Model):
+    """
+    Pre-aggregated review and lead figures per installer, kept current on
+    every write so the directory reads one row per installer.
+    """
+    __tablename__ = 'installer_stats'
+
+    installer_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    # (prior_weight * prior_mean + rating_sum) / (prior_weight + review_count): few reviews pull towards the prior
+    bayesian_rating = db.Column(db.Float, nullable=False, default=0)
+    lead_count = db.Column(db.Integer, nullable=False, default=0)
+    qualified_count = db.Column(db.Integer, nullable=False, default=0) # Leads that reached 'Qualified' or later
+    conversion_rate = db.Column(db.Float, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_installer_stats_bayesian_rating', 'bayesian_rating'),
+    )
+
+    @property
+    def average_rating(self):
+        return self.rating_sum / self.review_count if self.review_count else None
+
+    def __repr__(self):
+        return f'<InstallerStats {self.installer_id} {self.bayesian_rating:.2f}>'
+
+
+class LeadStatusCount(db.Model):
+    """Number of an installer's leads in each status, for the lead inbox tabs."""
+    __tablename__ = 'lead_status_counts'
+
+    installer_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    status = db.Column(db.String(50), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<LeadStatusCount {self.installer_id} {self.status}={self.count}>'
@@ -1,10 +1,15 @@
 from extensions import db
 from datetime import datetime, timezone
+from sqlalchemy import func
 from .contract import SignedContract
 from .quote_request import QuoteRequest
 
 class User(db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        # Admin user list: filter by role, newest first, keyset on (created_at, id)
+        db.Index('ix_users_role_created_at', 'role', 'created_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     full_name = db.Column(db.String, nullable=False)
@@ -19,6 +24,11 @@ class User(db.Model):
 
     contract_accepted = db.Column(db.Boolean, default=False, nullable=False)
 
+    # Installer service area. Without coordinates the county's reference point is used
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    service_radius_km = db.Column(db.Float, nullable=True) # None -> DEFAULT_SERVICE_RADIUS_KM
+
     created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     updated_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
     
@@ -31,4 +41,11 @@ class User(db.Model):
     # Leads RECEIVED by this user (when they are an installer)
     leads_received = db.relationship('QuoteRequest', foreign_keys=[QuoteRequest.installer_id], backref='installer', lazy=True)
 
-    
\ No newline at end of file
+    @classmethod
+    def search_text(cls):
+        """
+        Lower-cased "full_name email user_name" blob used by the admin search.
+        This exact expression is covered by the ix_users_search_trgm GIN index
+        on Postgres, so keep the two in sync.
+        """
+        return func.lower(cls.full_name + ' ' + cls.email + ' ' + cls.user_name)
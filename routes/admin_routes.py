@@ -1,20 +1,29 @@
-import os
-from flask import request, jsonify, Blueprint
+from flask import request, jsonify, Blueprint, current_app, Response, stream_with_context
+from datetime import datetime, timezone
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from extensions import db, mail
 from models.user import User
-from sqlalchemy import or_ # <-- 1. Import 'or_' for searching
+from sqlalchemy import or_, func # <-- 1. Import 'or_' for searching
 import random
-from utils.helpers import generate_username
+from utils.helpers import generate_username, escape_like
 from extensions import bcrypt
 from models.content import Faq, SustainabilityTip, AboutContent
-from models.analysis import AnalysisRequest
-from flask_mail import Message
+from sevices import stats_service, activity_service
+from sevices.stats_service import get_dashboard_stats
+from sevices.email_service import installer_welcome_message
+from sevices.installer_import import parse_installer_csv, import_installers, ImportFileError
+from sevices import export_service
+from utils.http_cache import make_etag, is_not_modified, with_validators, not_modified_response
+from utils.cache import cached, invalidate_tags
+from utils.pagination import clamp_per_page, estimate_count, keyset_after, fetch_page
+from utils.db_engines import use_replica
+from utils.metrics import external_call
 
 admin_bp = Blueprint('admin', __name__)
 
 @admin_bp.route('/users', methods=['GET'])
 @jwt_required()
+@use_replica
 def get_all_users():
     
     current_user_id = get_jwt_identity() # <-- Note: We know this is the ID now
@@ -26,35 +35,45 @@ def get_all_users():
 
     # --- 2. Add Search and Filter Logic ---
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 8, type=int)
-    search_term = request.args.get('search', '', type=str)
+    per_page = clamp_per_page(request.args.get('per_page', 8, type=int))
+    search_term = request.args.get('search', '', type=str).strip()
+    cursor = request.args.get('cursor', type=str)
+    exact_count = request.args.get('exact_count', 'false').lower() == 'true'
     
     try:
         # Start with the base query
         query = User.query.filter(
-            or_(User.role == 'customer', User.role == 'banned') # Show customers and banned users
+            User.role.in_(['customer', 'banned']) # Show customers and banned users
         )
         
         # Add search if provided
         if search_term:
-            # Search by name, email, or even ID
-            query = query.filter(
-                or_(
-                    User.full_name.ilike(f"%{search_term}%"),
-                    User.email.ilike(f"%{search_term}%"),
-                    User.user_name.ilike(f"%{search_term}%")
-                )
-            )
+            # One LIKE over name/email/username, served by the trigram index
+            query = query.filter(User.search_text().like(f"%{escape_like(search_term.lower())}%", escape='\\'))
             
         # TODO: Add county/category filters here later
-        
-        paginated_users = query.order_by(User.created_at.desc()).paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
-        
-        users = paginated_users.items
+
+        # Totals: exact COUNT(*) only when asked for. Otherwise the maintained
+        # role counters when unfiltered, or the planner estimate for a search.
+        total_users = None
+        if exact_count:
+            total_users, is_estimate = query.order_by(None).count(), False
+        elif not search_term:
+            total_users, is_estimate = stats_service.get_total('users.customer', 'users.banned'), False
+        if total_users is None:
+            total_users, is_estimate = estimate_count(query)
+
+        # Keyset pagination (newest first). `page` is still honoured for old clients.
+        query = query.order_by(User.created_at.desc(), User.id.desc())
+        if cursor:
+            try:
+                query = query.filter(keyset_after(User.created_at, User.id, cursor))
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+        elif page > 1:
+            query = query.offset((page - 1) * per_page)
+
+        users, next_cursor = fetch_page(query, per_page, User.created_at, User.id)
         
         users_list = []
         for user in users:
@@ -70,9 +89,13 @@ def get_all_users():
         return jsonify({
             "users": users_list,
             "pagination": {
-                "current_page": paginated_users.page,
-                "total_pages": paginated_users.pages,
-                "total_users": paginated_users.total
+                "current_page": None if cursor else page,
+                "per_page": per_page,
+                "total_pages": -(-total_users // per_page),
+                "total_users": total_users,
+                "total_is_estimate": is_estimate,
+                "next_cursor": next_cursor,
+                "has_more": next_cursor is not None
             }
         }), 200
 
@@ -96,8 +119,10 @@ def ban_user(user_id):
     if user_to_ban.role == 'admin':
         return jsonify({"error": "Cannot ban an admin"}), 403
         
+    stats_service.record_role_change(user_to_ban.role, 'banned')
     user_to_ban.role = 'banned'
     db.session.commit()
+    invalidate_tags('stats', 'installers') # A banned installer leaves the directory and matching index
     return jsonify({"message": f"User {user_to_ban.full_name} has been banned"}), 200
 
 @admin_bp.route('/users/<int:user_id>/unban', methods=['PUT'])
@@ -113,7 +138,9 @@ def unban_user(user_id):
     
     if user_to_unban.role == 'banned':
         user_to_unban.role = 'customer' # Revert them to customer
+        stats_service.record_role_change('banned', 'customer')
         db.session.commit()
+        invalidate_tags('stats', 'installers')
         return jsonify({"message": f"User {user_to_unban.full_name} has been unbanned"}), 200
     
     return jsonify({"error": "User is not currently banned"}), 400
@@ -123,6 +150,7 @@ def unban_user(user_id):
 
 @admin_bp.route('/installers', methods=['GET'])
 @jwt_required()
+@use_replica
 def get_all_installers():
     admin_user = User.query.get(get_jwt_identity())
     if not admin_user or admin_user.role != 'admin':
@@ -189,31 +217,16 @@ def add_installer():
         installer_category=installer_category
     )
     db.session.add(user)
+    stats_service.record_new_user("installer")
+    activity_service.log_activity(activity_service.INSTALLER_ADDED, full_name, actor_id=admin_user.id)
     db.session.commit()
+    invalidate_tags('stats', 'installers')
 
     # --- 3. Send the Welcome Email ---
     try:
-        login_url = f"{os.environ.get('FRONTEND_URL', 'http://localhost:5173')}/login"
-        
-        msg = Message(
-            subject="Welcome to SolarMatch Kenya!",
-            recipients=[user.email],
-            # Use MAIL_DEFAULT_SENDER from config
-            # sender=app.config['MAIL_DEFAULT_SENDER'] # Optional: Specify sender if different
-        )
-        msg.html = f"""
-        <p>Hello {user.full_name},</p>
-        <p>Welcome to SolarMatch Kenya! An administrator has created an installer account for you.</p>
-        <p>Please use the following temporary credentials to log in:</p>
-        <ul>
-            <li><strong>Username:</strong> {user.user_name}</li>
-            <li><strong>Temporary Password:</strong> {temp_password}</li>
-        </ul>
-        <p>You can log in here: <a href="{login_url}">{login_url}</a></p>
-        <p><strong>Important:</strong> You will be required to set a new password immediately after your first login.</p>
-        <p>Best regards,<br>The SolarMatch Kenya Team</p>
-        """
-        mail.send(msg)
+        msg = installer_welcome_message(user.full_name, user.email, user.user_name, temp_password)
+        with external_call('smtp'):
+            mail.send(msg)
         print(f"--- Welcome email sent to {user.email} ---") # Keep console log for confirmation
 
     except Exception as e:
@@ -233,6 +246,86 @@ def add_installer():
         "user": {"id": user.id, "full_name": user.full_name, "email": user.email, "category": user.installer_category}
     }), 201
 
+@admin_bp.route('/installers/import', methods=['POST'])
+@jwt_required()
+def bulk_import_installers():
+    from tasks import send_installer_welcome_emails
+
+    admin_user = User.query.get(get_jwt_identity())
+    if not admin_user or admin_user.role != 'admin':
+        return jsonify({"error": "Admin access required"}), 403
+
+    upload = request.files.get('file')
+    if not upload:
+        return jsonify({"error": "A CSV file is required"}), 400
+    dry_run = request.args.get('dry_run', 'false').lower() == 'true'
+
+    try:
+        valid_rows, report = parse_installer_csv(upload)
+    except ImportFileError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        created_ids = import_installers(valid_rows, admin_user.id, dry_run=dry_run)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Import failed, no installers were created: {e}"}), 500
+    if created_ids:
+        invalidate_tags('stats', 'installers')
+
+    # --- Queue the welcome emails in batches (one SMTP connection per batch) ---
+    emails_queued = False
+    if created_ids:
+        batch_size = current_app.config['WELCOME_EMAIL_BATCH_SIZE']
+        try:
+            for start in range(0, len(created_ids), batch_size):
+                send_installer_welcome_emails.delay(created_ids[start:start + batch_size])
+            emails_queued = True
+        except Exception as e:
+            # The installers exist either way; POST /installers/<id>/welcome resends
+            print(f"!!! FAILED TO QUEUE WELCOME EMAILS: {e} !!!")
+
+    summary = {"total_rows": len(report)}
+    for entry in report:
+        summary[entry["status"]] = summary.get(entry["status"], 0) + 1
+
+    return jsonify({
+        "dry_run": dry_run,
+        "summary": summary,
+        "emails_queued": emails_queued,
+        # Installers to resend the welcome email to (they can't log in without it)
+        "welcome_pending_ids": [] if emails_queued else created_ids,
+        "rows": report
+    }), 201 if summary.get("created") else 200
+
+@admin_bp.route('/installers/<int:user_id>/welcome', methods=['POST'])
+@jwt_required()
+def resend_installer_welcome(user_id):
+    """
+    Emails an installer who hasn't logged in yet a new temporary password,
+    e.g. when queueing or sending the welcome email after an import failed.
+    """
+    from tasks import send_installer_welcome_emails
+
+    admin_user = User.query.get(get_jwt_identity())
+    if not admin_user or admin_user.role != 'admin':
+        return jsonify({"error": "Admin access required"}), 403
+
+    installer = User.query.get(user_id)
+    if not installer:
+        return jsonify({"error": "User not found"}), 404
+    if installer.role != 'installer':
+        return jsonify({"error": "This user is not an installer"}), 400
+    if not installer.password_reset_required:
+        return jsonify({"error": "This installer has already set their own password"}), 409
+
+    try:
+        send_installer_welcome_emails.delay([installer.id])
+    except Exception as e:
+        print(f"!!! FAILED TO QUEUE WELCOME EMAIL for {installer.email}: {e} !!!")
+        return jsonify({"error": "Could not queue the welcome email, try again later"}), 503
+    return jsonify({"message": f"Welcome email queued for {installer.full_name}"}), 202
+
 @admin_bp.route('/installers/<int:user_id>', methods=['DELETE'])
 @jwt_required()
 def delete_installer(user_id):
@@ -248,21 +341,87 @@ def delete_installer(user_id):
         return jsonify({"error": "This user is not an installer"}), 400
         
     db.session.delete(user_to_delete)
+    stats_service.record_user_removed('installer')
     db.session.commit()
+    invalidate_tags('stats', 'installers')
     return jsonify({"message": "Installer deleted successfully"}), 200
 
 
+# --- DATA EXPORTS ---
+
+@admin_bp.route('/export/<dataset>', methods=['GET'])
+@jwt_required()
+@use_replica
+def export_dataset(dataset):
+    """
+    Streams users / installers / analyses as CSV or NDJSON.
+    ?format=csv|ndjson  ?columns=id,email,...  ?gzip=true
+    """
+    admin_user = User.query.get(get_jwt_identity())
+    if not admin_user or admin_user.role != 'admin':
+        return jsonify({"error": "Admin access required"}), 403
+
+    if dataset not in export_service.DATASETS:
+        return jsonify({"error": f"Unknown dataset. Choose one of: {', '.join(export_service.DATASETS)}"}), 404
+
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in export_service.FORMATS:
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+
+    columns_arg = request.args.get('columns', '', type=str)
+    column_names = [c.strip() for c in columns_arg.split(',') if c.strip()] or export_service.available_columns(dataset)
+    try:
+        stmt = export_service.build_export_query(dataset, column_names)
+    except ValueError as e:
+        return jsonify({"error": str(e), "available_columns": export_service.available_columns(dataset)}), 400
+
+    filename = f"{dataset}-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.{fmt}"
+    mimetype = export_service.FORMATS[fmt]
+    headers = {
+        "Cache-Control": "no-store",
+        "X-Accel-Buffering": "no" # Don't let a proxy buffer the whole stream
+    }
+
+    use_gzip = request.args.get('gzip', 'false').lower() == 'true'
+    if use_gzip:
+        if 'gzip' in request.accept_encodings:
+            headers["Content-Encoding"] = "gzip"
+        else:
+            # Client can't decode on the fly: hand it a .gz file instead
+            filename += ".gz"
+            mimetype = "application/gzip"
+    headers["Content-Disposition"] = f"attachment; filename={filename}"
+
+    body = export_service.stream_export(stmt, fmt, column_names, gzip=use_gzip)
+    return Response(stream_with_context(body), mimetype=mimetype, headers=headers)
+
+
 # --- CONTENT MANAGEMENT (NEW) ---
 
 # --- FAQs ---
+@cached('content:faqs', ttl=300, tags=['faqs'])
+def _faq_list():
+    # Validators are cached with the list so a warm hit never touches the DB
+    count, last_modified, max_id = db.session.query(func.count(Faq.id), func.max(Faq.updated_at), func.max(Faq.id)).one()
+    faqs = Faq.query.order_by(Faq.created_at).all()
+    return {
+        "etag": make_etag("faqs", count, last_modified, max_id),
+        "last_modified": last_modified,
+        "faqs": [{"id": f.id, "question": f.question, "answer": f.answer} for f in faqs]
+    }
+
 @admin_bp.route('/faqs', methods=['GET'])
 @jwt_required()
 def get_faqs():
     admin_user = User.query.get(get_jwt_identity())
     if not admin_user or admin_user.role != 'admin': return jsonify({"error": "Admin access required"}), 403
     
-    faqs = Faq.query.order_by(Faq.created_at).all()
-    return jsonify({"faqs": [{"id": f.id, "question": f.question, "answer": f.answer} for f in faqs]}), 200
+    data = _faq_list()
+    if is_not_modified(data["etag"], data["last_modified"]):
+        return not_modified_response(data["etag"], data["last_modified"])
+
+    response = jsonify({"faqs": data["faqs"]})
+    return with_validators(response, data["etag"], data["last_modified"]), 200
 
 @admin_bp.route('/faqs', methods=['POST'])
 @jwt_required()
@@ -277,6 +436,7 @@ def add_faq():
     new_faq = Faq(question=data['question'], answer=data['answer'])
     db.session.add(new_faq)
     db.session.commit()
+    invalidate_tags('faqs')
     return jsonify({"id": new_faq.id, "question": new_faq.question, "answer": new_faq.answer}), 201
 
 @admin_bp.route('/faqs/<int:faq_id>', methods=['PUT'])
@@ -295,6 +455,7 @@ def update_faq(faq_id):
     if 'question' in data: faq.question = data['question']
     if 'answer' in data: faq.answer = data['answer']
     db.session.commit()
+    invalidate_tags('faqs')
     return jsonify({"id": faq.id, "question": faq.question, "answer": faq.answer}), 200
 
 @admin_bp.route('/faqs/<int:faq_id>', methods=['DELETE'])
@@ -308,17 +469,34 @@ def delete_faq(faq_id):
         
     db.session.delete(faq)
     db.session.commit()
+    invalidate_tags('faqs')
     return jsonify({"message": "FAQ deleted"}), 200
 
 # --- Sustainability Tips --- (Similar structure to FAQs)
+@cached('content:tips', ttl=300, tags=['tips'])
+def _tip_list():
+    count, last_modified, max_id = db.session.query(
+        func.count(SustainabilityTip.id), func.max(SustainabilityTip.updated_at), func.max(SustainabilityTip.id)
+    ).one()
+    tips = SustainabilityTip.query.order_by(SustainabilityTip.created_at).all()
+    return {
+        "etag": make_etag("tips", count, last_modified, max_id),
+        "last_modified": last_modified,
+        "tips": [{"id": t.id, "title": t.title, "description": t.description} for t in tips]
+    }
+
 @admin_bp.route('/tips', methods=['GET'])
 @jwt_required()
 def get_tips():
     admin_user = User.query.get(get_jwt_identity())
     if not admin_user or admin_user.role != 'admin': return jsonify({"error": "Admin access required"}), 403
     
-    tips = SustainabilityTip.query.order_by(SustainabilityTip.created_at).all()
-    return jsonify({"tips": [{"id": t.id, "title": t.title, "description": t.description} for t in tips]}), 200
+    data = _tip_list()
+    if is_not_modified(data["etag"], data["last_modified"]):
+        return not_modified_response(data["etag"], data["last_modified"])
+
+    response = jsonify({"tips": data["tips"]})
+    return with_validators(response, data["etag"], data["last_modified"]), 200
 
 @admin_bp.route('/tips', methods=['POST'])
 @jwt_required()
@@ -333,6 +511,7 @@ def add_tip():
     new_tip = SustainabilityTip(title=data['title'], description=data['description'])
     db.session.add(new_tip)
     db.session.commit()
+    invalidate_tags('tips')
     return jsonify({"id": new_tip.id, "title": new_tip.title, "description": new_tip.description}), 201
     
 @admin_bp.route('/tips/<int:tip_id>', methods=['PUT'])
@@ -351,6 +530,7 @@ def update_tip(tip_id):
     if 'title' in data: tip.title = data['title']
     if 'description' in data: tip.description = data['description']
     db.session.commit()
+    invalidate_tags('tips')
     return jsonify({"id": tip.id, "title": tip.title, "description": tip.description}), 200
 
 @admin_bp.route('/tips/<int:tip_id>', methods=['DELETE'])
@@ -364,19 +544,27 @@ def delete_tip(tip_id):
         
     db.session.delete(tip)
     db.session.commit()
+    invalidate_tags('tips')
     return jsonify({"message": "Tip deleted"}), 200
 
 # --- About Page Content ---
 @admin_bp.route('/about', methods=['GET'])
 @jwt_required() # Technically not needed if About page is public, but good practice for admin edit
 def get_about_content():
-    # Find the content, or create it if it doesn't exist
+    # The row is seeded by a migration; a GET never writes.
+    # Private: a shared cache would hand this authenticated response to anyone.
+    cache_control = current_app.config["PRIVATE_CACHE_CONTROL"]
+    last_modified = db.session.query(AboutContent.updated_at).filter_by(id=1).scalar()
+    etag = make_etag("about", last_modified)
+    if is_not_modified(etag, last_modified):
+        return not_modified_response(etag, last_modified, cache_control)
+
     content = AboutContent.query.get(1)
-    if not content:
-        content = AboutContent(id=1, mission="", vision="")
-        db.session.add(content)
-        db.session.commit()
-    return jsonify({"mission": content.mission, "vision": content.vision}), 200
+    response = jsonify({
+        "mission": content.mission if content else "",
+        "vision": content.vision if content else ""
+    })
+    return with_validators(response, etag, last_modified, cache_control), 200
 
 @admin_bp.route('/about', methods=['PUT'])
 @jwt_required()
@@ -384,12 +572,14 @@ def update_about_content():
     admin_user = User.query.get(get_jwt_identity())
     if not admin_user or admin_user.role != 'admin': return jsonify({"error": "Admin access required"}), 403
     
-    content = AboutContent.query.get(1)
-    if not content: return jsonify({"error": "About content not found"}), 404 # Should not happen
-    
     data = request.get_json()
     if not data or ('mission' not in data and 'vision' not in data):
          return jsonify({"error": "Mission or vision content is required"}), 400
+
+    content = AboutContent.query.get(1)
+    if not content: # Only if the seed migration hasn't run
+        content = AboutContent(id=1, mission="", vision="")
+        db.session.add(content)
          
     if 'mission' in data: content.mission = data['mission']
     if 'vision' in data: content.vision = data['vision']
@@ -400,54 +590,23 @@ def update_about_content():
 # --- ADMIN OVERVIEW STATS (NEW) ---
 @admin_bp.route('/stats', methods=['GET'])
 @jwt_required()
+@use_replica
 def get_admin_stats():
     admin_user = User.query.get(get_jwt_identity())
     if not admin_user or admin_user.role != 'admin':
         return jsonify({"error": "Admin access required"}), 403
 
     try:
-        # --- CALCULATE STATS (Replace with real queries) ---
-
-        # Total Users (Customers + Installers)
-        total_users = User.query.filter(User.role.in_(['customer', 'installer'])).count()
-        # You'd compare this to the count from last month for the percentage change
-
-        # Solar Analyses
-        total_analyses = AnalysisRequest.query.count()
-        # Compare to last month
-
-        # CO2 Saved - This is tricky and depends on how you estimate savings.
-        # Placeholder calculation: Assume 0.5 tons saved per analysis?
-        co2_saved = total_analyses * 0.5
-        # Compare to last month
-
-        # User Growth (Placeholder - you'd query users created in the last 30 days)
-        growth_data = {
-            "labels": ["Week 1", "Week 2", "Week 3", "Week 4"],
-            "data": [50, 120, 80, 150] # Example: New users per week
-        }
-
-        # Recent Activity (Placeholder - you'd query recent events/logs)
-        recent_activity = [
-            {"type": "user_registered", "text": "John Doe", "time_ago": "2 min ago"},
-            {"type": "installer_approved", "text": "GreenLeaf Solar", "time_ago": "1 hour ago"},
-            {"type": "analysis_complete", "text": "User #1138", "time_ago": "3 hours ago"},
-            {"type": "user_registered", "text": "Jane Smith", "time_ago": "5 hours ago"},
-        ]
+        # Totals, week-over-week changes and growth all come from the
+        # pre-aggregated rollup rows (see sevices/stats_service.py)
+        # (cached and shared between requests, so copy before adding to it)
+        data = dict(get_dashboard_stats())
+
+        # Recent Activity from the event log (capped Redis list, DB fallback)
+        data["recent_activity"] = activity_service.recent_activity(request.args.get('activity_limit', type=int))
 
         # --- Return data ---
-        return jsonify({
-            "stats": {
-                "total_users": total_users,
-                "users_change": "+5.2%", # Placeholder
-                "total_analyses": total_analyses,
-                "analyses_change": "+3.8%", # Placeholder
-                "co2_saved": round(co2_saved, 2),
-                "co2_change": "+7.1%" # Placeholder
-            },
-            "growth_data": growth_data,
-            "recent_activity": recent_activity
-        }), 200
+        return jsonify(data), 200
 
     except Exception as e:
         # Log the full error for debugging
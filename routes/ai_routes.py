@@ -1,53 +1,27 @@
-import os
 import json
-import cloudinary.uploader
-from flask import request, jsonify, Blueprint, current_app
-import requests
+from datetime import datetime
+from flask import request, jsonify, Blueprint
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from extensions import db
 from models.analysis import AnalysisRequest, AnalysisResult
 from models.quote_request import QuoteRequest 
 from models.user import User
-# from sevices.gemini_service import get_solar_analysis, get_ar_layout
-
-import cloudinary
+from sqlalchemy.orm import joinedload
+from utils.http_cache import make_etag, is_not_modified, with_validators, not_modified_response
+from sevices import stats_service, providers
+from utils.cache import cached
+from utils.pagination import clamp_per_page, keyset_after, fetch_page
+from utils.db_engines import use_replica
+from utils.rate_limit import rate_limited
+from sevices.lead_scoring import LEAD_TIERS
 
 # --- Define the Blueprint ---
 ai_bp = Blueprint('ai', __name__) # <-- Create the blueprint
 
-def get_3d_roof_model(lat, lon):
-    """
-    Calls the Google Aerial View API to get a 3D model URL.
-    """
-    try:
-        maps_key = os.environ.get("GOOGLE_MAPS_API_KEY")
-        if not maps_key:
-            current_app.logger.error("GOOGLE_MAPS_API_KEY not set.")
-            return None
-            
-        url = "https://aerialview.googleapis.com/v1/buildings:findClosest"
-        params = {
-            'key': maps_key,
-            'location.latitude': lat,
-            'location.longitude': lon
-        }
-        
-        response = requests.get(url, params=params)
-        response.raise_for_status() # Raise an error for bad responses
-        
-        data = response.json()
-        
-        # Extract the GLB model URL
-        model_url = data.get('renders', {}).get('gltf', {}).get('url')
-        return model_url
-        
-    except Exception as e:
-        current_app.logger.error(f"Aerial View API failed: {e}")
-        return None
-
 # --- Use the Blueprint for routing ---
 @ai_bp.route('/analysis/submit', methods=['POST'])
 @jwt_required()
+@rate_limited('analysis_submit')
 def submit_analysis():
     
     from tasks import run_ai_analysis
@@ -62,11 +36,7 @@ def submit_analysis():
 
     # Upload image (This is fast)
     try:
-        upload_result = cloudinary.uploader.upload(
-            roof_image_file,        # <-- This passes the file from the form
-            folder="roof_analysis"  # <-- This tells Cloudinary where to put it
-        )
-        image_url = upload_result.get('secure_url')
+        image_url = providers.upload_roof_image(roof_image_file)
     except Exception as e:
         return jsonify({"error": f"Image upload failed: {e}"}), 500
 
@@ -78,7 +48,8 @@ def submit_analysis():
         longitude=float(form_data.get('longitude', 0)),
         energy_consumption=int(form_data.get('energyConsumption')),
         roof_type_manual=form_data.get('roofType'),
-        roof_image_url=image_url
+        roof_image_url=image_url,
+        auto_route=form_data.get('autoRoute', 'false').lower() == 'true'
     )
     
     new_result = AnalysisResult(
@@ -87,6 +58,7 @@ def submit_analysis():
     )
     db.session.add(new_request)
     db.session.add(new_result)
+    stats_service.record_analysis_submitted()
     db.session.commit()
 
     #  --- TRIGGER THE BACKGROUND TASK ---
@@ -106,11 +78,26 @@ def get_latest_analysis():
     Fetches the most recent analysis for the logged-in user.
     """
     current_user_id = get_jwt_identity()
-    
-    latest_request = AnalysisRequest.query.filter_by(user_id=current_user_id).order_by(AnalysisRequest.created_at.desc()).first()
-    
-    if not latest_request:
+
+    # Cheap validator lookup first: a COMPLETED result never changes, so its
+    # id/status is a complete ETag and a match skips loading the report at all
+    latest = db.session.query(
+        AnalysisRequest.id, AnalysisResult.id, AnalysisResult.status, AnalysisResult.completed_at
+    ).outerjoin(
+        AnalysisResult, AnalysisResult.request_id == AnalysisRequest.id
+    ).filter(
+        AnalysisRequest.user_id == current_user_id
+    ).order_by(AnalysisRequest.created_at.desc()).first()
+
+    if not latest:
         return jsonify({"error": "No analysis found"}), 404
+
+    request_id, result_id, status, completed_at = latest
+    etag = make_etag("analysis", result_id, status)
+    if status == 'COMPLETED' and is_not_modified(etag, completed_at):
+        return not_modified_response(etag, completed_at)
+
+    latest_request = AnalysisRequest.query.options(joinedload(AnalysisRequest.result)).get(request_id)
         
     if not latest_request.result or latest_request.result.status == 'PENDING':
         return jsonify({"status": "PENDING", "message": "Your analysis is still processing."}), 202
@@ -131,7 +118,7 @@ def get_latest_analysis():
         except json.JSONDecodeError:
             panel_layout_parsed = None
 
-    return jsonify({
+    response = jsonify({
         "status": "COMPLETED",
         "request": {
             "address": latest_request.address,
@@ -152,12 +139,14 @@ def get_latest_analysis():
             "solar_suitability_score": result.solar_suitability_score,
             "panel_layout": panel_layout_parsed
         }
-    }), 200
+    })
+    return with_validators(response, etag, completed_at), 200
 
 
 # --- 5. ADD NEW ENDPOINT FOR INSTALLER ROOF REPORTS ---
 @ai_bp.route('/installer-reports', methods=['GET'])
 @jwt_required()
+@use_replica
 def get_installer_reports():
     installer_id = get_jwt_identity()
     
@@ -166,37 +155,83 @@ def get_installer_reports():
     if not installer or installer.role != 'installer':
         return jsonify({"error": "Unauthorized"}), 403
 
-    # 1. Find all customer IDs from this installer's leads
-    customer_ids = [
-        lead.customer_id for lead in 
-        QuoteRequest.query.filter_by(installer_id=installer_id).all()
-    ]
-    
-    if not customer_ids:
-        return jsonify([]), 200 # Return empty list if no leads
+    per_page = clamp_per_page(request.args.get('per_page', 20, type=int), default=20)
+    cursor = request.args.get('cursor', type=str)
+    sort = request.args.get('sort', 'newest', type=str)
+    if sort not in ('newest', 'score'):
+        return jsonify({"error": "sort must be 'newest' or 'score'"}), 400
+    tiers = [t for t in request.args.get('tier', '', type=str).split(',') if t]
+    unknown = [t for t in tiers if t not in LEAD_TIERS]
+    if unknown:
+        return jsonify({"error": f"Unknown tier: {', '.join(unknown)}"}), 400
+
+    try:
+        if cursor or sort != 'newest' or tiers:
+            reports_list, next_cursor = _installer_reports_page(int(installer_id), per_page, cursor, sort, tiers)
+        else:
+            reports_list, next_cursor = _installer_reports_first_page(int(installer_id), per_page)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "reports": reports_list,
+        "pagination": {
+            "per_page": per_page,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
+        }
+    }), 200
+
+
+def _installer_reports_page(installer_id, per_page, cursor=None, sort='newest', tiers=()):
+    """
+    Completed analyses of every customer who sent this installer a quote
+    request, newest first or best lead score first. One query: the leads are
+    an EXISTS semi-join (index-only on quote_requests (installer_id,
+    customer_id)), not an IN list. Score order and tier filters read the
+    lead score stored at completion, indexed by analysis_results
+    (status, lead_score, request_id).
+    """
+    has_lead = db.session.query(QuoteRequest.id).filter(
+        QuoteRequest.installer_id == installer_id,
+        QuoteRequest.customer_id == AnalysisRequest.user_id
+    ).exists()
 
-    # 2. Find all "COMPLETED" analyses for those customer IDs
-    # We join tables to get the customer's name and the report data
-    reports = db.session.query(
+    query = db.session.query(
         AnalysisRequest.id,
+        AnalysisResult.request_id,
         User.full_name.label('customer_name'),
         AnalysisRequest.address,
         AnalysisResult.status,
         AnalysisResult.annual_savings_ksh, # Example data point
         AnalysisResult.payback_period_years, # Example data point
+        AnalysisResult.lead_score,
+        AnalysisResult.lead_tier,
         AnalysisRequest.created_at
     ).join(
         AnalysisResult, AnalysisRequest.id == AnalysisResult.request_id
     ).join(
         User, AnalysisRequest.user_id == User.id
     ).filter(
-        AnalysisRequest.user_id.in_(customer_ids),
+        has_lead,
         AnalysisResult.status == 'COMPLETED'
-    ).order_by(
-        AnalysisRequest.created_at.desc()
-    ).all()
+    )
+    if tiers:
+        query = query.filter(AnalysisResult.lead_tier.in_(tiers))
+
+    if sort == 'score':
+        # Results not scored yet (before the backfill) have no place in this order
+        sort_col, id_col, sort_type = AnalysisResult.lead_score, AnalysisResult.request_id, float
+        query = query.filter(AnalysisResult.lead_score.isnot(None))
+    else:
+        sort_col, id_col, sort_type = AnalysisRequest.created_at, AnalysisRequest.id, datetime
+    query = query.order_by(sort_col.desc(), id_col.desc())
+    if cursor:
+        query = query.filter(keyset_after(sort_col, id_col, cursor, sort_type))
 
-    # 3. Format the data for the frontend
+    reports, next_cursor = fetch_page(query, per_page, sort_col, id_col)
+
+    # Format just this page for the frontend
     reports_list = [
         {
             "id": report.id,
@@ -204,10 +239,20 @@ def get_installer_reports():
             "address": report.address,
             "reportDate": report.created_at.isoformat(),
             "status": report.status,
-            "annualSavings": f"KSh {report.annual_savings_ksh:,.0f}", # Formatted
-            "payback": f"{report.payback_period_years:.1f} years"
+            "annualSavings": f"KSh {report.annual_savings_ksh:,.0f}" if report.annual_savings_ksh is not None else None,
+            "payback": f"{report.payback_period_years:.1f} years" if report.payback_period_years is not None else None,
+            "leadScore": report.lead_score,
+            "leadTier": report.lead_tier
         } 
         for report in reports
     ]
+    return reports_list, next_cursor
+
 
-    return jsonify(reports_list), 200
\ No newline at end of file
+# The default first page is what installers open most; dropped when this
+# installer gets a new lead, one of their leads' analyses completes, or
+# lead scores are backfilled
+_installer_reports_first_page = cached(
+    'installer-reports', ttl=300,
+    tags=lambda installer_id, per_page: ['installer-reports', f'installer-reports:{installer_id}']
+)(_installer_reports_page)
@@ -9,6 +9,9 @@ from datetime import datetime, timedelta, timezone
 from utils.helpers import generate_username
 import random
 from flask_mail import Message
+from sevices import stats_service, activity_service
+from utils.metrics import external_call
+from utils.rate_limit import rate_limited
 
 auth_bp = Blueprint("auth", __name__)
 api = Api(auth_bp)
@@ -17,6 +20,11 @@ api = Api(auth_bp)
 ADMIN_EMAILS = ["admin@solarmatch.co.ke", "trish@solarmatch.co.ke"]  # whitelist your admin emails
 
 
+def _submitted_user_name():
+    """The account a login/confirm request is for, which 'user_ip' rate limits key on."""
+    return (request.get_json(silent=True) or {}).get("user_name")
+
+
 # -------------------------
 #   REGISTER - Customer only
 # -------------------------
@@ -57,6 +65,8 @@ class RegisterResource(Resource):
             role=role
         )
         db.session.add(user)
+        stats_service.record_new_user(role)
+        activity_service.log_activity(activity_service.USER_REGISTERED, full_name)
         db.session.commit()
 
         return {
@@ -70,6 +80,7 @@ class RegisterResource(Resource):
 #   LOGIN - All roles
 # -------------------------
 class LoginResource(Resource):
+    @rate_limited('login', user=_submitted_user_name)
     def post(self):
         data = request.get_json()
         user_name = data.get("user_name")
@@ -113,7 +124,8 @@ class LoginResource(Resource):
             <p>If you did not request this code, please ignore this email.</p>
             <p>Best regards,<br>The SolarMatch Kenya Team</p>
             """
-            mail.send(msg)
+            with external_call('smtp'):
+                mail.send(msg)
             print(f"--- Verification code email sent to {user.email} ---") # Keep for confirmation
 
         except Exception as e:
@@ -132,6 +144,7 @@ class LoginResource(Resource):
 #   CONFIRM CODE (2FA)
 # -------------------------
 class ConfirmCodeResource(Resource):
+    @rate_limited('login_confirm', user=_submitted_user_name)
     def post(self):
         data = request.get_json()
         user_name = data.get("user_name")
@@ -226,6 +239,8 @@ class AddInstallerResource(Resource):
             password_hash=pw_hash
         )
         db.session.add(user)
+        stats_service.record_new_user("installer")
+        activity_service.log_activity(activity_service.INSTALLER_ADDED, full_name, actor_id=current_user.id)
         db.session.commit()
 
         try:
@@ -248,7 +263,8 @@ class AddInstallerResource(Resource):
             """
             
             # Send the email
-            mail.send(msg)
+            with external_call('smtp'):
+                mail.send(msg)
             print(f"--- Installer welcome email sent to {email} ---")
 
             # --- Commit the user to DB ONLY if email was successful ---
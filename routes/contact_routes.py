@@ -2,10 +2,13 @@ import os
 from flask import request, jsonify, Blueprint
 from extensions import mail 
 from flask_mail import Message
+from utils.metrics import external_call
+from utils.rate_limit import rate_limited
 
 contact_bp = Blueprint('contact', __name__)
 
 @contact_bp.route('/contact', methods=['POST'])
+@rate_limited('contact')
 def handle_contact_form():
     data = request.get_json()
 
@@ -64,7 +67,8 @@ def handle_contact_form():
         <hr>
         """
 
-        mail.send(msg)
+        with external_call('smtp'):
+            mail.send(msg)
 
         return jsonify({"message": "Message sent successfully!"}), 200
 
@@ -1,33 +1,89 @@
-from flask import request, jsonify, Blueprint
+from flask import request, jsonify, Blueprint, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from extensions import db
 from models.user import User
-from models.contract import SignedContract
-from models.quote_request import QuoteRequest
+from models.contract import SignedContract, parse_data_uri
+from models.quote_request import QuoteRequest, LEAD_STATUSES
+from models.analysis import AnalysisRequest, AnalysisResult
+from models.review import InstallerReview
+from models.stats import InstallerStats
 from datetime import datetime
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sevices import activity_service, installer_stats_service, lead_routing
+from utils.cache import cached, invalidate_tags
+from sevices.installer_matching import nearest_installers
+from sevices.lead_scoring import LEAD_TIERS
+from utils.pagination import clamp_per_page, keyset_after, fetch_page
+from utils.http_cache import make_etag, is_not_modified, with_validators, not_modified_response
+from utils.db_engines import use_replica
 
 installer_bp = Blueprint('installer', __name__)
 
 
 # --- 1. ENDPOINT TO GET ALL INSTALLERS ---
-@installer_bp.route('/installers', methods=['GET'])
-@jwt_required() # Make sure a user is logged in to see installers
-def get_all_installers():
-    # Find all users who are installers and whose contract is accepted
-    installers = User.query.filter_by(role='installer', contract_accepted=True).all()
+def _ratings(stats):
+    # From the pre-aggregated installer_stats row (None until their first lead/review)
+    if not stats or not stats.review_count:
+        return {"rating": None, "reviews": 0}
+    return {"rating": round(stats.average_rating, 1), "reviews": stats.review_count}
+
+@cached('installers:directory', ttl=300, tags=['installers', 'installer-ratings'])
+def _installer_directory():
+    # Installers whose contract is accepted, best rated first (Bayesian, so
+    # one 5-star review doesn't beat fifty 4.8s)
+    installers = db.session.query(User, InstallerStats).outerjoin(
+        InstallerStats, InstallerStats.installer_id == User.id
+    ).filter(
+        User.role == 'installer', User.contract_accepted.is_(True)
+    ).order_by(
+        func.coalesce(InstallerStats.bayesian_rating, current_app.config['REVIEW_PRIOR_MEAN']).desc(), User.full_name
+    ).all()
     
     installer_list = []
-    for inst in installers:
+    for inst, stats in installers:
         installer_list.append({
             "id": inst.id,
             "name": inst.full_name,
             "location": inst.county or "N/A",
-            # We'll add real ratings/reviews later
-            "rating": 4.5, # Placeholder
-            "reviews": (inst.id * 15) % 100 + 20 # Placeholder
+            **_ratings(stats)
         })
-        
-    return jsonify(installer_list), 200
+    return installer_list
+
+@installer_bp.route('/installers', methods=['GET'])
+@jwt_required() # Make sure a user is logged in to see installers
+@use_replica
+def get_all_installers():
+    # Nearest installers whose service area covers a point: either ?lat=&lon=
+    # or ?analysis_id= (one of the customer's own analyses). No point -> full directory.
+    lat = request.args.get('lat', type=float)
+    lon = request.args.get('lon', type=float)
+    analysis_id = request.args.get('analysis_id', type=int)
+
+    if analysis_id is not None:
+        analysis = AnalysisRequest.query.filter_by(id=analysis_id, user_id=int(get_jwt_identity())).first()
+        if not analysis:
+            return jsonify({"error": "Analysis not found"}), 404
+        lat, lon = analysis.latitude, analysis.longitude
+
+    if lat is None or lon is None:
+        return jsonify(_installer_directory()), 200
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return jsonify({"error": "Invalid coordinates"}), 400
+
+    limit = request.args.get('limit', current_app.config['INSTALLER_MATCH_LIMIT'], type=int)
+    limit = max(1, min(limit, 50))
+    matches = nearest_installers(lat, lon, limit, request.args.get('category'))
+    stats = {s.installer_id: s for s in InstallerStats.query.filter(InstallerStats.installer_id.in_([m["id"] for m in matches]))}
+
+    return jsonify([{
+        "id": m["id"],
+        "name": m["name"],
+        "location": m["location"],
+        "category": m["category"],
+        "distance_km": m["distance_km"],
+        **_ratings(stats.get(m["id"]))
+    } for m in matches]), 200
 
 # --- 2. ENDPOINT TO CREATE A QUOTE REQUEST ---
 @installer_bp.route('/quote-request', methods=['POST'])
@@ -39,62 +95,145 @@ def create_quote_request():
 
     if not installer_id:
         return jsonify({"error": "Installer ID is required"}), 400
+    try:
+        installer_id = int(installer_id)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Installer ID must be a number"}), 400
 
     # Check if this user is a customer
     customer = User.query.get(customer_id)
     if customer.role != 'customer':
         return jsonify({"error": "Only customers can request quotes"}), 403
 
-    # Check if request already exists
-    existing_request = QuoteRequest.query.filter_by(
-        customer_id=customer_id, 
-        installer_id=installer_id
-    ).first()
-    
-    if existing_request:
-        return jsonify({"message": "You have already sent a request to this installer"}), 409 # 409 Conflict
+    # One atomic statement: the unique (customer_id, installer_id) constraint
+    # turns a repeat or a concurrent double click into "nothing inserted"
+    created = lead_routing.create_quote_requests(customer.id, [installer_id])
+    if not created:
+        if QuoteRequest.query.filter_by(customer_id=customer.id, installer_id=installer_id).first():
+            return jsonify({"message": "You have already sent a request to this installer"}), 409 # 409 Conflict
+        return jsonify({"error": "Installer not found"}), 404
 
-    # Create new request
-    new_request = QuoteRequest(
-        customer_id=customer_id,
-        installer_id=installer_id,
-        status='New'
-    )
-    
-    db.session.add(new_request)
+    activity_service.log_activity(activity_service.QUOTE_REQUESTED, customer.full_name, actor_id=customer.id, subject_id=installer_id)
     db.session.commit()
+    invalidate_tags(f'installer-reports:{installer_id}')
     
     return jsonify({"message": "Quote request sent successfully!"}), 201
 
+@installer_bp.route('/quote-requests', methods=['POST'])
+@jwt_required()
+def create_quote_requests():
+    # Ask several installers for a quote at once: {"installer_ids": [..]}
+    customer = User.query.get(get_jwt_identity())
+    if not customer or customer.role != 'customer':
+        return jsonify({"error": "Only customers can request quotes"}), 403
+
+    installer_ids = (request.get_json() or {}).get('installer_ids')
+    max_installers = current_app.config['QUOTE_REQUEST_MAX_INSTALLERS']
+    if (not isinstance(installer_ids, list) or not installer_ids
+            or not all(isinstance(i, int) and not isinstance(i, bool) for i in installer_ids)):
+        return jsonify({"error": "installer_ids must be a non-empty list of installer ids"}), 400
+    installer_ids = list(dict.fromkeys(installer_ids))
+    if len(installer_ids) > max_installers:
+        return jsonify({"error": f"You can request at most {max_installers} quotes at once"}), 400
+
+    created = lead_routing.create_quote_requests(customer.id, installer_ids)
+    skipped = [i for i in installer_ids if i not in created]
+    # Only when something was skipped: which of those were already contacted (vs. not installers)
+    existing = set(db.session.scalars(select(QuoteRequest.installer_id).where(
+        QuoteRequest.customer_id == customer.id, QuoteRequest.installer_id.in_(skipped)
+    ))) if skipped else set()
+
+    if created:
+        activity_service.log_activity(activity_service.QUOTE_REQUESTED, customer.full_name, actor_id=customer.id,
+                                      subject_id=next(iter(created)) if len(created) == 1 else None)
+    db.session.commit()
+    invalidate_tags(*[f'installer-reports:{i}' for i in created])
+
+    return jsonify({
+        "created": [{"installer_id": i, "quote_request_id": q} for i, q in created.items()],
+        "existing": [i for i in skipped if i in existing],
+        "not_found": [i for i in skipped if i not in existing]
+    }), 201 if created else 200
+
 # --- 3. ENDPOINT FOR INSTALLER TO GET THEIR LEADS ---
 @installer_bp.route('/installer-leads', methods=['GET'])
 @jwt_required()
+@use_replica
 def get_installer_leads():
-    installer_id = get_jwt_identity()
+    installer_id = int(get_jwt_identity())
     
     # Ensure the user is an installer
     installer = User.query.get(installer_id)
-    if installer.role != 'installer':
+    if not installer or installer.role != 'installer':
         return jsonify({"error": "Unauthorized"}), 403
-        
-    # Query all leads for this installer, and join with the customer (User) table
-    # This uses the 'leads_received' relationship defined in models/user.py
-    leads = installer.leads_received
-    
+
+    per_page = clamp_per_page(request.args.get('per_page', 20, type=int), default=20)
+    cursor = request.args.get('cursor', type=str)
+    statuses = [s for s in request.args.get('status', '', type=str).split(',') if s]
+    unknown = [s for s in statuses if s not in LEAD_STATUSES]
+    if unknown:
+        return jsonify({"error": f"Unknown status: {', '.join(unknown)}"}), 400
+    tiers = [t for t in request.args.get('tier', '', type=str).split(',') if t]
+    unknown = [t for t in tiers if t not in LEAD_TIERS]
+    if unknown:
+        return jsonify({"error": f"Unknown tier: {', '.join(unknown)}"}), 400
+
+    # Lead tier of the customer's latest completed analysis, correlated per lead
+    latest_tier = db.session.query(AnalysisResult.lead_tier).join(
+        AnalysisRequest, AnalysisRequest.id == AnalysisResult.request_id
+    ).filter(
+        AnalysisRequest.user_id == QuoteRequest.customer_id,
+        AnalysisResult.status == 'COMPLETED'
+    ).order_by(
+        AnalysisRequest.created_at.desc(), AnalysisRequest.id.desc()
+    ).limit(1).correlate(QuoteRequest).scalar_subquery()
+
+    # One query: leads joined to their customer, only the columns we send
+    query = db.session.query(
+        QuoteRequest.id, QuoteRequest.status, QuoteRequest.created_at,
+        User.full_name, User.county, User.email,
+        latest_tier.label('tier')
+    ).join(
+        User, User.id == QuoteRequest.customer_id
+    ).filter(
+        QuoteRequest.installer_id == installer_id
+    )
+    if statuses:
+        query = query.filter(QuoteRequest.status.in_(statuses))
+    if tiers:
+        query = query.filter(latest_tier.in_(tiers))
+
+    query = query.order_by(QuoteRequest.created_at.desc(), QuoteRequest.id.desc())
+    if cursor:
+        try:
+            query = query.filter(keyset_after(QuoteRequest.created_at, QuoteRequest.id, cursor))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    leads, next_cursor = fetch_page(query, per_page, QuoteRequest.created_at, QuoteRequest.id)
+
     leads_data = []
     for lead in leads:
         leads_data.append({
             "id": lead.id,
             "status": lead.status,
             "requested_at": lead.created_at.isoformat(),
-            # "customer" is the backref from the relationship
-            "name": lead.customer.full_name,
-            "location": lead.customer.county or "N/A",
-            "contact": lead.customer.email,
-            "potential": "High" # I'll add logic for this later
+            "name": lead.full_name,
+            "location": lead.county or "N/A",
+            "contact": lead.email,
+            "potential": lead.tier or "Unknown"
         })
-        
-    return jsonify(leads_data), 200
+
+    return jsonify({
+        "leads": leads_data,
+        # Maintained counters, so the status tabs never COUNT(*) the leads
+        "counts": installer_stats_service.lead_status_counts(installer_id),
+        "pagination": {
+            "per_page": per_page,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
+        }
+    }), 200
 
 
 @installer_bp.route('/installers/<int:user_id>/contract', methods=['POST'])
@@ -135,23 +274,32 @@ def sign_contract(user_id):
         signed_at_dt = datetime.fromisoformat(signed_at_str.replace('Z', '+00:00'))
     except ValueError:
         return jsonify({"error": "Invalid timestamp format"}), 400
+
+    try:
+        mimetype, image = parse_data_uri(signature)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if len(image) > current_app.config['SIGNATURE_MAX_BYTES']:
+        return jsonify({"error": "Signature image is too large"}), 400
         
     # --- This is the main logic ---
     
     # 1. Create the new contract record
     new_contract = SignedContract(
         user_id=user.id,
-        signature_image=signature,
         ip_address=ip_address,
         signed_at=signed_at_dt
     )
+    new_contract.set_signature(mimetype, image)
 
     # 2. Update the user's status
     user.contract_accepted = True
 
     try:
         db.session.add(new_contract)
+        activity_service.log_activity(activity_service.CONTRACT_SIGNED, user.full_name, actor_id=user.id)
         db.session.commit()
+        invalidate_tags('installers') # They now appear in the directory
         
         # We need to return the updated user, just like we did for
         # password change, so the AuthContext stays in sync.
@@ -173,4 +321,119 @@ def sign_contract(user_id):
     except Exception as e:
         db.session.rollback()
         print(f"Error signing contract: {e}") # for debugging
-        return jsonify({"error": "Database error"}), 500
\ No newline at end of file
+        return jsonify({"error": "Database error"}), 500
+
+
+@installer_bp.route('/installers/<int:user_id>/contract/signature', methods=['GET'])
+@jwt_required()
+def get_contract_signature(user_id):
+    # The installer themself or an admin. The only place signature bytes are read.
+    viewer = User.query.get(get_jwt_identity())
+    if not viewer or (viewer.id != user_id and viewer.role != 'admin'):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    # Cheap columns first: a revalidation never touches the image
+    contract = SignedContract.query.filter_by(user_id=user_id).first()
+    if not contract:
+        return jsonify({"error": "No signed contract"}), 404
+    etag = make_etag('signature', contract.id, contract.created_at)
+    if is_not_modified(etag):
+        return not_modified_response(etag)
+
+    db.session.refresh(contract, ['signature_data'])
+    response = current_app.response_class(contract.iter_signature(), mimetype=contract.signature_mimetype)
+    response.content_length = contract.signature_size
+    return with_validators(response, etag)
+
+
+# --- LEAD STATUS AND REVIEWS ---
+
+@installer_bp.route('/installer-leads/<int:lead_id>/status', methods=['PUT'])
+@jwt_required()
+def update_lead_status(lead_id):
+    installer_id = int(get_jwt_identity())
+    lead = QuoteRequest.query.get(lead_id)
+    if not lead or lead.installer_id != installer_id:
+        return jsonify({"error": "Lead not found"}), 404
+
+    status = (request.get_json() or {}).get('status')
+    if status not in LEAD_STATUSES:
+        return jsonify({"error": f"status must be one of: {', '.join(LEAD_STATUSES)}"}), 400
+
+    if status != lead.status:
+        installer_stats_service.record_lead_status_change(installer_id, lead.status, status)
+        lead.status = status
+        db.session.commit()
+    return jsonify({"id": lead.id, "status": lead.status}), 200
+
+@installer_bp.route('/quote-requests/<int:request_id>/review', methods=['POST'])
+@jwt_required()
+def review_installer(request_id):
+    customer_id = int(get_jwt_identity())
+    lead = QuoteRequest.query.get(request_id)
+    if not lead or lead.customer_id != customer_id:
+        return jsonify({"error": "Quote request not found"}), 404
+    if lead.status != 'Completed':
+        return jsonify({"error": "You can review an installer once the job is completed"}), 400
+    if InstallerReview.query.filter_by(quote_request_id=lead.id).first():
+        return jsonify({"message": "You have already reviewed this job"}), 409
+
+    data = request.get_json() or {}
+    rating = data.get('rating')
+    if not isinstance(rating, int) or isinstance(rating, bool) or not 1 <= rating <= 5:
+        return jsonify({"error": "rating must be a whole number from 1 to 5"}), 400
+
+    review = InstallerReview(
+        quote_request_id=lead.id,
+        installer_id=lead.installer_id,
+        customer_id=customer_id,
+        rating=rating,
+        comment=data.get('comment')
+    )
+    db.session.add(review)
+    installer_stats_service.record_review(lead.installer_id, rating)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request reviewed the same job between our check and insert
+        db.session.rollback()
+        return jsonify({"message": "You have already reviewed this job"}), 409
+    invalidate_tags('installer-ratings')
+
+    return jsonify({"id": review.id, "rating": review.rating, "comment": review.comment}), 201
+
+
+@installer_bp.route('/installers/<int:user_id>/service-area', methods=['PUT'])
+@jwt_required()
+def update_service_area(user_id):
+    # An installer sets where they work: a point and how far they travel from it
+    if str(user_id) != get_jwt_identity():
+        return jsonify({"error": "Unauthorized"}), 403
+
+    user = User.query.get(user_id)
+    if not user or user.role != 'installer':
+        return jsonify({"error": "Only installers have a service area"}), 403
+
+    data = request.get_json() or {}
+    try:
+        latitude = float(data.get('latitude', user.latitude))
+        longitude = float(data.get('longitude', user.longitude))
+        radius = data.get('service_radius_km', user.service_radius_km)
+        radius = float(radius) if radius is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "latitude, longitude and service_radius_km must be numbers"}), 400
+
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return jsonify({"error": "Invalid coordinates"}), 400
+    if radius is not None and not (0 < radius <= 1000):
+        return jsonify({"error": "service_radius_km must be between 0 and 1000"}), 400
+
+    user.latitude, user.longitude, user.service_radius_km = latitude, longitude, radius
+    db.session.commit()
+    invalidate_tags('installers') # Every worker rebuilds its matching index
+
+    return jsonify({
+        "latitude": user.latitude,
+        "longitude": user.longitude,
+        "service_radius_km": user.service_radius_km or current_app.config['DEFAULT_SERVICE_RADIUS_KM']
+    }), 200
@@ -1,16 +1,15 @@
 # run_tasks.py
+import os
 import sys
-from celery_config import celery
-from kombu.simple import SimpleQueue
 
-QUEUE_NAME = 'celery'
+# One short-lived process: no connection pool (see utils/db_engines.py)
+os.environ.setdefault('DB_ENGINE_PROFILE', 'cron-drain')
+from celery_config import celery, queue_depth
 
 def get_pending_task_count():
     """Checks Redis for pending tasks without needing a full worker."""
     try:
-        with celery.broker_connection() as conn:
-            simple_queue = SimpleQueue(conn, QUEUE_NAME)
-            return simple_queue.qsize()
+        return queue_depth()
     except Exception as e:
         print(f"Error connecting to Redis: {e}")
         return 0
@@ -0,0 +1,167 @@
+import json
+from datetime import datetime, timedelta, timezone
+import redis
+from flask import current_app
+from sqlalchemy import event, insert, select
+from sqlalchemy.orm import Session
+from extensions import db
+from models.activity import ActivityEvent, ActivityEventArchive
+from utils.redis_client import get_redis, report_redis_error
+
+# Capped Redis list holding the newest events, newest first
+FEED_KEY = 'activity:recent'
+
+# --- Event types ---
+USER_REGISTERED = 'user_registered'
+INSTALLER_ADDED = 'installer_added'
+INSTALLERS_IMPORTED = 'installers_imported'
+CONTRACT_SIGNED = 'contract_signed'
+ANALYSIS_COMPLETE = 'analysis_complete'
+QUOTE_REQUESTED = 'quote_requested'
+
+
+def log_activity(event_type, text, actor_id=None, subject_id=None):
+    """
+    Append an event to the log. It is written with the caller's commit and
+    pushed to the Redis feed only once that commit succeeds.
+    """
+    activity = ActivityEvent(type=event_type, text=text[:255], actor_id=actor_id, subject_id=subject_id)
+    db.session.add(activity)
+    return activity
+
+
+def _serialize(activity):
+    return json.dumps({
+        "id": activity.id,
+        "type": activity.type,
+        "text": activity.text,
+        "created_at": activity.created_at.isoformat()
+    })
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_new_events(session, flush_context):
+    # Serialize now: ids/created_at are populated and nothing is expired yet
+    pending = [_serialize(obj) for obj in session.new if isinstance(obj, ActivityEvent)]
+    if pending:
+        session.info.setdefault('pending_activity', []).extend(pending)
+
+
+@event.listens_for(Session, 'after_commit')
+def _mirror_to_feed(session):
+    pending = session.info.pop('pending_activity', None)
+    if pending:
+        _push_to_feed(pending)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_pending(session):
+    session.info.pop('pending_activity', None)
+
+
+def _push_to_feed(serialized_events):
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline(transaction=True)
+        pipe.lpush(FEED_KEY, *serialized_events)
+        pipe.ltrim(FEED_KEY, 0, current_app.config['ACTIVITY_FEED_SIZE'] - 1)
+        pipe.execute()
+    except redis.RedisError as e:
+        report_redis_error(e)
+
+
+def _rewarm_feed(rows):
+    """Replace the Redis list with `rows` (newest first) from the table."""
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline(transaction=True)
+        pipe.delete(FEED_KEY)
+        if rows:
+            pipe.rpush(FEED_KEY, *[_serialize(row) for row in rows])
+        pipe.execute()
+    except redis.RedisError as e:
+        report_redis_error(e)
+
+
+def time_ago(moment, now=None):
+    now = now or datetime.now(timezone.utc)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    seconds = max(0, int((now - moment).total_seconds()))
+
+    if seconds < 60:
+        return "just now"
+    for unit, size in (("day", 86400), ("hour", 3600), ("min", 60)):
+        if seconds >= size:
+            count = seconds // size
+            if unit == "min":
+                return f"{count} min ago"
+            return f"{count} {unit}{'s' if count > 1 else ''} ago"
+
+
+def recent_activity(limit=None):
+    """
+    Latest events for the admin dashboard. Reads the capped Redis list
+    (a single LRANGE). If the list holds fewer items than asked for (Redis
+    restarted or evicted it, and only newer events were pushed since), it
+    falls back to the newest rows of activity_events and rebuilds the list.
+    """
+    limit = min(limit or current_app.config['ACTIVITY_FEED_SIZE'], current_app.config['ACTIVITY_FEED_SIZE'])
+    items = None
+
+    client = get_redis()
+    if client is not None:
+        try:
+            cached = client.lrange(FEED_KEY, 0, limit - 1)
+            if len(cached) == limit:
+                items = [json.loads(raw) for raw in cached]
+        except redis.RedisError as e:
+            report_redis_error(e)
+
+    if items is None:
+        rows = ActivityEvent.query.order_by(ActivityEvent.id.desc()).limit(current_app.config['ACTIVITY_FEED_SIZE']).all()
+        if client is not None:
+            _rewarm_feed(rows)
+        items = [json.loads(_serialize(row)) for row in rows[:limit]]
+
+    now = datetime.now(timezone.utc)
+    for item in items:
+        item["time_ago"] = time_ago(datetime.fromisoformat(item["created_at"]), now)
+    return items
+
+
+def archive_events(older_than_days=None, batch_size=1000):
+    """
+    Move events older than the retention window into activity_events_archive,
+    oldest first, one committed batch at a time so locks stay short.
+    Returns the number of events archived.
+    """
+    days = older_than_days or current_app.config['ACTIVITY_RETENTION_DAYS']
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    columns = [ActivityEvent.id, ActivityEvent.type, ActivityEvent.text,
+               ActivityEvent.actor_id, ActivityEvent.subject_id, ActivityEvent.created_at]
+    archived = 0
+
+    while True:
+        ids = db.session.scalars(
+            select(ActivityEvent.id)
+            .where(ActivityEvent.created_at < cutoff)
+            .order_by(ActivityEvent.id)
+            .limit(batch_size)
+        ).all()
+        if not ids:
+            break
+
+        db.session.execute(insert(ActivityEventArchive).from_select(
+            [c.key for c in columns],
+            select(*columns).where(ActivityEvent.id.in_(ids))
+        ))
+        db.session.execute(ActivityEvent.__table__.delete().where(ActivityEvent.id.in_(ids)))
+        db.session.commit()
+        archived += len(ids)
+
+    return archived
@@ -0,0 +1,50 @@
+import os
+from flask_mail import Message
+
+
+def installer_welcome_message(full_name, email, user_name, temp_password):
+    """
+    Welcome email with the temporary credentials for a newly created installer.
+    """
+    login_url = f"{os.environ.get('FRONTEND_URL', 'http://localhost:5173')}/login"
+
+    msg = Message(
+        subject="Welcome to SolarMatch Kenya!",
+        recipients=[email],
+        # Uses MAIL_DEFAULT_SENDER from config
+    )
+    msg.html = f"""
+    <p>Hello {full_name},</p>
+    <p>Welcome to SolarMatch Kenya! An administrator has created an installer account for you.</p>
+    <p>Please use the following temporary credentials to log in:</p>
+    <ul>
+        <li><strong>Username:</strong> {user_name}</li>
+        <li><strong>Temporary Password:</strong> {temp_password}</li>
+    </ul>
+    <p>You can log in here: <a href="{login_url}">{login_url}</a></p>
+    <p><strong>Important:</strong> You will be required to set a new password immediately after your first login.</p>
+    <p>Best regards,<br>The SolarMatch Kenya Team</p>
+    """
+    return msg
+
+
+def lead_digest_message(full_name, email, leads):
+    """
+    One email telling an installer about the new leads routed to them.
+    `leads` rows carry the customer's full_name and county.
+    """
+    leads_url = f"{os.environ.get('FRONTEND_URL', 'http://localhost:5173')}/installer/leads"
+    items = "".join(f"<li>{lead.full_name} ({lead.county or 'N/A'})</li>" for lead in leads)
+
+    msg = Message(
+        subject=f"SolarMatch Kenya: {len(leads)} new lead{'s' if len(leads) != 1 else ''} for you",
+        recipients=[email],
+    )
+    msg.html = f"""
+    <p>Hello {full_name},</p>
+    <p>These customers have completed a roof analysis and were matched to you:</p>
+    <ul>{items}</ul>
+    <p>See the details and reply to them here: <a href="{leads_url}">{leads_url}</a></p>
+    <p>Best regards,<br>The SolarMatch Kenya Team</p>
+    """
+    return msg
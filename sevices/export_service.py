@@ -0,0 +1,181 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from sqlalchemy import func, select
+from extensions import db
+from models.user import User
+from models.analysis import AnalysisRequest, AnalysisResult
+from models.quote_request import QuoteRequest
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson'
+}
+
+# Rows fetched from the server-side cursor per chunk; also one HTTP chunk
+CHUNK_SIZE = 1000
+
+
+def _count_by(column):
+    """(key, n) subquery counting rows per `column`, joined in only when a count column is asked for."""
+    return select(column.label('key'), func.count().label('n')).group_by(column).subquery()
+
+
+def _dataset(name):
+    """
+    Returns (base_select_from, columns, joins, where, order_by) for a dataset.
+    columns maps export name -> (expression, join name or None);
+    joins maps join name -> (subquery, onclause builder).
+    """
+    analyses_per_user = _count_by(AnalysisRequest.user_id)
+    quotes_sent = _count_by(QuoteRequest.customer_id)
+    leads_received = _count_by(QuoteRequest.installer_id)
+
+    if name == 'users':
+        joins = {
+            'analyses': (analyses_per_user, lambda sq: sq.c.key == User.id),
+            'quotes': (quotes_sent, lambda sq: sq.c.key == User.id),
+        }
+        columns = {
+            'id': (User.id, None),
+            'full_name': (User.full_name, None),
+            'email': (User.email, None),
+            'phone_number': (User.phone_number, None),
+            'user_name': (User.user_name, None),
+            'county': (User.county, None),
+            'role': (User.role, None),
+            'created_at': (User.created_at, None),
+            'analyses_count': (func.coalesce(analyses_per_user.c.n, 0), 'analyses'),
+            'quote_requests_sent': (func.coalesce(quotes_sent.c.n, 0), 'quotes'),
+        }
+        return User, columns, joins, [User.role.in_(['customer', 'banned'])], User.id
+
+    if name == 'installers':
+        joins = {
+            'leads': (leads_received, lambda sq: sq.c.key == User.id),
+        }
+        columns = {
+            'id': (User.id, None),
+            'full_name': (User.full_name, None),
+            'email': (User.email, None),
+            'phone_number': (User.phone_number, None),
+            'user_name': (User.user_name, None),
+            'county': (User.county, None),
+            'installer_category': (User.installer_category, None),
+            'contract_accepted': (User.contract_accepted, None),
+            'created_at': (User.created_at, None),
+            'leads_received': (func.coalesce(leads_received.c.n, 0), 'leads'),
+        }
+        return User, columns, joins, [User.role == 'installer'], User.id
+
+    if name == 'analyses':
+        joins = {
+            'result': (AnalysisResult, lambda t: t.request_id == AnalysisRequest.id),
+            'customer': (User, lambda t: t.id == AnalysisRequest.user_id),
+            'quotes': (quotes_sent, lambda sq: sq.c.key == AnalysisRequest.user_id),
+        }
+        columns = {
+            'id': (AnalysisRequest.id, None),
+            'customer_id': (AnalysisRequest.user_id, None),
+            'customer_name': (User.full_name, 'customer'),
+            'customer_email': (User.email, 'customer'),
+            'address': (AnalysisRequest.address, None),
+            'latitude': (AnalysisRequest.latitude, None),
+            'longitude': (AnalysisRequest.longitude, None),
+            'energy_consumption': (AnalysisRequest.energy_consumption, None),
+            'roof_type': (AnalysisRequest.roof_type_manual, None),
+            'created_at': (AnalysisRequest.created_at, None),
+            'status': (AnalysisResult.status, 'result'),
+            'completed_at': (AnalysisResult.completed_at, 'result'),
+            'solar_suitability_score': (AnalysisResult.solar_suitability_score, 'result'),
+            'system_size_kw': (AnalysisResult.system_size_kw, 'result'),
+            'panel_count': (AnalysisResult.panel_count, 'result'),
+            'annual_production_kwh': (AnalysisResult.annual_production_kwh, 'result'),
+            'annual_savings_ksh': (AnalysisResult.annual_savings_ksh, 'result'),
+            'payback_period_years': (AnalysisResult.payback_period_years, 'result'),
+            'customer_quote_requests': (func.coalesce(quotes_sent.c.n, 0), 'quotes'),
+        }
+        return AnalysisRequest, columns, joins, [], AnalysisRequest.id
+
+    raise KeyError(name)
+
+
+DATASETS = ['users', 'installers', 'analyses']
+
+
+def available_columns(dataset):
+    return list(_dataset(dataset)[1])
+
+
+def build_export_query(dataset, column_names=None):
+    """
+    SELECT for the requested columns, LEFT JOINing only what those columns need.
+    Raises KeyError for an unknown dataset and ValueError for unknown columns.
+    """
+    base, columns, joins, where, order_by = _dataset(dataset)
+    column_names = column_names or list(columns)
+    unknown = [c for c in column_names if c not in columns]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+
+    stmt = select(*[columns[c][0].label(c) for c in column_names]).select_from(base)
+    for join_name in dict.fromkeys(columns[c][1] for c in column_names if columns[c][1]):
+        target, onclause = joins[join_name]
+        stmt = stmt.outerjoin(target, onclause(target))
+    return stmt.where(*where).order_by(order_by)
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+# Spreadsheet apps run cells starting with these as formulas
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_cell(value):
+    value = _plain(value)
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _encode_chunk(fmt, rows, column_names):
+    buf = io.StringIO()
+    if fmt == 'csv':
+        csv.writer(buf).writerows([_csv_cell(v) for v in row] for row in rows)
+    else:
+        for row in rows:
+            buf.write(json.dumps(dict(zip(column_names, map(_plain, row)))))
+            buf.write('\n')
+    return buf.getvalue().encode('utf-8')
+
+
+def stream_export(stmt, fmt, column_names, gzip=False):
+    """
+    Generator of response body chunks. Rows come off a server-side cursor
+    CHUNK_SIZE at a time, so memory stays flat however big the export is.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None # wbits=31 -> gzip container
+
+    def emit(chunk):
+        return compressor.compress(chunk) if compressor else chunk
+
+    if fmt == 'csv':
+        # Header goes out before the query even runs
+        header = io.StringIO()
+        csv.writer(header).writerow(column_names)
+        yield emit(header.getvalue().encode('utf-8'))
+
+    result = db.session.execute(stmt.execution_options(yield_per=CHUNK_SIZE))
+    for rows in result.partitions():
+        chunk = emit(_encode_chunk(fmt, rows, column_names))
+        if chunk:
+            yield chunk
+
+    if compressor:
+        yield compressor.flush()
@@ -1,20 +1,31 @@
 import os
-import google.generativeai as genai
 from flask import current_app, json
-import requests
 import io 
 import math
-from PIL import Image
+from utils.metrics import external_call
 
-# Configure the API key from my .env file
-genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
+_genai = None
+
+def _gemini():
+    """
+    The Gemini SDK, imported and configured on first use: it takes a few
+    hundred ms to import, which web workers would otherwise pay at startup.
+    """
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+
+        # Configure the API key from my .env file
+        genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
+        _genai = genai
+    return _genai
 
 def get_solar_analysis(address, lat, lon, energy_kwh, roof_type):
     """
     Uses Gemini to get solar panel recommendations.
     """
     # Using the 'gemini-1.5-flash' model
-    model = genai.GenerativeModel('models/gemini-pro-latest')
+    model = _gemini().GenerativeModel('models/gemini-pro-latest')
 
     prompt = f"""
     You are a solar installation expert for Kenya.
@@ -56,7 +67,8 @@ def get_solar_analysis(address, lat, lon, energy_kwh, roof_type):
     """
 
     try:
-        response = model.generate_content(prompt)
+        with external_call('gemini'):
+            response = model.generate_content(prompt)
         json_text = response.text.strip().replace("```json", "").replace("```", "")
         data = json.loads(json_text)
         if "solar_suitability_score" in data:
@@ -80,12 +92,16 @@ def get_ar_layout(image_url, roof_type):
     Uses Gemini to suggest a 3D layout for AR.
     """
     # Using the 'gemini-1.5-flash' model
-    model = genai.GenerativeModel('models/gemini-2.5-flash-image')
+    import requests
+    from PIL import Image
+
+    model = _gemini().GenerativeModel('models/gemini-2.5-flash-image')
     
     try:
         # Download the image from the URL
-        image_response = requests.get(image_url)
-        image_response.raise_for_status() # Raise error if download fails
+        with external_call('cloudinary'): # roof_image_url is the Cloudinary upload
+            image_response = requests.get(image_url)
+            image_response.raise_for_status() # Raise error if download fails
         
         # Open the image from the downloaded bytes
         img = Image.open(io.BytesIO(image_response.content))
@@ -117,7 +133,8 @@ def get_ar_layout(image_url, roof_type):
         """
         
         # Send BOTH the text and the image to the model
-        response = model.generate_content([text_prompt, img])
+        with external_call('gemini'):
+            response = model.generate_content([text_prompt, img])
         
         json_text = response.text.strip().replace("```json", "").replace("```", "")
         layout_data = json.loads(json_text)
@@ -0,0 +1,138 @@
+import csv
+import io
+import re
+import secrets
+from flask import current_app
+from sqlalchemy import insert, select
+from extensions import db, bcrypt
+from models.user import User
+from utils.helpers import generate_username
+from sevices import stats_service, activity_service
+
+REQUIRED_COLUMNS = ['full_name', 'email', 'phone_number', 'county', 'installer_category']
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+class ImportFileError(ValueError):
+    """The file as a whole can't be imported (bad encoding, missing columns, too many rows)."""
+
+
+def parse_installer_csv(file_storage):
+    """
+    Reads and validates the upload in one pass.
+    Returns (valid_rows, report) where report has one entry per data row;
+    valid rows still need the database duplicate check.
+    """
+    try:
+        text = file_storage.read().decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise ImportFileError("File must be UTF-8 encoded CSV")
+
+    reader = csv.DictReader(io.StringIO(text))
+    headers = [h.strip().lower() for h in (reader.fieldnames or [])]
+    missing = [c for c in REQUIRED_COLUMNS if c not in headers]
+    if missing:
+        raise ImportFileError(f"Missing columns: {', '.join(missing)}")
+    reader.fieldnames = headers
+
+    max_rows = current_app.config['INSTALLER_IMPORT_MAX_ROWS']
+    valid_rows, report, seen_emails = [], [], set()
+
+    # Row numbers match what the admin sees in a spreadsheet (header is row 1)
+    for row_number, raw in enumerate(reader, start=2):
+        if len(report) >= max_rows:
+            raise ImportFileError(f"Too many rows (max {max_rows})")
+
+        row = {c: (raw.get(c) or '').strip() for c in REQUIRED_COLUMNS}
+        errors = [f"{c} is required" for c in REQUIRED_COLUMNS if not row[c]]
+        if row['email'] and not EMAIL_RE.match(row['email']):
+            errors.append("email is invalid")
+        elif row['email'].lower() in seen_emails:
+            errors.append("email appears more than once in this file")
+
+        entry = {"row": row_number, "email": row['email'], "status": "invalid" if errors else "valid"}
+        if errors:
+            entry["errors"] = errors
+        else:
+            seen_emails.add(row['email'].lower())
+            row["_report"] = entry
+            valid_rows.append(row)
+        report.append(entry)
+
+    return valid_rows, report
+
+
+def _unique_usernames(full_names):
+    """generate_username() per row, re-rolling clashes within the batch and with the DB."""
+    names = [generate_username(n, "installer") for n in full_names]
+    while True:
+        taken = set(db.session.scalars(select(User.user_name).where(User.user_name.in_(names))))
+        seen, clashes = set(), []
+        for i, name in enumerate(names):
+            if name in taken or name in seen:
+                clashes.append(i)
+            seen.add(name)
+        if not clashes:
+            return names
+        for i in clashes:
+            names[i] = generate_username(full_names[i], "installer")
+
+
+def import_installers(valid_rows, admin_id, dry_run=False):
+    """
+    Creates installers for rows whose email isn't already registered.
+    Returns the new user ids for the welcome email task, which sets each
+    installer's temporary password; until then nobody can log in as them.
+    """
+    if not valid_rows:
+        return []
+
+    # One set query for every email in the file
+    existing = set(db.session.scalars(
+        select(User.email).where(User.email.in_([r['email'] for r in valid_rows]))
+    ))
+    new_rows = []
+    for row in valid_rows:
+        if row['email'] in existing:
+            row['_report'].update(status="duplicate", errors=["email is already registered"])
+        else:
+            new_rows.append(row)
+
+    if dry_run or not new_rows:
+        return []
+
+    # Hash of a random secret nobody keeps: the accounts are locked until the
+    # welcome task gives them a temporary password
+    locked_hash = bcrypt.generate_password_hash(secrets.token_urlsafe(32)).decode("utf-8")
+    user_names = _unique_usernames([r['full_name'] for r in new_rows])
+
+    values = [{
+        "full_name": row['full_name'],
+        "email": row['email'],
+        "phone_number": row['phone_number'],
+        "county": row['county'],
+        "installer_category": row['installer_category'],
+        "role": "installer",
+        "user_name": user_name,
+        "password_hash": locked_hash,
+        "password_reset_required": True, # Force password change
+        "contract_accepted": False
+    } for row, user_name in zip(new_rows, user_names)]
+
+    # Multi-row INSERTs, one per batch
+    batch_size = current_app.config['INSTALLER_IMPORT_BATCH_SIZE']
+    created_ids = {}
+    for start in range(0, len(values), batch_size):
+        result = db.session.execute(
+            insert(User).returning(User.id, User.email),
+            values[start:start + batch_size]
+        )
+        created_ids.update({email: user_id for user_id, email in result})
+
+    stats_service.record_new_user("installer", count=len(new_rows))
+    activity_service.log_activity(activity_service.INSTALLERS_IMPORTED, f"{len(new_rows)} installers", actor_id=admin_id)
+    db.session.commit()
+
+    for row, value in zip(new_rows, values):
+        row['_report'].update(status="created", user_id=created_ids.get(row['email']), user_name=value['user_name'])
+    return [created_ids[row['email']] for row in new_rows]
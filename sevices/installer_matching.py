@@ -0,0 +1,149 @@
+import math
+import threading
+import time
+from flask import current_app
+from models.user import User
+from utils.cache import on_invalidate
+from utils.kenya_counties import county_centroid
+
+EARTH_RADIUS_KM = 6371.0088
+
+# The live index; swapped wholesale on rebuild so readers never see a half-built tree
+_index = None
+_stale = True
+_build_lock = threading.Lock()
+
+
+def _to_xyz(lat, lon):
+    """Point on the unit sphere. Straight-line (chord) distance between two
+    of these grows with great-circle distance, so a plain 3-D k-d tree works
+    without any special handling near the poles or the antimeridian."""
+    lat, lon = math.radians(lat), math.radians(lon)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+
+def _chord(km):
+    return 2 * math.sin(min(km / EARTH_RADIUS_KM, math.pi) / 2)
+
+
+def _km(chord):
+    return 2 * EARTH_RADIUS_KM * math.asin(min(chord / 2, 1.0))
+
+
+def _build_tree(points, depth=0):
+    """points: list of (xyz, entry index). Nodes are (xyz, index, axis, left, right)."""
+    if not points:
+        return None
+    axis = depth % 3
+    points.sort(key=lambda p: p[0][axis])
+    mid = len(points) // 2
+    xyz, index = points[mid]
+    return (xyz, index, axis, _build_tree(points[:mid], depth + 1), _build_tree(points[mid + 1:], depth + 1))
+
+
+def _within(root, target, max_chord):
+    """(squared chord, entry index) for every point within max_chord of target."""
+    max_sq = max_chord * max_chord
+    found, stack = [], [root]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        xyz, index, axis, left, right = node
+        d_sq = (xyz[0] - target[0]) ** 2 + (xyz[1] - target[1]) ** 2 + (xyz[2] - target[2]) ** 2
+        if d_sq <= max_sq:
+            found.append((d_sq, index))
+        diff = target[axis] - xyz[axis]
+        near, far = (left, right) if diff < 0 else (right, left)
+        stack.append(near)
+        if diff * diff <= max_sq: # The splitting plane is within reach, so the far side may be too
+            stack.append(far)
+    return found
+
+
+class InstallerIndex:
+    """Qualified installers (contract accepted, placeable on the map) in a k-d tree."""
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.max_radius_km = max((e["service_radius_km"] for e in entries), default=0)
+        self.root = _build_tree([(_to_xyz(e["latitude"], e["longitude"]), i) for i, e in enumerate(entries)])
+        self.built_at = time.monotonic()
+
+    def nearest(self, lat, lon, limit, category=None):
+        """
+        Up to `limit` installers whose service area covers (lat, lon).
+        With a category, installers offering it come first; ties go to the nearest.
+        """
+        if self.root is None:
+            return []
+        target = _to_xyz(lat, lon)
+        category = category.lower() if category else None
+
+        candidates = []
+        for d_sq, index in _within(self.root, target, _chord(self.max_radius_km)):
+            entry = self.entries[index]
+            distance_km = _km(math.sqrt(d_sq))
+            if distance_km > entry["service_radius_km"]:
+                continue
+            mismatch = bool(category) and (entry["category"] or "").lower() != category
+            candidates.append((mismatch, distance_km, entry))
+
+        candidates.sort(key=lambda c: (c[0], c[1]))
+        return [dict(entry, distance_km=round(distance_km, 1)) for _, distance_km, entry in candidates[:limit]]
+
+
+def _load_entries():
+    default_radius = current_app.config['DEFAULT_SERVICE_RADIUS_KM']
+    rows = User.query.with_entities(
+        User.id, User.full_name, User.county, User.installer_category,
+        User.latitude, User.longitude, User.service_radius_km
+    ).filter(User.role == 'installer', User.contract_accepted.is_(True)).all()
+
+    entries = []
+    for row in rows:
+        if row.latitude is not None and row.longitude is not None:
+            lat, lon = row.latitude, row.longitude
+        else:
+            centroid = county_centroid(row.county)
+            if not centroid:
+                continue # Nowhere to put them on the map
+            lat, lon = centroid
+        entries.append({
+            "id": row.id,
+            "name": row.full_name,
+            "location": row.county or "N/A",
+            "category": row.installer_category,
+            "latitude": lat,
+            "longitude": lon,
+            "service_radius_km": row.service_radius_km or default_radius
+        })
+    return entries
+
+
+def mark_stale():
+    """Rebuild on next use. Runs on every 'installers' cache invalidation, in every worker."""
+    global _stale
+    _stale = True
+
+
+on_invalidate('installers', mark_stale)
+
+
+def get_index():
+    global _index, _stale
+    max_age = current_app.config['INSTALLER_INDEX_MAX_AGE']
+    index = _index
+    if index is not None and not _stale and time.monotonic() - index.built_at < max_age:
+        return index
+
+    with _build_lock:
+        # Another thread may have rebuilt it while we waited
+        if _index is None or _stale or time.monotonic() - _index.built_at >= max_age:
+            _stale = False # Cleared first: an invalidation during the build triggers another
+            _index = InstallerIndex(_load_entries())
+        return _index
+
+
+def nearest_installers(lat, lon, limit=10, category=None):
+    return get_index().nearest(lat, lon, limit, category)
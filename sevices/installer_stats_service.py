@@ -0,0 +1,122 @@
+from flask import current_app
+from sqlalchemy import func, case, cast, Float
+from extensions import db
+from models.stats import InstallerStats, LeadStatusCount
+from models.review import InstallerReview
+from models.quote_request import QuoteRequest, LEAD_STATUSES, CONVERTED_STATUSES
+from utils.db_helpers import upsert_insert
+from utils.cache import invalidate_tags
+
+
+def _bayesian(rating_sum, review_count):
+    """Works on numbers and on SQL expressions alike."""
+    prior_mean = current_app.config['REVIEW_PRIOR_MEAN']
+    prior_weight = current_app.config['REVIEW_PRIOR_WEIGHT']
+    return (prior_weight * prior_mean + rating_sum) / (prior_weight + review_count)
+
+
+def _apply(installer_id, reviews=0, rating=0, leads=0, converted=0):
+    """
+    Atomically add deltas to an installer's row (creating it if needed) and
+    recompute the derived columns in the same statement. Runs on the caller's
+    session, so it commits with the write that caused it.
+    """
+    stmt = upsert_insert(InstallerStats).values(
+        installer_id=installer_id,
+        review_count=reviews,
+        rating_sum=rating,
+        bayesian_rating=_bayesian(rating, reviews),
+        lead_count=leads,
+        qualified_count=converted,
+        conversion_rate=converted / leads if leads else 0.0
+    )
+    review_count = InstallerStats.review_count + reviews
+    rating_sum = InstallerStats.rating_sum + rating
+    lead_count = InstallerStats.lead_count + leads
+    qualified_count = InstallerStats.qualified_count + converted
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['installer_id'],
+        set_={
+            'review_count': review_count,
+            'rating_sum': rating_sum,
+            'bayesian_rating': _bayesian(cast(rating_sum, Float), review_count),
+            'lead_count': lead_count,
+            'qualified_count': qualified_count,
+            'conversion_rate': case((lead_count > 0, cast(qualified_count, Float) / lead_count), else_=0.0)
+        }
+    ))
+
+
+def _bump_status(installer_id, status, amount):
+    stmt = upsert_insert(LeadStatusCount).values(installer_id=installer_id, status=status, count=amount)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['installer_id', 'status'],
+        set_={'count': LeadStatusCount.count + stmt.excluded.count}
+    ))
+
+
+# --- Write-path hooks (call before the commit that creates/changes the row) ---
+
+def record_lead(installer_id, count=1, status='New'):
+    _apply(installer_id, leads=count, converted=count if status in CONVERTED_STATUSES else 0)
+    _bump_status(installer_id, status, count)
+
+
+def record_lead_status_change(installer_id, old_status, new_status):
+    converted = int(new_status in CONVERTED_STATUSES) - int(old_status in CONVERTED_STATUSES)
+    if converted:
+        _apply(installer_id, converted=converted)
+    _bump_status(installer_id, old_status, -1)
+    _bump_status(installer_id, new_status, 1)
+
+
+def lead_status_counts(installer_id):
+    """{status: count} for every lead status, zeros included."""
+    counts = dict.fromkeys(LEAD_STATUSES, 0)
+    counts.update(db.session.query(LeadStatusCount.status, LeadStatusCount.count).filter(
+        LeadStatusCount.installer_id == installer_id
+    ))
+    return counts
+
+
+def record_review(installer_id, rating):
+    _apply(installer_id, reviews=1, rating=rating)
+
+
+# --- Periodic reconciliation ---
+
+def rebuild_installer_stats():
+    """
+    Recompute installer_stats and lead_status_counts from quote_requests and
+    installer_reviews. Commits.
+    """
+    rows, status_counts = {}, []
+
+    def row(installer_id):
+        return rows.setdefault(installer_id, {"review_count": 0, "rating_sum": 0, "lead_count": 0, "qualified_count": 0})
+
+    for installer_id, status, count in db.session.query(
+        QuoteRequest.installer_id, QuoteRequest.status, func.count(QuoteRequest.id)
+    ).group_by(QuoteRequest.installer_id, QuoteRequest.status):
+        status_counts.append(LeadStatusCount(installer_id=installer_id, status=status, count=count))
+        row(installer_id)["lead_count"] += count
+        if status in CONVERTED_STATUSES:
+            row(installer_id)["qualified_count"] += count
+
+    for installer_id, reviews, rating_sum in db.session.query(
+        InstallerReview.installer_id, func.count(InstallerReview.id), func.sum(InstallerReview.rating)
+    ).group_by(InstallerReview.installer_id):
+        row(installer_id).update(review_count=reviews, rating_sum=int(rating_sum or 0))
+
+    InstallerStats.query.delete(synchronize_session=False)
+    LeadStatusCount.query.delete(synchronize_session=False)
+    db.session.add_all(status_counts)
+    db.session.add_all(InstallerStats(
+        installer_id=installer_id,
+        bayesian_rating=_bayesian(r["rating_sum"], r["review_count"]),
+        conversion_rate=r["qualified_count"] / r["lead_count"] if r["lead_count"] else 0.0,
+        **r
+    ) for installer_id, r in rows.items())
+    db.session.commit()
+    invalidate_tags('installer-ratings')
+    return len(rows)
@@ -0,0 +1,89 @@
+from flask import current_app
+from sqlalchemy import func, literal, select
+from extensions import db
+from models.quote_request import QuoteRequest
+from models.user import User
+from models.stats import InstallerStats, LeadStatusCount
+from sevices import installer_stats_service
+from sevices.installer_matching import nearest_installers
+from utils.db_helpers import upsert_insert
+
+# Leads still waiting on the installer; these count against their capacity
+OPEN_STATUSES = ('New', 'Contacted')
+# Nearby installers looked at per installer routed to, so a few at capacity don't empty the list
+CANDIDATE_FACTOR = 4
+
+
+def create_quote_requests(customer_id, installer_ids):
+    """
+    New leads from one customer to several installers in a single
+    INSERT ... SELECT ... ON CONFLICT DO NOTHING RETURNING. The SELECT keeps
+    only ids that belong to installers; the unique constraint skips pairs
+    that already exist, so concurrent requests can't duplicate a lead.
+    Updates the installers' lead counters. Doesn't commit.
+    Returns {installer_id: quote_request_id} for the leads created.
+    """
+    if not installer_ids:
+        return {}
+    installers = select(literal(customer_id), User.id, literal('New')).where(
+        User.id.in_(installer_ids), User.role == 'installer'
+    )
+    stmt = upsert_insert(QuoteRequest).from_select(
+        ['customer_id', 'installer_id', 'status'], installers
+    ).on_conflict_do_nothing(
+        index_elements=['customer_id', 'installer_id']
+    ).returning(QuoteRequest.installer_id, QuoteRequest.id)
+
+    created = dict(db.session.execute(stmt).all())
+    for installer_id in created:
+        installer_stats_service.record_lead(installer_id)
+    return created
+
+
+def select_installers(lat, lon, k, category=None):
+    """
+    Best `k` installers for a point. The k-d tree narrows things to installers
+    whose service area covers it; those are ranked by category, then rating
+    (to one decimal, so near-ties go to the nearer installer), then distance,
+    skipping anyone already at capacity. Two small IN queries on top of the
+    index lookup, however many installers there are.
+    """
+    candidates = nearest_installers(lat, lon, limit=k * CANDIDATE_FACTOR, category=category)
+    if not candidates:
+        return []
+    ids = [c["id"] for c in candidates]
+
+    open_leads = dict(db.session.query(LeadStatusCount.installer_id, func.sum(LeadStatusCount.count)).filter(
+        LeadStatusCount.installer_id.in_(ids), LeadStatusCount.status.in_(OPEN_STATUSES)
+    ).group_by(LeadStatusCount.installer_id))
+    ratings = dict(db.session.query(InstallerStats.installer_id, InstallerStats.bayesian_rating).filter(
+        InstallerStats.installer_id.in_(ids)
+    ))
+
+    capacity = current_app.config['INSTALLER_OPEN_LEAD_CAPACITY']
+    prior = current_app.config['REVIEW_PRIOR_MEAN']
+    category = (category or "").lower()
+    available = [c for c in candidates if (open_leads.get(c["id"]) or 0) < capacity]
+    available.sort(key=lambda c: (
+        bool(category) and (c["category"] or "").lower() != category,
+        -round(ratings.get(c["id"], prior), 1),
+        c["distance_km"]
+    ))
+    return available[:k]
+
+
+def route_analysis(analysis):
+    """
+    Sends quote requests for a completed analysis to its best-matching
+    installers, leaving out any this customer has already contacted. All the
+    new leads go in one INSERT. Doesn't commit.
+    Returns {installer_id: quote_request_id} for the leads created.
+    """
+    if analysis.latitude is None or analysis.longitude is None:
+        return {}
+    picked = select_installers(
+        analysis.latitude, analysis.longitude,
+        current_app.config['AUTO_ROUTE_INSTALLERS'], current_app.config['AUTO_ROUTE_CATEGORY']
+    )
+    installer_ids = [p["id"] for p in picked if p["id"] != analysis.user_id]
+    return create_quote_requests(analysis.user_id, installer_ids)
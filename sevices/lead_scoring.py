@@ -0,0 +1,105 @@
+from sqlalchemy import select, update
+from extensions import db
+from models.analysis import AnalysisRequest, AnalysisResult
+
+# --- Scoring model ---
+# Each input is scaled to 0..1 against the value at which it stops mattering,
+# then weighted. Missing figures count as 0, so a result always gets a score.
+# (weight, value that earns the full weight)
+WEIGHTS = {
+    'suitability': (0.35, 100),   # solar_suitability_score, 0-100
+    'system_size': (0.20, 10),    # system_size_kw
+    'savings': (0.20, 200000),    # annual_savings_ksh
+    'payback': (0.15, None),      # payback_period_years, shorter is better (see _payback_part)
+    'consumption': (0.10, 1000),  # energy_consumption, kWh per month
+}
+# Paybacks at or under the first figure score full marks, at or over the second score nothing
+PAYBACK_BEST_YEARS, PAYBACK_WORST_YEARS = 3.0, 12.0
+
+# Highest tier whose floor the score reaches
+TIERS = [(70, 'High'), (45, 'Medium'), (0, 'Low')]
+LEAD_TIERS = [name for _, name in TIERS]
+
+
+def _capped(values, full):
+    return [min(max(v or 0, 0) / full, 1.0) for v in values]
+
+
+def _payback_part(values):
+    span = PAYBACK_WORST_YEARS - PAYBACK_BEST_YEARS
+    return [
+        0.0 if v is None else min(max((PAYBACK_WORST_YEARS - v) / span, 0.0), 1.0)
+        for v in values
+    ]
+
+
+def tier_for(score):
+    for floor, name in TIERS:
+        if score >= floor:
+            return name
+    return TIERS[-1][1]
+
+
+def score_batch(suitability, system_size, savings, payback, consumption):
+    """
+    Scores many results at once. Takes one list per input (same length,
+    None for missing) and returns a list of (score, tier), score 0-100.
+    Works column by column so a backfill is a handful of list passes
+    rather than a function call per field per row.
+    """
+    parts = {
+        'suitability': _capped(suitability, WEIGHTS['suitability'][1]),
+        'system_size': _capped(system_size, WEIGHTS['system_size'][1]),
+        'savings': _capped(savings, WEIGHTS['savings'][1]),
+        'payback': _payback_part(payback),
+        'consumption': _capped(consumption, WEIGHTS['consumption'][1]),
+    }
+    totals = [0.0] * len(suitability)
+    for name, column in parts.items():
+        weight = WEIGHTS[name][0]
+        totals = [t + weight * c for t, c in zip(totals, column)]
+    return [(round(t * 100, 1), tier_for(t * 100)) for t in totals]
+
+
+def score_result(result, request):
+    """Sets lead_score/lead_tier on one AnalysisResult. Doesn't commit."""
+    [(result.lead_score, result.lead_tier)] = score_batch(
+        [result.solar_suitability_score], [result.system_size_kw], [result.annual_savings_ksh],
+        [result.payback_period_years], [request.energy_consumption]
+    )
+
+
+def backfill_scores(batch_size=1000, only_missing=True):
+    """
+    Scores every completed result, walking analysis_results by id in
+    batches: one SELECT, one in-memory score_batch and one executemany
+    UPDATE per batch. Commits per batch. Returns the number of rows scored.
+    """
+    scored, last_id = 0, 0
+    while True:
+        query = select(
+            AnalysisResult.id, AnalysisResult.solar_suitability_score, AnalysisResult.system_size_kw,
+            AnalysisResult.annual_savings_ksh, AnalysisResult.payback_period_years,
+            AnalysisRequest.energy_consumption
+        ).join(
+            AnalysisRequest, AnalysisRequest.id == AnalysisResult.request_id
+        ).where(
+            AnalysisResult.status == 'COMPLETED', AnalysisResult.id > last_id
+        ).order_by(AnalysisResult.id).limit(batch_size)
+        if only_missing:
+            query = query.where(AnalysisResult.lead_score.is_(None))
+
+        rows = db.session.execute(query).all()
+        if not rows:
+            break
+
+        ids, *columns = zip(*rows)
+        scores = score_batch(*map(list, columns))
+        db.session.execute(update(AnalysisResult), [
+            {"id": result_id, "lead_score": score, "lead_tier": tier}
+            for result_id, (score, tier) in zip(ids, scores)
+        ])
+        db.session.commit()
+        scored += len(rows)
+        last_id = ids[-1]
+    return scored
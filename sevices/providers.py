@@ -0,0 +1,234 @@
+"""
+The outside services the analysis pipeline calls (Gemini, the Aerial View
+API and Cloudinary), behind one switch, EXTERNAL_PROVIDERS:
+
+  live    the real services
+  fake    local stand-ins returning realistic payloads, with the latency
+          and failure rate set in FAKE_PROVIDER_LATENCY / FAKE_PROVIDER_ERROR_RATE
+  record  the real services, saving every response under PROVIDER_FIXTURES_DIR
+  replay  those saved responses, with the fake latency and failures; a call
+          nothing was recorded for fails
+
+Fake payloads depend only on the inputs, and latency/failures come from a
+generator seeded with FAKE_PROVIDER_SEED, so a fake or replay run of
+run_ai_analysis or the drain worker is repeatable and costs no quota.
+"""
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+from flask import current_app
+from utils.metrics import external_call
+
+# Operation -> (median seconds, log-normal sigma) and failure rate are keyed by these
+OPERATIONS = ('solar_analysis', 'ar_layout', 'roof_model', 'roof_upload')
+
+
+class ProviderError(Exception):
+    """An injected failure, or a replayed call nothing was recorded for."""
+
+
+# --- Live ---
+
+def _live_solar_analysis(address, lat, lon, energy_kwh, roof_type):
+    from sevices.gemini_service import get_solar_analysis
+    return get_solar_analysis(address=address, lat=lat, lon=lon, energy_kwh=energy_kwh, roof_type=roof_type)
+
+
+def _live_ar_layout(image_url, roof_type):
+    from sevices.gemini_service import get_ar_layout
+    return get_ar_layout(image_url=image_url, roof_type=roof_type)
+
+
+def _live_roof_model(lat, lon):
+    """
+    Calls the Google Aerial View API to get a 3D model URL.
+    """
+    import requests
+
+    maps_key = os.environ.get("GOOGLE_MAPS_API_KEY")
+    if not maps_key:
+        current_app.logger.error("GOOGLE_MAPS_API_KEY not set.")
+        return None
+
+    url = "https://aerialview.googleapis.com/v1/buildings:findClosest"
+    params = {
+        'key': maps_key,
+        'location.latitude': lat,
+        'location.longitude': lon
+    }
+    with external_call('aerial_view'):
+        response = requests.get(url, params=params)
+        response.raise_for_status() # Raise an error for bad responses
+
+    # Extract the GLB model URL
+    return response.json().get('renders', {}).get('gltf', {}).get('url')
+
+
+def _live_roof_upload(image_file):
+    import cloudinary.uploader
+
+    with external_call('cloudinary'):
+        upload_result = cloudinary.uploader.upload(image_file, folder="roof_analysis")
+    return upload_result.get('secure_url')
+
+
+# --- Fake ---
+
+def _digest(*parts):
+    return hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()
+
+
+def _fake_solar_analysis(address, lat, lon, energy_kwh, roof_type):
+    rng = random.Random(_digest('solar_analysis', address, lat, lon, energy_kwh, roof_type))
+    yield_per_kw = rng.uniform(1450, 1750) # kWh per installed kW per year, typical for Kenya
+    system_size_kw = max(round((energy_kwh or 300) * 12 / yield_per_kw, 1), 1.0)
+    panel_count = math.ceil(system_size_kw * 1000 / 450) # 450 W panels
+    production = round(system_size_kw * yield_per_kw)
+    savings = round(production * rng.uniform(22, 28), -2) # KSh per kWh saved
+    payback = round(system_size_kw * rng.uniform(95000, 130000) / savings, 1)
+    orientation = 'North' if (lat or 0) < 0 else 'South' # Facing the equator
+    return {
+        "panel_count": panel_count,
+        "annual_production_kwh": production,
+        "annual_savings_ksh": savings,
+        "system_size_kw": system_size_kw,
+        "payback_period_years": payback,
+        "roof_type_ai": roof_type,
+        "roof_orientation_ai": orientation,
+        "roof_angle_ai": rng.randint(5, 25),
+        "summary_text": f"Based on your {energy_kwh} kWh consumption and {roof_type} roof, we recommend a "
+                        f"{system_size_kw} kW system with {panel_count} panels.",
+        "financial_summary_text": f"This {system_size_kw} kW system has an estimated payback period of {payback} years, "
+                                  f"saving approximately KSh {savings:,.0f} a year.",
+        "environmental_summary_text": f"The system avoids about {production * 0.5 / 1000:.1f} tonnes of CO2 a year.",
+        "solar_suitability_score": rng.randint(55, 98),
+    }
+
+
+def _fake_ar_layout(image_url, roof_type):
+    # Two rows of five 1m x 2m panels, pitched like the roof type usually is
+    pitch = {"Flat": 5, "Concrete": 5, "Iron Sheets": 15, "Tiles": 25}.get(roof_type, 15)
+    return [
+        {"position": [-4.0 + col * 2.0, 0.05, -1.0 + row * 2.0], "rotation": [math.radians(pitch), 0.0, 0.0]}
+        for row in range(2) for col in range(5)
+    ]
+
+
+def _fake_roof_model(lat, lon):
+    # Aerial View has no 3D model for many buildings
+    if random.Random(_digest('roof_model', lat, lon)).random() < 0.15:
+        return None
+    return f"https://tile.googleapis.com/fake/aerialview/{lat:.5f},{lon:.5f}.glb"
+
+
+def _fake_roof_upload(image_file):
+    return f"https://res.cloudinary.com/solarmatch-fake/image/upload/roof_analysis/{_upload_key(image_file)[:20]}.jpg"
+
+
+def _upload_key(image_file):
+    data = image_file.read()
+    image_file.seek(0)
+    return hashlib.sha256(data).hexdigest()
+
+
+# --- Latency, failures, fixtures ---
+
+_stream_lock = threading.Lock()
+_stream = None
+
+
+def _draw(method, *args):
+    """A draw from the process's seeded generator (latency and failure decisions)."""
+    global _stream
+    with _stream_lock:
+        if _stream is None:
+            _stream = random.Random(current_app.config['FAKE_PROVIDER_SEED'])
+        return getattr(_stream, method)(*args)
+
+
+def reseed(seed=None):
+    """Restarts the latency/failure sequence, e.g. between benchmark runs."""
+    global _stream
+    with _stream_lock:
+        _stream = None if seed is None else random.Random(seed)
+
+
+def _simulate(operation):
+    config = current_app.config
+    median, sigma = config['FAKE_PROVIDER_LATENCY'].get(operation, (0, 0))
+    scale = config['FAKE_PROVIDER_LATENCY_SCALE']
+    if median and scale:
+        time.sleep(_draw('lognormvariate', math.log(median), sigma) * scale)
+    if _draw('random') < config['FAKE_PROVIDER_ERROR_RATE'].get(operation, 0):
+        raise ProviderError(f"Injected {operation} failure")
+
+
+def _fixture_path(operation, key):
+    return os.path.join(current_app.config['PROVIDER_FIXTURES_DIR'], operation, f"{key[:32]}.json")
+
+
+def _call(operation, live, fake, *args, key=_digest):
+    """
+    Runs `operation` the way EXTERNAL_PROVIDERS says. `key(operation, *args)`
+    names its fixture; it is only computed when recording or replaying.
+    """
+    mode = current_app.config['EXTERNAL_PROVIDERS']
+    if mode == 'live':
+        return live(*args)
+
+    if mode == 'record':
+        start = time.perf_counter()
+        response = live(*args)
+        path = _fixture_path(operation, key(operation, *args))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({"operation": operation, "seconds": round(time.perf_counter() - start, 3),
+                       "response": response}, f, indent=2)
+        return response
+
+    if mode == 'fake':
+        _simulate(operation)
+        return fake(*args)
+
+    if mode == 'replay':
+        _simulate(operation)
+        try:
+            with open(_fixture_path(operation, key(operation, *args))) as f:
+                return json.load(f)["response"]
+        except FileNotFoundError:
+            raise ProviderError(f"No recorded {operation} response for these inputs (run with EXTERNAL_PROVIDERS=record)")
+
+    raise ValueError(f"Unknown EXTERNAL_PROVIDERS {mode!r}, expected live, fake, record or replay")
+
+
+# --- What callers use ---
+
+def solar_analysis(address, lat, lon, energy_kwh, roof_type):
+    """Gemini's sizing and financial estimate for a site. Raises on failure."""
+    return _call('solar_analysis', _live_solar_analysis, _fake_solar_analysis,
+                 address, lat, lon, energy_kwh, roof_type)
+
+
+def ar_layout(image_url, roof_type):
+    """Gemini's panel layout for the roof photo, rotations in radians. Raises on failure."""
+    return _call('ar_layout', _live_ar_layout, _fake_ar_layout, image_url, roof_type)
+
+
+def roof_model(lat, lon):
+    """URL of the Aerial View 3D model of the building, or None (no model, or the call failed)."""
+    try:
+        return _call('roof_model', _live_roof_model, _fake_roof_model, lat, lon)
+    except Exception as e:
+        current_app.logger.error(f"Aerial View API failed: {e}")
+        return None
+
+
+def upload_roof_image(image_file):
+    """Stores the customer's roof photo and returns its public URL. Raises on failure."""
+    # Hashing the whole photo is only worth it when there is a fixture to name
+    return _call('roof_upload', _live_roof_upload, _fake_roof_upload, image_file,
+                 key=lambda operation, image_file: _upload_key(image_file))
@@ -0,0 +1,212 @@
+from datetime import datetime, timedelta, timezone, date
+from flask import current_app
+from sqlalchemy import func
+from extensions import db
+from models.stats import DailyRollup, RollupTotal
+from models.user import User
+from models.analysis import AnalysisRequest, AnalysisResult
+from utils.db_helpers import upsert_insert, utc_date
+from utils.cache import cached, invalidate_tags
+
+# --- Metric names ---
+# Daily + total
+ANALYSES_SUBMITTED = 'analyses.submitted'
+ANALYSES_COMPLETED = 'analyses.completed'
+ANALYSES_FAILED = 'analyses.failed'
+CO2_KG = 'co2.kg'
+# Daily only: new sign-ups per role
+NEW_USERS = 'users.new.{role}'
+# Total only: current number of users holding each role (moves on ban/unban/delete)
+USERS_BY_ROLE = 'users.{role}'
+
+GROWTH_WEEKS = 4
+
+
+def _today():
+    return datetime.now(timezone.utc).date()
+
+
+def _co2_kg(annual_production_kwh):
+    return (annual_production_kwh or 0) * current_app.config.get('GRID_CO2_KG_PER_KWH', 0.5)
+
+
+def bump(metric, amount=1, day=None, daily=True, total=True):
+    """
+    Atomically add `amount` to a metric's daily row and/or its running total.
+    Runs on the caller's session, so it commits (or rolls back) with the write
+    that caused it.
+    """
+    if daily:
+        stmt = upsert_insert(DailyRollup).values(day=day or _today(), metric=metric, value=amount)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=['day', 'metric'],
+            set_={'value': DailyRollup.value + stmt.excluded.value}
+        ))
+    if total:
+        stmt = upsert_insert(RollupTotal).values(metric=metric, value=amount)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=['metric'],
+            set_={'value': RollupTotal.value + stmt.excluded.value}
+        ))
+
+
+# --- Write-path hooks (call before the commit that creates/changes the row) ---
+
+def record_new_user(role, count=1):
+    bump(NEW_USERS.format(role=role), count, total=False)
+    bump(USERS_BY_ROLE.format(role=role), count, daily=False)
+
+
+def record_role_change(old_role, new_role):
+    bump(USERS_BY_ROLE.format(role=old_role), -1, daily=False)
+    bump(USERS_BY_ROLE.format(role=new_role), 1, daily=False)
+
+
+def record_user_removed(role):
+    bump(USERS_BY_ROLE.format(role=role), -1, daily=False)
+
+
+def record_analysis_submitted():
+    bump(ANALYSES_SUBMITTED)
+
+
+def record_analysis_finished(status, annual_production_kwh=None):
+    if status == 'COMPLETED':
+        bump(ANALYSES_COMPLETED)
+        bump(CO2_KG, _co2_kg(annual_production_kwh))
+    elif status == 'FAILED':
+        bump(ANALYSES_FAILED)
+
+
+# --- Periodic reconciliation ---
+
+def _as_date(value):
+    # SQLite hands back 'YYYY-MM-DD' strings, Postgres hands back dates
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+def rebuild_rollups(days=35):
+    """
+    Recompute the last `days` daily rows and every total from the source
+    tables. Used to backfill after deploy and as a nightly consistency job;
+    the request path only ever does the incremental bump() above.
+    """
+    since = _today() - timedelta(days=days - 1)
+    since_dt = datetime.combine(since, datetime.min.time(), tzinfo=timezone.utc)
+    daily = {}
+
+    def add(day, metric, value):
+        key = (_as_date(day), metric)
+        daily[key] = daily.get(key, 0) + (value or 0)
+
+    user_day = utc_date(User.created_at)
+    for day, role, count in db.session.query(user_day, User.role, func.count(User.id)).filter(
+        User.created_at >= since_dt
+    ).group_by(user_day, User.role):
+        # Banned users still count as customer sign-ups on the day they joined
+        add(day, NEW_USERS.format(role='customer' if role == 'banned' else role), count)
+
+    request_day = utc_date(AnalysisRequest.created_at)
+    for day, count in db.session.query(request_day, func.count(AnalysisRequest.id)).filter(
+        AnalysisRequest.created_at >= since_dt
+    ).group_by(request_day):
+        add(day, ANALYSES_SUBMITTED, count)
+
+    finished_day = utc_date(AnalysisResult.completed_at)
+    for day, status, count, kwh in db.session.query(
+        finished_day, AnalysisResult.status, func.count(AnalysisResult.id),
+        func.sum(AnalysisResult.annual_production_kwh)
+    ).filter(
+        AnalysisResult.completed_at >= since_dt,
+        AnalysisResult.status.in_(['COMPLETED', 'FAILED'])
+    ).group_by(finished_day, AnalysisResult.status):
+        if status == 'COMPLETED':
+            add(day, ANALYSES_COMPLETED, count)
+            add(day, CO2_KG, _co2_kg(kwh))
+        else:
+            add(day, ANALYSES_FAILED, count)
+
+    totals = {
+        USERS_BY_ROLE.format(role=role): count
+        for role, count in db.session.query(User.role, func.count(User.id)).group_by(User.role)
+    }
+    totals[ANALYSES_SUBMITTED] = db.session.query(func.count(AnalysisRequest.id)).scalar()
+    for status, count, kwh in db.session.query(
+        AnalysisResult.status, func.count(AnalysisResult.id), func.sum(AnalysisResult.annual_production_kwh)
+    ).filter(AnalysisResult.status.in_(['COMPLETED', 'FAILED'])).group_by(AnalysisResult.status):
+        if status == 'COMPLETED':
+            totals[ANALYSES_COMPLETED] = count
+            totals[CO2_KG] = _co2_kg(kwh)
+        else:
+            totals[ANALYSES_FAILED] = count
+
+    DailyRollup.query.filter(DailyRollup.day >= since).delete(synchronize_session=False)
+    RollupTotal.query.delete(synchronize_session=False)
+    db.session.add_all(DailyRollup(day=d, metric=m, value=v) for (d, m), v in daily.items())
+    db.session.add_all(RollupTotal(metric=m, value=v) for m, v in totals.items())
+    db.session.commit()
+    invalidate_tags('stats')
+    return len(daily), len(totals)
+
+
+# --- Read side for /api/admin/stats ---
+
+def get_total(*metrics):
+    """Sum of the running totals for `metrics`, or None if they were never recorded."""
+    values = db.session.query(RollupTotal.value).filter(RollupTotal.metric.in_(metrics)).all()
+    if not values:
+        return None
+    return int(sum(v for (v,) in values))
+
+
+def _pct_change(current, previous):
+    if not previous:
+        return "+100.0%" if current else "+0.0%"
+    change = (current - previous) / previous * 100
+    return f"{change:+.1f}%"
+
+
+@cached('admin:stats', ttl=30, tags=['stats'])
+def get_dashboard_stats():
+    """
+    Builds the admin overview from at most a few dozen pre-aggregated rows:
+    the running totals plus the last GROWTH_WEEKS weeks of daily rows.
+    Cached for 30s and dropped on admin writes (tag 'stats').
+    """
+    today = _today()
+    since = today - timedelta(days=GROWTH_WEEKS * 7 - 1)
+    new_user_metrics = [NEW_USERS.format(role='customer'), NEW_USERS.format(role='installer')]
+
+    totals = dict(db.session.query(RollupTotal.metric, RollupTotal.value).filter(
+        RollupTotal.metric.in_([
+            USERS_BY_ROLE.format(role='customer'), USERS_BY_ROLE.format(role='installer'),
+            ANALYSES_SUBMITTED, CO2_KG
+        ])
+    ).all())
+
+    # weekly[metric][0] is the oldest week, [-1] the current one
+    weekly = {m: [0] * GROWTH_WEEKS for m in ['users', ANALYSES_SUBMITTED, CO2_KG]}
+    for day, metric, value in db.session.query(
+        DailyRollup.day, DailyRollup.metric, DailyRollup.value
+    ).filter(
+        DailyRollup.day >= since,
+        DailyRollup.metric.in_(new_user_metrics + [ANALYSES_SUBMITTED, CO2_KG])
+    ):
+        week = GROWTH_WEEKS - 1 - (today - _as_date(day)).days // 7
+        weekly['users' if metric in new_user_metrics else metric][week] += value
+
+    total_users = totals.get(USERS_BY_ROLE.format(role='customer'), 0) + totals.get(USERS_BY_ROLE.format(role='installer'), 0)
+    return {
+        "stats": {
+            "total_users": int(total_users),
+            "users_change": _pct_change(weekly['users'][-1], weekly['users'][-2]),
+            "total_analyses": int(totals.get(ANALYSES_SUBMITTED, 0)),
+            "analyses_change": _pct_change(weekly[ANALYSES_SUBMITTED][-1], weekly[ANALYSES_SUBMITTED][-2]),
+            "co2_saved": round(totals.get(CO2_KG, 0) / 1000, 2), # tonnes
+            "co2_change": _pct_change(weekly[CO2_KG][-1], weekly[CO2_KG][-2])
+        },
+        "growth_data": {
+            "labels": [f"Week {i + 1}" for i in range(GROWTH_WEEKS)],
+            "data": [int(v) for v in weekly['users']] # New users per week
+        }
+    }
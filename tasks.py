@@ -1,8 +1,14 @@
 # src/tasks.py
 import json
+from datetime import datetime, timezone
+from flask import current_app
 from extensions import db 
+from sqlalchemy import select
 from models.analysis import AnalysisRequest, AnalysisResult
-from sevices.gemini_service import get_solar_analysis, get_ar_layout
+from models.quote_request import QuoteRequest
+from sevices import stats_service, activity_service, installer_stats_service, lead_scoring, lead_routing, providers
+from utils.cache import invalidate_tags
+from utils.metrics import external_call
 from celery_config import celery 
 
 @celery.task(name='tasks.run_ai_analysis')
@@ -10,9 +16,7 @@ def run_ai_analysis(request_id):
     """
     The background task that runs all slow AI analysis.
     """
-    from routes.ai_routes import get_3d_roof_model
-    from app import app
-
+    res = None
     try:
         # Get the request and result objects
         req = AnalysisRequest.query.get(request_id)
@@ -20,13 +24,13 @@ def run_ai_analysis(request_id):
 
         if not req or not res:
             print(f"Task failed: Could not find request_id {request_id}")
-            app.logger.error(f"Task failed: Could not find request or result for ID {request_id}")
+            current_app.logger.error(f"Task failed: Could not find request or result for ID {request_id}")
             return
 
         # Run the slow AI/API calls
-        roof_model_url = get_3d_roof_model(lat=req.latitude, lon=req.longitude)
+        roof_model_url = providers.roof_model(lat=req.latitude, lon=req.longitude)
         
-        gemini_data = get_solar_analysis(
+        gemini_data = providers.solar_analysis(
             address=req.address,
             lat=req.latitude,
             lon=req.longitude,
@@ -34,7 +38,7 @@ def run_ai_analysis(request_id):
             roof_type=req.roof_type_manual
         )
         
-        ar_layout_json = get_ar_layout(
+        ar_layout_json = providers.ar_layout(
             image_url=req.roof_image_url,
             roof_type=req.roof_type_manual
         )
@@ -55,15 +59,143 @@ def run_ai_analysis(request_id):
         res.financial_summary_text = gemini_data.get('financial_summary_text')
         res.environmental_summary_text = gemini_data.get('environmental_summary_text')
         res.solar_suitability_score = gemini_data.get('solar_suitability_score')
+        res.completed_at = datetime.now(timezone.utc)
+        lead_scoring.score_result(res, req)
+        stats_service.record_analysis_finished('COMPLETED', res.annual_production_kwh)
+        activity_service.log_activity(activity_service.ANALYSIS_COMPLETE, f"User #{req.user_id}", actor_id=req.user_id, subject_id=req.id)
+
+        # Installers this customer asked for quotes will have a new report
+        installer_ids = db.session.scalars(
+            select(QuoteRequest.installer_id).where(QuoteRequest.customer_id == req.user_id)
+        ).all()
 
         # Commit to the database
         db.session.commit()
+        invalidate_tags(*[f'installer-reports:{i}' for i in installer_ids])
         print(f"Successfully processed analysis {request_id}")
 
+        if req.auto_route:
+            _auto_route(req)
+
     except Exception as e:
         # If anything fails, mark the task as FAILED
         db.session.rollback()
         if res:
             res.status = 'FAILED'
+            res.completed_at = datetime.now(timezone.utc)
+            stats_service.record_analysis_finished('FAILED')
+            db.session.commit()
+        print(f"Failed to process analysis {request_id}: {e}")
+
+
+def _auto_route(req):
+    """
+    Sends the customer's quote requests to their best-matching installers.
+    Best effort: the analysis is already committed and stays COMPLETED if
+    this fails.
+    """
+    try:
+        routed = lead_routing.route_analysis(req)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Failed to auto-route analysis {req.id}: {e}")
+        return
+
+    invalidate_tags(*[f'installer-reports:{i}' for i in routed])
+    for installer_id, quote_request_id in routed.items():
+        try:
+            send_lead_digest.delay(installer_id, [quote_request_id])
+        except Exception as e:
+            print(f"Failed to queue lead digest for installer {installer_id}: {e}")
+    print(f"Auto-routed analysis {req.id} to {len(routed)} installers")
+
+
+@celery.task(name='tasks.send_lead_digest')
+def send_lead_digest(installer_id, quote_request_ids):
+    """
+    Emails an installer one summary of the leads just routed to them.
+    """
+    from extensions import mail
+    from models.user import User
+    from sevices.email_service import lead_digest_message
+
+    installer = User.query.get(installer_id)
+    if not installer:
+        return
+    leads = db.session.query(User.full_name, User.county).join(
+        QuoteRequest, QuoteRequest.customer_id == User.id
+    ).filter(
+        QuoteRequest.id.in_(quote_request_ids), QuoteRequest.installer_id == installer_id
+    ).all()
+    if not leads:
+        return
+
+    try:
+        with external_call('smtp'):
+            mail.send(lead_digest_message(installer.full_name, installer.email, leads))
+    except Exception as e:
+        print(f"!!! FAILED TO SEND LEAD DIGEST to {installer.email}: {e} !!!")
+
+
+@celery.task(name='tasks.rebuild_rollups')
+def rebuild_rollups(days=35):
+    """
+    Periodic reconciliation of the admin stats rollups against the source tables.
+    """
+    daily_rows, totals = stats_service.rebuild_rollups(days=days)
+    print(f"Rebuilt {daily_rows} daily rollup rows and {totals} totals")
+    installers = installer_stats_service.rebuild_installer_stats()
+    print(f"Rebuilt stats for {installers} installers")
+
+
+@celery.task(name='tasks.backfill_lead_scores')
+def backfill_lead_scores(batch_size=1000, only_missing=True):
+    """
+    Scores completed analyses that predate lead scoring (or all of them,
+    after the scoring model changes).
+    """
+    scored = lead_scoring.backfill_scores(batch_size=batch_size, only_missing=only_missing)
+    invalidate_tags('installer-reports')
+    print(f"Scored {scored} analysis results")
+
+
+@celery.task(name='tasks.archive_activity_events')
+def archive_activity_events(older_than_days=None, batch_size=1000):
+    """
+    Moves old activity events into the archive table in time-ordered batches.
+    """
+    archived = activity_service.archive_events(older_than_days=older_than_days, batch_size=batch_size)
+    print(f"Archived {archived} activity events")
+
+
+@celery.task(name='tasks.send_installer_welcome_emails')
+def send_installer_welcome_emails(user_ids):
+    """
+    Gives a batch of imported installers their temporary passwords and emails
+    them over a single SMTP connection. Only user ids travel through the
+    broker; the passwords exist in this process and in the emails, nowhere else.
+    """
+    import random
+    from extensions import mail, bcrypt
+    from models.user import User
+    from sevices.email_service import installer_welcome_message
+
+    # Skip anyone who has already set their own password (e.g. a retried task)
+    installers = User.query.filter(
+        User.id.in_(user_ids), User.role == 'installer', User.password_reset_required.is_(True)
+    ).all()
+
+    sent = 0
+    with mail.connect() as conn:
+        for user in installers:
+            temp_password = f"Solar{random.randint(1000,9999)}!"
+            user.password_hash = bcrypt.generate_password_hash(temp_password).decode("utf-8")
             db.session.commit()
-        print(f"Failed to process analysis {request_id}: {e}")
\ No newline at end of file
+            try:
+                with external_call('smtp'):
+                    conn.send(installer_welcome_message(user.full_name, user.email, user.user_name, temp_password))
+                sent += 1
+            except Exception as e:
+                print(f"!!! FAILED TO SEND WELCOME EMAIL to {user.email}: {e} !!!")
+    print(f"Sent {sent}/{len(user_ids)} installer welcome emails")
@@ -3,6 +3,7 @@ import pytest
 import time # Import the time module
 import random
 import os
+from contextlib import contextmanager
 from dotenv import load_dotenv
 
 # Load test environment variables BEFORE creating the app
@@ -12,6 +13,7 @@ load_dotenv('.env.test')
 from app import create_app
 from extensions import db as _db # Use alias to avoid pytest conflicts
 from models.user import User # Import User model
+from utils import sql_profiler
 from flask_jwt_extended import create_access_token
 
 @pytest.fixture(scope='session')
@@ -26,6 +28,7 @@ def app():
         "JWT_SECRET_KEY": os.getenv("SECRET_KEY"),
         "WTF_CSRF_ENABLED": False,
         "MAIL_SUPPRESS_SEND": True,
+        "RATE_LIMIT_ENABLED": False, # Tests that need it switch it on
         # Ensure Celery uses test settings too if needed
         "CELERY_BROKER_URL": os.getenv("REDIS_URL"),
         "CELERY_RESULT_BACKEND": os.getenv("REDIS_URL"),
@@ -72,6 +75,29 @@ def session(db):
     sess.remove()
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Cached reads must not leak between tests."""
+    from utils.cache import clear_local
+    clear_local()
+    yield
+    clear_local()
+
+
+@pytest.fixture
+def max_statements():
+    """
+    `with max_statements(4): client.get(...)` fails the test if the block
+    runs more than 4 SQL statements, listing the ones it ran.
+    """
+    @contextmanager
+    def budget(limit):
+        with sql_profiler.collect('test') as stats:
+            yield stats
+        assert stats.count <= limit, f"Over the budget of {limit}: {stats.summary()}"
+    return budget
+
+
 @pytest.fixture(scope='function')
 def client(app):
     """A test client for the app."""
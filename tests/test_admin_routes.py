@@ -1,4 +1,5 @@
 # tests/test_admin_routes.py
+import csv
 import json
 from models.user import User # Import User model to verify changes
 
@@ -38,6 +39,39 @@ def test_get_users_search(client, admin_auth_headers, customer_user):
     assert len(data['users']) == 1
     assert data['users'][0]['id'] == customer_user.id
 
+def test_get_users_keyset_pagination(client, session, admin_auth_headers):
+    """Test walking the user list with next_cursor instead of page numbers."""
+    for i in range(3):
+        session.add(User(full_name=f"Paged Customer {i}", email=f"paged{i}@test.com",
+                         password_hash="x", user_name=f"CUS-Paged-{i}", role="customer"))
+    session.flush()
+
+    response = client.get('/api/admin/users?search=paged&per_page=2', headers=admin_auth_headers)
+    assert response.status_code == 200
+    first = json.loads(response.data)
+    assert len(first['users']) == 2
+    assert first['pagination']['has_more'] is True
+    assert first['pagination']['total_users'] == 3
+
+    cursor = first['pagination']['next_cursor']
+    response = client.get(f'/api/admin/users?search=paged&per_page=2&cursor={cursor}', headers=admin_auth_headers)
+    second = json.loads(response.data)
+    assert len(second['users']) == 1
+    assert second['pagination']['has_more'] is False
+    seen = {u['id'] for u in first['users']} | {u['id'] for u in second['users']}
+    assert len(seen) == 3
+
+def test_get_users_bad_cursor(client, admin_auth_headers):
+    """Test a malformed cursor is rejected."""
+    response = client.get('/api/admin/users?cursor=not-a-cursor', headers=admin_auth_headers)
+    assert response.status_code == 400
+
+def test_get_users_search_escapes_wildcards(client, admin_auth_headers, customer_user):
+    """Test LIKE wildcards in the search term are matched literally."""
+    response = client.get('/api/admin/users?search=%25', headers=admin_auth_headers)
+    assert response.status_code == 200
+    assert json.loads(response.data)['users'] == []
+
 # === Test PUT /api/admin/users/<id>/ban ===
 
 def test_ban_user_success(client, session, admin_auth_headers, customer_user):
@@ -159,6 +193,87 @@ def test_add_installer_missing_fields(client, admin_auth_headers):
     data = json.loads(response.data)
     assert 'All fields are required' in data['message']
 
+# === Test POST /api/admin/installers/import ===
+
+def test_import_installers_csv(client, admin_auth_headers, installer_user, monkeypatch):
+    """Test the bulk import creates new rows and reports duplicates and invalid rows."""
+    import io
+    import tasks
+    queued = []
+    monkeypatch.setattr(tasks.send_installer_welcome_emails, 'delay', lambda batch: queued.append(batch))
+
+    csv_data = (
+        "full_name,email,phone_number,county,installer_category\n"
+        "Bulk Solar One,bulk1@test.com,0711000001,Nairobi,Residential\n"
+        f"Existing Solar,{installer_user.email},0711000002,Nakuru,Commercial\n"
+        "No Email Solar,,0711000003,Kisumu,Residential\n"
+        "Bulk Solar Copy,BULK1@test.com,0711000004,Nairobi,Residential\n"
+    )
+    response = client.post('/api/admin/installers/import', headers=admin_auth_headers,
+                           data={'file': (io.BytesIO(csv_data.encode()), 'installers.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 201
+    data = json.loads(response.data)
+    assert data['summary'] == {"total_rows": 4, "created": 1, "duplicate": 1, "invalid": 2}
+    assert [r['status'] for r in data['rows']] == ["created", "duplicate", "invalid", "invalid"]
+    assert data['emails_queued'] is True and data['welcome_pending_ids'] == []
+    new_installer = User.query.filter_by(email="bulk1@test.com").first()
+    assert queued == [[new_installer.id]] # Ids only: no passwords in the broker
+    assert new_installer.role == 'installer'
+    assert new_installer.password_reset_required is True
+    assert new_installer.user_name == data['rows'][0]['user_name']
+
+def test_welcome_email_task_sets_temporary_password(app, session, monkeypatch):
+    """Test the welcome task gives pending installers a password, and leaves the rest alone."""
+    import tasks
+    pending = User(full_name="Pending Solar", email="pending.welcome@test.com", password_hash="locked",
+                   user_name="INS-PendingWelcome", role="installer", password_reset_required=True)
+    active = User(full_name="Active Solar", email="active.welcome@test.com", password_hash="chosen",
+                  user_name="INS-ActiveWelcome", role="installer", password_reset_required=False)
+    session.add_all([pending, active])
+    session.flush()
+
+    monkeypatch.setattr(app.extensions['mail'], 'default_sender', "noreply@test.com")
+    with app.extensions['mail'].record_messages() as outbox:
+        tasks.send_installer_welcome_emails.run([pending.id, active.id]) # .run: skip the task's own app context
+
+    assert [m.recipients for m in outbox] == [["pending.welcome@test.com"]]
+    session.refresh(pending)
+    session.refresh(active)
+    assert pending.password_hash.startswith("$2")
+    assert active.password_hash == "chosen"
+
+def test_resend_installer_welcome(client, session, admin_auth_headers, installer_user, monkeypatch):
+    """Test admins can resend the welcome email to installers who haven't set a password yet."""
+    import tasks
+    queued = []
+    monkeypatch.setattr(tasks.send_installer_welcome_emails, 'delay', lambda batch: queued.append(batch))
+    pending = User(full_name="Unwelcomed Solar", email="unwelcomed@test.com", password_hash="locked",
+                   user_name="INS-Unwelcomed", role="installer", password_reset_required=True)
+    session.add(pending)
+    session.flush()
+
+    response = client.post(f'/api/admin/installers/{pending.id}/welcome', headers=admin_auth_headers)
+    assert response.status_code == 202 and queued == [[pending.id]]
+
+    installer_user.password_reset_required = False
+    session.flush()
+    assert client.post(f'/api/admin/installers/{installer_user.id}/welcome', headers=admin_auth_headers).status_code == 409
+
+    def broker_down(batch):
+        raise ConnectionError("broker down")
+    monkeypatch.setattr(tasks.send_installer_welcome_emails, 'delay', broker_down)
+    assert client.post(f'/api/admin/installers/{pending.id}/welcome', headers=admin_auth_headers).status_code == 503
+
+def test_import_installers_missing_columns(client, admin_auth_headers):
+    """Test a file without the required header is rejected as a whole."""
+    import io
+    response = client.post('/api/admin/installers/import', headers=admin_auth_headers,
+                           data={'file': (io.BytesIO(b"name,email\nA,a@test.com\n"), 'installers.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert 'Missing columns' in json.loads(response.data)['error']
+
 # === Test DELETE /api/admin/installers/<id> ===
 
 def test_delete_installer_success(client, session, admin_auth_headers, installer_user):
@@ -182,5 +297,141 @@ def test_delete_non_installer(client, admin_auth_headers, customer_user):
     response = client.delete(f'/api/admin/installers/{customer_user.id}', headers=admin_auth_headers)
     assert response.status_code == 400 # This user is not an installer
 
-# TODO: Add tests for FAQ, Tips, About, and Stats endpoints following the same patterns
-# (Check auth, check success cases, check error cases like not found or bad input)
\ No newline at end of file
+# === Test conditional GETs on content ===
+
+def test_get_faqs_not_modified(client, admin_auth_headers):
+    """Test a matching If-None-Match gets a 304, and an edit changes the ETag."""
+    client.post('/api/admin/faqs', json={"question": "Q?", "answer": "A."}, headers=admin_auth_headers)
+    response = client.get('/api/admin/faqs', headers=admin_auth_headers)
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert response.headers['Last-Modified']
+
+    response = client.get('/api/admin/faqs', headers={**admin_auth_headers, 'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+    client.post('/api/admin/faqs', json={"question": "Q2?", "answer": "A2."}, headers=admin_auth_headers)
+    response = client.get('/api/admin/faqs', headers={**admin_auth_headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+
+def test_get_about_does_not_write(client, session, admin_auth_headers):
+    """Test GET /about serves content without creating the row, cacheable only by the browser."""
+    from models.content import AboutContent
+    rows_before = AboutContent.query.count()
+    response = client.get('/api/admin/about', headers=admin_auth_headers)
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+    assert AboutContent.query.count() == rows_before
+
+    response = client.get('/api/admin/about', headers={**admin_auth_headers, 'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 304
+
+# === Test GET /api/admin/stats ===
+
+def test_get_stats_forbidden(client, customer_auth_headers):
+    """Test non-admin access to stats."""
+    response = client.get('/api/admin/stats', headers=customer_auth_headers)
+    assert response.status_code == 403
+
+def test_get_stats_reads_rollups(client, admin_auth_headers):
+    """Test the write paths bump the rollups the stats endpoint reads."""
+    before = json.loads(client.get('/api/admin/stats', headers=admin_auth_headers).data)
+    installer_data = {
+        "full_name": "Rollup Installer",
+        "email": "rollup@test.com",
+        "phone_number": "0700000000",
+        "county": "Mombasa",
+        "installer_category": "Residential"
+    }
+    client.post('/api/admin/installers', json=installer_data, headers=admin_auth_headers)
+
+    response = client.get('/api/admin/stats', headers=admin_auth_headers)
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['stats']['total_users'] == before['stats']['total_users'] + 1
+    assert data['growth_data']['data'][-1] == before['growth_data']['data'][-1] + 1
+
+def test_rebuild_rollups_matches_source(client, admin_auth_headers, customer_user, installer_user):
+    """Test the reconciliation job recomputes totals from the source tables."""
+    from sevices import stats_service
+    stats_service.rebuild_rollups()
+
+    response = client.get('/api/admin/stats', headers=admin_auth_headers)
+    data = json.loads(response.data)
+    assert data['stats']['total_users'] == User.query.filter(User.role.in_(['customer', 'installer'])).count()
+    assert data['growth_data']['data'][-1] >= 2
+
+def test_get_stats_recent_activity(client, admin_auth_headers):
+    """Test adding an installer shows up at the top of the activity feed."""
+    installer_data = {
+        "full_name": "Feed Installer",
+        "email": "feed@test.com",
+        "phone_number": "0700000001",
+        "county": "Kisumu",
+        "installer_category": "Commercial"
+    }
+    client.post('/api/admin/installers', json=installer_data, headers=admin_auth_headers)
+
+    response = client.get('/api/admin/stats', headers=admin_auth_headers)
+    data = json.loads(response.data)
+    latest = data['recent_activity'][0]
+    assert latest['type'] == 'installer_added'
+    assert latest['text'] == "Feed Installer"
+    assert latest['time_ago'] == "just now"
+
+def test_archive_activity_events(session):
+    """Test old events move to the archive table and recent ones stay."""
+    from datetime import datetime, timedelta, timezone
+    from models.activity import ActivityEvent, ActivityEventArchive
+    from sevices import activity_service
+
+    old = ActivityEvent(type='user_registered', text='Old Timer',
+                        created_at=datetime.now(timezone.utc) - timedelta(days=400))
+    fresh = ActivityEvent(type='user_registered', text='New Comer')
+    session.add_all([old, fresh])
+    session.flush()
+    old_id, fresh_id = old.id, fresh.id
+
+    assert activity_service.archive_events(older_than_days=365, batch_size=1) >= 1
+    assert session.get(ActivityEvent, old_id) is None
+    assert session.get(ActivityEventArchive, old_id).text == 'Old Timer'
+    assert session.get(ActivityEvent, fresh_id) is not None
+
+# === Test GET /api/admin/export/<dataset> ===
+
+def test_export_users_csv_columns(client, admin_auth_headers, customer_user):
+    """Test a CSV export with a column selection."""
+    response = client.get('/api/admin/export/users?columns=id,email,analyses_count', headers=admin_auth_headers)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0] == "id,email,analyses_count"
+    assert f"{customer_user.id},{customer_user.email},0" in lines
+
+def test_export_csv_neutralises_formulas(client, session, admin_auth_headers, customer_user):
+    """Test user-supplied text that a spreadsheet would run as a formula is quoted in CSV exports."""
+    customer_user.full_name = '=HYPERLINK("http://evil.test","click")'
+    session.flush()
+    response = client.get('/api/admin/export/users?columns=id,full_name', headers=admin_auth_headers)
+    rows = list(csv.reader(response.get_data(as_text=True).splitlines()))
+    assert [str(customer_user.id), '\'=HYPERLINK("http://evil.test","click")'] in rows
+
+def test_export_installers_ndjson_gzip(client, admin_auth_headers, installer_user):
+    """Test an NDJSON export compressed on the fly."""
+    import gzip
+    response = client.get('/api/admin/export/installers?format=ndjson&gzip=true',
+                          headers={**admin_auth_headers, 'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    rows = [json.loads(line) for line in gzip.decompress(response.data).decode().splitlines()]
+    assert any(r['email'] == installer_user.email and r['leads_received'] == 0 for r in rows)
+
+def test_export_unknown_column(client, admin_auth_headers):
+    """Test unknown columns are rejected before streaming starts."""
+    response = client.get('/api/admin/export/analyses?columns=id,password_hash', headers=admin_auth_headers)
+    assert response.status_code == 400
+    assert 'password_hash' in json.loads(response.data)['error']
+
+# TODO: Add tests for FAQ and Tips create/update/delete following the same patterns
+# (Check auth, check success cases, check error cases like not found or bad input)
@@ -0,0 +1,127 @@
+# tests/test_ai_routes.py
+import json
+from models.analysis import AnalysisRequest, AnalysisResult
+from sevices import lead_scoring
+
+def _completed_analysis(session, user, **figures):
+    req = AnalysisRequest(user_id=user.id, address="Ngong Road, Nairobi", latitude=-1.3, longitude=36.78,
+                          energy_consumption=400, roof_type_manual="Iron Sheets")
+    res = AnalysisResult(request=req, status='COMPLETED', panel_count=12, annual_production_kwh=7000,
+                         **{"annual_savings_ksh": 150000, "system_size_kw": 5, "payback_period_years": 4.5,
+                            "solar_suitability_score": 81, **figures})
+    session.add_all([req, res])
+    session.flush()
+    return req, res
+
+# === Test GET /api/analysis/latest ===
+
+def test_latest_analysis_not_found(client, customer_auth_headers):
+    """Test a user without analyses gets a 404."""
+    response = client.get('/api/analysis/latest', headers=customer_auth_headers)
+    assert response.status_code == 404
+
+def test_latest_analysis_conditional(client, session, customer_user, customer_auth_headers, max_statements):
+    """Test a completed report is served with an ETag and revalidates to 304."""
+    _completed_analysis(session, customer_user)
+
+    with max_statements(2): # Validator lookup, then the report with its result joined
+        response = client.get('/api/analysis/latest', headers=customer_auth_headers)
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['result']['panel_count'] == 12
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+
+    response = client.get('/api/analysis/latest', headers={**customer_auth_headers, 'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 304
+
+# === Test GET /api/installer-reports ===
+
+def test_installer_reports_paginated(client, session, customer_user, customer_auth_headers,
+                                     installer_user, installer_auth_headers):
+    """Test reports of the installer's customers come newest first in pages, and a new lead shows up."""
+    first, _ = _completed_analysis(session, customer_user)
+    second, _ = _completed_analysis(session, customer_user)
+
+    response = client.get('/api/installer-reports', headers=installer_auth_headers)
+    assert json.loads(response.data)['reports'] == []
+
+    # The quote request invalidates the cached first page
+    client.post('/api/quote-request', headers=customer_auth_headers, json={"installer_id": installer_user.id})
+
+    response = client.get('/api/installer-reports?per_page=1', headers=installer_auth_headers)
+    assert response.status_code == 200
+    page = json.loads(response.data)
+    assert page['reports'][0]['annualSavings'] == "KSh 150,000"
+
+    # Walk the pages: one report each, newest first, none repeated
+    ids = [r['id'] for r in page['reports']]
+    for _ in range(20):
+        if not page['pagination']['has_more']:
+            break
+        response = client.get(f"/api/installer-reports?per_page=1&cursor={page['pagination']['next_cursor']}",
+                              headers=installer_auth_headers)
+        page = json.loads(response.data)
+        assert len(page['reports']) == 1
+        ids += [r['id'] for r in page['reports']]
+    assert not page['pagination']['has_more']
+    assert len(ids) == len(set(ids))
+    assert ids.index(second.id) < ids.index(first.id)
+
+# === Test lead scoring ===
+
+def test_score_batch():
+    """Test scores rise with every input, missing figures count as nothing, and tiers follow the score."""
+    scores = lead_scoring.score_batch(
+        suitability=[95, 81, 40, None],
+        system_size=[12, 5, 2, None],
+        savings=[250000, 150000, 30000, None],
+        payback=[2.5, 4.5, 11, None],
+        consumption=[1200, 400, 150, None]
+    )
+    assert scores[0] == (98.2, 'High')
+    assert scores[1] == (69.8, 'Medium')
+    assert scores[2][1] == 'Low'
+    assert scores[3] == (0.0, 'Low')
+
+def test_installer_reports_by_lead_score(client, session, customer_user, customer_auth_headers,
+                                         installer_user, installer_auth_headers, admin_auth_headers):
+    """Test backfilled scores order and filter the installer's reports."""
+    weak, weak_res = _completed_analysis(session, customer_user, solar_suitability_score=30, annual_savings_ksh=20000,
+                                         system_size_kw=1.5, payback_period_years=11)
+    strong, strong_res = _completed_analysis(session, customer_user, solar_suitability_score=95, annual_savings_ksh=260000,
+                                             system_size_kw=11, payback_period_years=3)
+    client.post('/api/quote-request', headers=customer_auth_headers, json={"installer_id": installer_user.id})
+
+    assert lead_scoring.backfill_scores(batch_size=1) >= 2
+    session.refresh(weak_res)
+    session.refresh(strong_res)
+    assert strong_res.lead_tier == 'High' and weak_res.lead_tier == 'Low'
+
+    response = client.get('/api/installer-reports?sort=score&per_page=50', headers=installer_auth_headers)
+    scores = [r['leadScore'] for r in json.loads(response.data)['reports']]
+    assert scores == sorted(scores, reverse=True)
+
+    response = client.get('/api/installer-reports?sort=score&per_page=1', headers=installer_auth_headers)
+    page = json.loads(response.data)
+    assert page['reports'][0]['id'] == strong.id
+    response = client.get(f"/api/installer-reports?sort=score&per_page=50&cursor={page['pagination']['next_cursor']}",
+                          headers=installer_auth_headers)
+    assert strong.id not in [r['id'] for r in json.loads(response.data)['reports']]
+    # A newest-first cursor can't continue a score-sorted listing
+    newest_cursor = json.loads(client.get('/api/installer-reports?per_page=1', headers=installer_auth_headers).data)['pagination']['next_cursor']
+    response = client.get(f"/api/installer-reports?sort=score&cursor={newest_cursor}", headers=installer_auth_headers)
+    assert response.status_code == 400
+    # ...and a score cursor can't continue a listing sorted by date
+    score_cursor = page['pagination']['next_cursor']
+    for url, headers in [('/api/installer-reports', installer_auth_headers),
+                         ('/api/installer-leads', installer_auth_headers),
+                         ('/api/admin/users', admin_auth_headers)]:
+        response = client.get(f"{url}?cursor={score_cursor}", headers=headers)
+        assert response.status_code == 400, url
+
+    response = client.get('/api/installer-reports?tier=Low', headers=installer_auth_headers)
+    ids = [r['id'] for r in json.loads(response.data)['reports']]
+    assert weak.id in ids and strong.id not in ids
+
+    response = client.get('/api/installer-reports?tier=Great', headers=installer_auth_headers)
+    assert response.status_code == 400
@@ -0,0 +1,100 @@
+# tests/test_cache.py
+import json
+import threading
+import time
+from utils import cache
+
+# === Test the cache layer ===
+
+def test_cached_returns_stored_value(app):
+    """Test a second call is served from the cache until its tag is invalidated."""
+    calls = []
+
+    @cache.cached('test:square', ttl=60, tags=lambda n: ['test-numbers', f'test-number:{n}'])
+    def square(n):
+        calls.append(n)
+        return n * n
+
+    assert square(3) == 9
+    assert square(3) == 9
+    assert square(4) == 16
+    assert calls == [3, 4]
+
+    cache.invalidate_tags('test-number:3')
+    assert square(3) == 9
+    assert square(4) == 16
+    assert calls == [3, 4, 3]
+
+    cache.invalidate_tags('test-numbers')
+    square(3)
+    square(4)
+    assert calls == [3, 4, 3, 3, 4]
+
+def test_concurrent_misses_are_coalesced(app):
+    """Test only one of several concurrent callers recomputes a missing key."""
+    calls = []
+
+    @cache.cached('test:slow', ttl=60)
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"value": 42}
+
+    results = []
+
+    def worker():
+        with app.app_context():
+            results.append(slow())
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [{"value": 42}] * 5
+    assert not cache._flight_locks
+
+def test_failed_l2_write_keeps_computed_value(app, monkeypatch):
+    """Test a Redis error while storing a computed value doesn't compute it again."""
+    import redis
+
+    class LockingClient:
+        def get(self, key):
+            return None
+        def set(self, key, value, **kwargs):
+            return True
+        def eval(self, *args):
+            return 1
+
+    def broken_set(*args):
+        raise redis.ConnectionError("gone")
+
+    calls = []
+    monkeypatch.setattr(cache, 'get_redis', lambda: LockingClient())
+    monkeypatch.setattr(cache, '_ensure_subscriber', lambda: None)
+    monkeypatch.setattr(cache, '_redis_set', broken_set)
+    assert cache.get_or_compute('test:l2-down', lambda: calls.append(1) or 'fresh', ttl=60) == 'fresh'
+    assert calls == [1]
+
+def test_on_invalidate_callback(app):
+    """Test registered callbacks run when their tag is invalidated."""
+    seen = []
+    cache.on_invalidate('test-callback', lambda: seen.append(True))
+    cache.invalidate_tags('other-tag')
+    assert seen == []
+    cache.invalidate_tags('test-callback')
+    assert seen == [True]
+
+def test_faq_list_refreshes_after_admin_write(client, session, admin_auth_headers):
+    """Test the cached FAQ list is dropped when an admin adds a FAQ."""
+    before = json.loads(client.get('/api/admin/faqs', headers=admin_auth_headers).data)['faqs']
+
+    response = client.post('/api/admin/faqs', headers=admin_auth_headers,
+                           json={"question": "Does it work at night?", "answer": "With a battery."})
+    assert response.status_code == 201
+
+    after = json.loads(client.get('/api/admin/faqs', headers=admin_auth_headers).data)['faqs']
+    assert len(after) == len(before) + 1
+    assert after[-1]['question'] == "Does it work at night?"
@@ -0,0 +1,57 @@
+# tests/test_db_engines.py
+import pytest
+from flask import g
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.pool import NullPool
+from extensions import db
+from models.user import User
+from utils.db_engines import engine_options, primary_reads, RoutingSession, REPLICA_BIND
+
+PG_URL = "postgresql://solarmatch@db.internal/solarmatch"
+
+# === Test engine profiles ===
+
+def test_engine_options_per_profile():
+    """Test Postgres engines get the profile's pool and timeout, SQLite keeps the defaults."""
+    assert engine_options("sqlite://", "web") == {}
+
+    web = engine_options(PG_URL, "web")
+    assert web["pool_pre_ping"] and web["pool_recycle"] < 300
+    assert web["connect_args"]["options"] == "-c statement_timeout=15000"
+    assert engine_options(PG_URL, "cron-drain")["poolclass"] is NullPool
+
+    bouncer = engine_options(PG_URL, "worker", pgbouncer=True)
+    assert bouncer["poolclass"] is NullPool and "options" not in bouncer["connect_args"]
+    assert bouncer["execution_options"]["statement_timeout_ms"] == 300000
+
+    # Valid create_engine() arguments (no connection is made)
+    for profile in ("web", "web-gevent", "worker", "cron-drain"):
+        create_engine(PG_URL, **engine_options(PG_URL, profile)).dispose()
+    create_engine(PG_URL, **bouncer).dispose()
+
+    with pytest.raises(ValueError):
+        engine_options(PG_URL, "batch")
+
+# === Test read-replica routing ===
+
+def test_replica_routing(app, monkeypatch):
+    """Test only SELECTs from @use_replica views, before any write, go to the replica."""
+    replica = create_engine("sqlite://")
+    with app.test_request_context('/api/admin/users'):
+        monkeypatch.setitem(db.engines, REPLICA_BIND, replica)
+        primary = db.engines[None]
+        session = RoutingSession(db)
+        # g lives on the app context, which the test app keeps for the whole session
+        g.db_use_replica = False
+        assert session.get_bind(clause=select(User)) is primary # Not a @use_replica view
+        g.db_use_replica = True
+        assert session.get_bind(clause=select(User)) is replica
+        assert session.get_bind(clause=select(User).with_for_update()) is primary
+        assert session.get_bind(clause=insert(User)) is primary
+        with primary_reads():
+            assert session.get_bind(clause=select(User)) is primary
+
+        session.add(User(full_name="Pending", email="pending@replica.test", password_hash="x", user_name="CUS-Pending"))
+        assert session.get_bind(clause=select(User)) is primary
+        session.close()
+    replica.dispose()
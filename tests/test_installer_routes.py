@@ -0,0 +1,321 @@
+# tests/test_installer_routes.py
+import json
+from models.user import User
+from flask_jwt_extended import create_access_token
+from models.analysis import AnalysisRequest, AnalysisResult
+from models.quote_request import QuoteRequest
+from models.stats import InstallerStats
+from sevices import installer_matching, lead_scoring
+
+def _installer(session, name, lat=None, lon=None, radius=None, county=None, category="Residential", contract=True):
+    user = User(full_name=name, email=f"{name.lower().replace(' ', '.')}@geo.test", password_hash="x",
+                user_name=f"INS-{name.replace(' ', '')}", role="installer", installer_category=category,
+                county=county, latitude=lat, longitude=lon, service_radius_km=radius, contract_accepted=contract)
+    session.add(user)
+    session.flush()
+    return user
+
+def _analysis_for(session, customer, score):
+    req = AnalysisRequest(user_id=customer.id, address="Kisumu", latitude=-0.09, longitude=34.77,
+                          energy_consumption=900, roof_type_manual="Tiles")
+    res = AnalysisResult(request=req, status='COMPLETED', solar_suitability_score=score, system_size_kw=9,
+                         annual_savings_ksh=210000, payback_period_years=3.5)
+    lead_scoring.score_result(res, req)
+    session.add_all([req, res])
+    session.flush()
+    return req, res
+
+def _auth(user):
+    return {"Authorization": f"Bearer {create_access_token(identity=str(user.id))}"}
+
+# === Test GET /api/installers?lat=&lon= ===
+
+def test_nearest_installers_ranked_by_distance(client, session, customer_auth_headers):
+    """Test only installers covering the point are returned, nearest first."""
+    near = _installer(session, "Geo Near", lat=2.01, lon=38.51, radius=20)
+    far = _installer(session, "Geo Far", lat=2.2, lon=38.5, radius=40)
+    _installer(session, "Geo Out Of Range", lat=2.5, lon=38.5, radius=10)
+    _installer(session, "Geo Unsigned", lat=2.0, lon=38.5, radius=50, contract=False)
+    installer_matching.mark_stale()
+
+    response = client.get('/api/installers?lat=2.0&lon=38.5', headers=customer_auth_headers)
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert [i['id'] for i in data] == [near.id, far.id]
+    assert data[0]['distance_km'] < data[1]['distance_km']
+    assert 21 < data[1]['distance_km'] < 23
+
+def test_nearest_installers_prefers_category(client, session, customer_auth_headers):
+    """Test installers offering the requested category come before nearer ones that don't."""
+    residential = _installer(session, "Geo Residential", lat=2.01, lon=38.5, radius=50)
+    commercial = _installer(session, "Geo Commercial", lat=2.1, lon=38.5, radius=50, category="Commercial")
+    installer_matching.mark_stale()
+
+    response = client.get('/api/installers?lat=2.0&lon=38.5&category=commercial&limit=2', headers=customer_auth_headers)
+    assert [i['id'] for i in json.loads(response.data)] == [commercial.id, residential.id]
+
+def test_nearest_installers_for_analysis(client, session, customer_user, customer_auth_headers):
+    """Test an analysis id locates the customer, and installers without coordinates use their county."""
+    lamu = _installer(session, "Geo Lamu", county="Lamu County")
+    analysis = AnalysisRequest(user_id=customer_user.id, address="Lamu Old Town", latitude=-2.27,
+                               longitude=40.90, energy_consumption=300, roof_type_manual="Makuti")
+    session.add(analysis)
+    session.flush()
+    installer_matching.mark_stale()
+
+    response = client.get(f'/api/installers?analysis_id={analysis.id}', headers=customer_auth_headers)
+    assert response.status_code == 200
+    assert lamu.id in [i['id'] for i in json.loads(response.data)]
+
+    response = client.get('/api/installers?analysis_id=999999', headers=customer_auth_headers)
+    assert response.status_code == 404
+
+def test_update_service_area(client, installer_user, installer_auth_headers):
+    """Test an installer can set their own service area but not someone else's."""
+    response = client.put(f'/api/installers/{installer_user.id}/service-area', headers=installer_auth_headers,
+                          json={"latitude": -1.29, "longitude": 36.82, "service_radius_km": 25})
+    assert response.status_code == 200
+    assert json.loads(response.data)['service_radius_km'] == 25
+
+    response = client.put(f'/api/installers/{installer_user.id + 1}/service-area', headers=installer_auth_headers,
+                          json={"latitude": -1.29, "longitude": 36.82})
+    assert response.status_code == 403
+
+    response = client.put(f'/api/installers/{installer_user.id}/service-area', headers=installer_auth_headers,
+                          json={"latitude": 120, "longitude": 36.82})
+    assert response.status_code == 400
+
+# === Test lead status, reviews and installer_stats ===
+
+def test_review_updates_installer_stats(client, session, app, customer_user, customer_auth_headers,
+                                        installer_user, installer_auth_headers):
+    """Test lead and review writes keep the installer_stats row current."""
+    response = client.post('/api/quote-request', headers=customer_auth_headers, json={"installer_id": installer_user.id})
+    assert response.status_code == 201
+    lead = QuoteRequest.query.filter_by(customer_id=customer_user.id, installer_id=installer_user.id).first()
+
+    # Can't review before the job is done
+    response = client.post(f'/api/quote-requests/{lead.id}/review', headers=customer_auth_headers, json={"rating": 5})
+    assert response.status_code == 400
+
+    for status in ['Qualified', 'Completed']:
+        response = client.put(f'/api/installer-leads/{lead.id}/status', headers=installer_auth_headers, json={"status": status})
+        assert response.status_code == 200
+    response = client.put(f'/api/installer-leads/{lead.id}/status', headers=installer_auth_headers, json={"status": "Won"})
+    assert response.status_code == 400
+
+    response = client.post(f'/api/quote-requests/{lead.id}/review', headers=customer_auth_headers,
+                           json={"rating": 5, "comment": "Tidy work"})
+    assert response.status_code == 201
+    response = client.post(f'/api/quote-requests/{lead.id}/review', headers=customer_auth_headers, json={"rating": 1})
+    assert response.status_code == 409
+
+    stats = session.get(InstallerStats, installer_user.id)
+    session.refresh(stats)
+    prior_mean, prior_weight = app.config['REVIEW_PRIOR_MEAN'], app.config['REVIEW_PRIOR_WEIGHT']
+    assert (stats.lead_count, stats.qualified_count, stats.review_count, stats.rating_sum) == (1, 1, 1, 5)
+    assert stats.conversion_rate == 1.0
+    assert abs(stats.bayesian_rating - (prior_weight * prior_mean + 5) / (prior_weight + 1)) < 1e-9
+
+def test_concurrent_duplicate_review_conflicts(client, session, monkeypatch, customer_user, customer_auth_headers,
+                                               installer_user):
+    """Test a review that loses the race on the unique constraint gets a 409, not a 500."""
+    from models.review import InstallerReview
+    from sevices import installer_stats_service
+    lead = QuoteRequest(customer_id=customer_user.id, installer_id=installer_user.id, status='Completed')
+    session.add(lead)
+    session.flush()
+
+    def racing_record_review(installer_id, rating):
+        # Another request's review lands after our duplicate check
+        session.add(InstallerReview(quote_request_id=lead.id, installer_id=installer_id,
+                                    customer_id=customer_user.id, rating=4))
+
+    monkeypatch.setattr(installer_stats_service, 'record_review', racing_record_review)
+    response = client.post(f'/api/quote-requests/{lead.id}/review', headers=customer_auth_headers, json={"rating": 5})
+    assert response.status_code == 409
+
+def test_directory_reads_ratings(client, session, customer_auth_headers):
+    """Test the directory shows real review figures, best rated first."""
+    good = _installer(session, "Rated Good", county="Nairobi")
+    unrated = _installer(session, "Rated None", county="Nairobi")
+    session.add(InstallerStats(installer_id=good.id, review_count=40, rating_sum=196, bayesian_rating=4.87,
+                               lead_count=50, qualified_count=45, conversion_rate=0.9))
+    session.flush()
+
+    data = json.loads(client.get('/api/installers', headers=customer_auth_headers).data)
+    by_id = {i['id']: i for i in data}
+    assert by_id[good.id]['rating'] == 4.9 and by_id[good.id]['reviews'] == 40
+    assert by_id[unrated.id]['rating'] is None and by_id[unrated.id]['reviews'] == 0
+    ids = [i['id'] for i in data]
+    assert ids.index(good.id) < ids.index(unrated.id)
+
+# === Test GET /api/installer-leads ===
+
+def test_lead_inbox_pages_filters_and_counts(client, session, installer_user, installer_auth_headers, max_statements):
+    """Test leads come newest first in pages, filter by status, and carry counts and potential."""
+    customers = []
+    for n in range(3):
+        customer = User(full_name=f"Lead Customer {n}", email=f"lead{n}.{installer_user.id}@inbox.test", password_hash="x",
+                        user_name=f"CUS-Lead{n}-{installer_user.id}", role="customer", county="Kisumu")
+        session.add(customer)
+        customers.append(customer)
+    session.flush()
+    _analysis_for(session, customers[0], score=82)
+
+    for customer in customers:
+        client.post('/api/quote-request', headers=_auth(customer), json={"installer_id": installer_user.id})
+    newest = QuoteRequest.query.filter_by(customer_id=customers[2].id, installer_id=installer_user.id).first()
+    client.put(f'/api/installer-leads/{newest.id}/status', headers=installer_auth_headers, json={"status": "Contacted"})
+
+    with max_statements(3): # Installer, one page of leads with customers and tiers, counters
+        response = client.get('/api/installer-leads?per_page=2', headers=installer_auth_headers)
+    assert response.status_code == 200
+    page = json.loads(response.data)
+    assert [l['name'] for l in page['leads']] == ["Lead Customer 2", "Lead Customer 1"]
+    assert page['counts']['New'] == 2 and page['counts']['Contacted'] == 1
+    assert page['pagination']['has_more']
+
+    response = client.get(f"/api/installer-leads?per_page=2&cursor={page['pagination']['next_cursor']}", headers=installer_auth_headers)
+    page = json.loads(response.data)
+    assert [l['name'] for l in page['leads']] == ["Lead Customer 0"]
+    assert page['leads'][0]['potential'] == "High"
+    assert not page['pagination']['has_more']
+
+    response = client.get('/api/installer-leads?status=Contacted', headers=installer_auth_headers)
+    assert [l['id'] for l in json.loads(response.data)['leads']] == [newest.id]
+
+    response = client.get('/api/installer-leads?status=Bogus', headers=installer_auth_headers)
+    assert response.status_code == 400
+
+    response = client.get('/api/installer-leads?tier=High', headers=installer_auth_headers)
+    assert [l['name'] for l in json.loads(response.data)['leads']] == ["Lead Customer 0"]
+
+def test_banned_installer_leaves_directory(client, session, admin_auth_headers, customer_auth_headers):
+    """Test banning an installer drops them from the cached directory and the matching index."""
+    installer = _installer(session, "Geo Banned", lat=2.0, lon=38.5, radius=30)
+    installer_matching.mark_stale()
+    assert installer.id in [i['id'] for i in json.loads(client.get('/api/installers', headers=customer_auth_headers).data)]
+    assert installer.id in [i['id'] for i in json.loads(client.get('/api/installers?lat=2.0&lon=38.5', headers=customer_auth_headers).data)]
+
+    assert client.put(f'/api/admin/users/{installer.id}/ban', headers=admin_auth_headers).status_code == 200
+
+    assert installer.id not in [i['id'] for i in json.loads(client.get('/api/installers', headers=customer_auth_headers).data)]
+    assert installer.id not in [i['id'] for i in json.loads(client.get('/api/installers?lat=2.0&lon=38.5', headers=customer_auth_headers).data)]
+
+# === Test automatic lead routing ===
+
+def test_route_analysis_picks_and_skips(session, app, monkeypatch, customer_user):
+    """Test routing prefers the better rated of nearby installers, skips full and already-contacted ones, and inserts the rest."""
+    from models.stats import LeadStatusCount
+    from sevices import lead_routing
+    nearest = _installer(session, "Route Nearest", lat=4.50, lon=35.80, radius=15)
+    rated = _installer(session, "Route Rated", lat=4.55, lon=35.80, radius=15)
+    full = _installer(session, "Route Full", lat=4.50, lon=35.81, radius=15)
+    contacted = _installer(session, "Route Contacted", lat=4.51, lon=35.80, radius=15)
+    session.add_all([
+        InstallerStats(installer_id=rated.id, review_count=20, rating_sum=98, bayesian_rating=4.8,
+                       lead_count=0, qualified_count=0, conversion_rate=0.0),
+        LeadStatusCount(installer_id=full.id, status='New', count=app.config['INSTALLER_OPEN_LEAD_CAPACITY']),
+        QuoteRequest(customer_id=customer_user.id, installer_id=contacted.id, status='New'),
+    ])
+    analysis = AnalysisRequest(user_id=customer_user.id, address="Lodwar", latitude=4.50, longitude=35.80,
+                               energy_consumption=300, roof_type_manual="Iron Sheets", auto_route=True)
+    session.add(analysis)
+    session.flush()
+    installer_matching.mark_stale()
+
+    assert [i["id"] for i in lead_routing.select_installers(4.50, 35.80, 2)] == [rated.id, nearest.id]
+
+    # The already-contacted installer ranks with the nearest but gets no second lead
+    monkeypatch.setitem(app.config, 'AUTO_ROUTE_INSTALLERS', 3)
+    routed = lead_routing.route_analysis(analysis)
+    assert set(routed) == {rated.id, nearest.id}
+    assert QuoteRequest.query.filter_by(customer_id=customer_user.id, installer_id=contacted.id).count() == 1
+    assert session.get(QuoteRequest, routed[rated.id]).status == 'New'
+    assert session.get(InstallerStats, nearest.id).lead_count == 1
+
+    # Routing again finds nothing new to send
+    assert lead_routing.route_analysis(analysis) == {}
+
+def test_lead_digest_email(app, session, monkeypatch, customer_user, installer_user):
+    """Test the digest task sends the installer one email listing their routed leads."""
+    import tasks
+    from extensions import mail
+    lead = QuoteRequest(customer_id=customer_user.id, installer_id=installer_user.id, status='New')
+    session.add(lead)
+    session.flush()
+
+    sent = []
+    monkeypatch.setattr(app.extensions['mail'], 'default_sender', 'noreply@solarmatch.test')
+    monkeypatch.setattr(mail, 'send', sent.append)
+    tasks.send_lead_digest.run(installer_user.id, [lead.id])
+
+    assert len(sent) == 1
+    assert sent[0].recipients == [installer_user.email]
+    assert customer_user.full_name in sent[0].html
+
+# === Test POST /api/quote-requests ===
+
+def test_multi_installer_quote_requests(client, session, customer_user, customer_auth_headers, installer_user):
+    """Test one call creates leads for new installers and reports the ones already asked or unknown."""
+    other = _installer(session, "Multi Quote")
+    assert client.post('/api/quote-request', headers=customer_auth_headers,
+                       json={"installer_id": installer_user.id}).status_code == 201
+
+    response = client.post('/api/quote-requests', headers=customer_auth_headers,
+                           json={"installer_ids": [installer_user.id, other.id, other.id, customer_user.id]})
+    assert response.status_code == 201
+    data = json.loads(response.data)
+    assert [c['installer_id'] for c in data['created']] == [other.id]
+    assert data['existing'] == [installer_user.id]
+    assert data['not_found'] == [customer_user.id]
+    assert QuoteRequest.query.filter_by(customer_id=customer_user.id, installer_id=other.id).count() == 1
+    assert session.get(InstallerStats, other.id).lead_count == 1
+
+    response = client.post('/api/quote-requests', headers=customer_auth_headers, json={"installer_ids": [other.id]})
+    assert response.status_code == 200
+    assert json.loads(response.data)['existing'] == [other.id]
+
+    # The single-installer endpoint hits the same constraint
+    response = client.post('/api/quote-request', headers=customer_auth_headers, json={"installer_id": other.id})
+    assert response.status_code == 409
+
+    response = client.post('/api/quote-requests', headers=customer_auth_headers, json={"installer_ids": "all"})
+    assert response.status_code == 400
+
+# === Test contract signatures ===
+
+def test_contract_signature_stored_as_binary(client, session, installer_user, installer_auth_headers,
+                                             customer_auth_headers, admin_auth_headers):
+    """Test a signed contract keeps the decoded image out of normal loads and streams it back on request."""
+    import base64
+    import pytest
+    from sqlalchemy.exc import InvalidRequestError
+    from models.contract import SignedContract
+    svg = b'<svg xmlns="http://www.w3.org/2000/svg">' + b'<path d="M0 0 L10 10"/>' * 100 + b'</svg>'
+    data_uri = "data:image/svg+xml;base64," + base64.b64encode(svg).decode()
+
+    response = client.post(f'/api/installers/{installer_user.id}/contract', headers=installer_auth_headers,
+                           json={"signature": "not an image", "ipAddress": "127.0.0.1", "signedAt": "2026-10-19T10:00:00Z"})
+    assert response.status_code == 400
+    response = client.post(f'/api/installers/{installer_user.id}/contract', headers=installer_auth_headers,
+                           json={"signature": data_uri, "ipAddress": "127.0.0.1", "signedAt": "2026-10-19T10:00:00Z"})
+    assert response.status_code == 201
+
+    session.expire_all()
+    contract = SignedContract.query.filter_by(user_id=installer_user.id).one()
+    assert contract.signature_compressed and contract.signature_size == len(svg)
+    with pytest.raises(InvalidRequestError):
+        contract.signature_data # Deferred with raiseload: never loaded by accident
+
+    response = client.get(f'/api/installers/{installer_user.id}/contract/signature', headers=installer_auth_headers)
+    assert response.status_code == 200
+    assert response.mimetype == 'image/svg+xml'
+    assert response.data == svg
+    response = client.get(f'/api/installers/{installer_user.id}/contract/signature',
+                          headers={**installer_auth_headers, 'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 304
+
+    assert client.get(f'/api/installers/{installer_user.id}/contract/signature', headers=admin_auth_headers).status_code == 200
+    assert client.get(f'/api/installers/{installer_user.id}/contract/signature', headers=customer_auth_headers).status_code == 403
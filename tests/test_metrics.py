@@ -0,0 +1,60 @@
+# tests/test_metrics.py
+import pytest
+from prometheus_client import REGISTRY
+from utils import metrics
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+# === Test request and external call metrics ===
+
+def test_request_latency_per_route(client, installer_user, installer_auth_headers):
+    """Test requests are timed per blueprint and URL rule, not per concrete path."""
+    labels = dict(blueprint='installer', route='/api/installer-leads', method='GET', status='200')
+    before = _sample('solarmatch_http_request_duration_seconds_count', **labels)
+
+    client.get('/api/installer-leads', headers=installer_auth_headers)
+    assert _sample('solarmatch_http_request_duration_seconds_count', **labels) == before + 1
+
+    unmatched = dict(blueprint='app', route='unmatched', method='GET', status='404')
+    before = _sample('solarmatch_http_request_duration_seconds_count', **unmatched)
+    client.get('/api/no-such-page/123')
+    assert _sample('solarmatch_http_request_duration_seconds_count', **unmatched) == before + 1
+    assert _sample('solarmatch_http_requests_in_flight', blueprint='installer') == 0
+
+def test_external_call_outcomes():
+    """Test outside calls are timed, with failures labelled as errors."""
+    ok = _sample('solarmatch_external_call_duration_seconds_count', service='gemini', outcome='ok')
+    failed = _sample('solarmatch_external_call_duration_seconds_count', service='gemini', outcome='error')
+
+    with metrics.external_call('gemini'):
+        pass
+    with pytest.raises(TimeoutError):
+        with metrics.external_call('gemini'):
+            raise TimeoutError("Gemini timed out")
+
+    assert _sample('solarmatch_external_call_duration_seconds_count', service='gemini', outcome='ok') == ok + 1
+    assert _sample('solarmatch_external_call_duration_seconds_count', service='gemini', outcome='error') == failed + 1
+
+# === Test GET /metrics ===
+
+def test_metrics_endpoint(client, app, monkeypatch):
+    """Test /metrics serves the text format with queue depth, behind the token outside tests."""
+    import celery_config
+    monkeypatch.setattr(celery_config, 'queue_depth', lambda queue: 7)
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    body = response.get_data(as_text=True)
+    assert 'solarmatch_celery_queue_depth{queue="celery"} 7.0' in body
+    assert '# TYPE solarmatch_http_request_duration_seconds histogram' in body
+
+    monkeypatch.setitem(app.config, 'METRICS_TOKEN', 'scrape-secret')
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'}).status_code == 200
+
+    # In production it isn't served without a token
+    monkeypatch.setitem(app.config, 'METRICS_TOKEN', None)
+    monkeypatch.setitem(app.config, 'TESTING', False)
+    assert client.get('/metrics').status_code == 404
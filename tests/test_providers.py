@@ -0,0 +1,82 @@
+# tests/test_providers.py
+import io
+import pytest
+from models.analysis import AnalysisRequest, AnalysisResult
+from sevices import providers
+
+@pytest.fixture
+def offline(app, monkeypatch):
+    """Fake providers without waits or failures; tests switch the mode or rates as needed."""
+    monkeypatch.setitem(app.config, 'EXTERNAL_PROVIDERS', 'fake')
+    monkeypatch.setitem(app.config, 'FAKE_PROVIDER_LATENCY_SCALE', 0)
+    monkeypatch.setitem(app.config, 'FAKE_PROVIDER_ERROR_RATE', {})
+    return app.config
+
+# === Test fake providers ===
+
+def test_fake_payloads_are_deterministic(offline):
+    """Test fakes return pipeline-shaped payloads that depend only on their inputs."""
+    analysis = providers.solar_analysis("Kilimani, Nairobi", -1.29, 36.78, 600, "Tiles")
+    assert analysis == providers.solar_analysis("Kilimani, Nairobi", -1.29, 36.78, 600, "Tiles")
+    assert analysis != providers.solar_analysis("Kilimani, Nairobi", -1.29, 36.78, 900, "Tiles")
+    assert 0 < analysis["system_size_kw"] < 10 and analysis["panel_count"] > 0
+    assert analysis["roof_orientation_ai"] == "North" and 0 <= analysis["solar_suitability_score"] <= 100
+
+    layout = providers.ar_layout("https://res.cloudinary.com/roof.jpg", "Tiles")
+    assert len(layout) == 10 and all(len(p["position"]) == 3 and len(p["rotation"]) == 3 for p in layout)
+
+    photo = io.BytesIO(b"roof photo")
+    assert providers.upload_roof_image(photo) == providers.upload_roof_image(photo)
+    assert photo.read() == b"roof photo" # Left readable for whoever uses the file next
+
+def test_injected_failures(offline, monkeypatch):
+    """Test the configured error rate makes calls fail the way the live ones do."""
+    monkeypatch.setitem(offline, 'FAKE_PROVIDER_ERROR_RATE', {'solar_analysis': 1.0, 'roof_model': 1.0})
+    with pytest.raises(providers.ProviderError):
+        providers.solar_analysis("Nakuru", -0.3, 36.07, 400, "Iron Sheets")
+    assert providers.roof_model(-0.3, 36.07) is None # The 3D model is optional, its failures are not raised
+
+# === Test record / replay ===
+
+def test_record_then_replay(offline, monkeypatch, tmp_path):
+    """Test recorded live responses are replayed for the same inputs, and missing ones fail."""
+    live_calls = []
+    def live(address, lat, lon, energy_kwh, roof_type):
+        live_calls.append(address)
+        return {"panel_count": 14, "system_size_kw": 6.3}
+    monkeypatch.setattr(providers, '_live_solar_analysis', live)
+    monkeypatch.setitem(offline, 'PROVIDER_FIXTURES_DIR', str(tmp_path))
+
+    monkeypatch.setitem(offline, 'EXTERNAL_PROVIDERS', 'record')
+    recorded = providers.solar_analysis("Thika", -1.03, 37.07, 500, "Tiles")
+    assert len(list(tmp_path.glob('solar_analysis/*.json'))) == 1
+
+    monkeypatch.setitem(offline, 'EXTERNAL_PROVIDERS', 'replay')
+    assert providers.solar_analysis("Thika", -1.03, 37.07, 500, "Tiles") == recorded
+    assert live_calls == ["Thika"]
+    with pytest.raises(providers.ProviderError):
+        providers.solar_analysis("Thika", -1.03, 37.07, 501, "Tiles")
+
+def test_live_upload_not_hashed(offline, monkeypatch):
+    """Test live uploads go straight to Cloudinary, without reading the photo for a fixture key."""
+    class Photo(io.BytesIO):
+        def read(self, *args):
+            raise AssertionError("photo was read")
+    monkeypatch.setattr(providers, '_live_roof_upload', lambda image_file: "https://res.cloudinary.com/roof.jpg")
+    monkeypatch.setitem(offline, 'EXTERNAL_PROVIDERS', 'live')
+    assert providers.upload_roof_image(Photo(b"roof photo")) == "https://res.cloudinary.com/roof.jpg"
+
+def test_analysis_pipeline_offline(offline, session, customer_user):
+    """Test run_ai_analysis completes against the fake providers."""
+    import tasks
+
+    req = AnalysisRequest(user_id=customer_user.id, address="Karen, Nairobi", latitude=-1.32, longitude=36.7,
+                          energy_consumption=700, roof_type_manual="Tiles",
+                          roof_image_url="https://res.cloudinary.com/solarmatch-fake/roof.jpg")
+    res = AnalysisResult(request=req, status='PENDING')
+    session.add_all([req, res])
+    session.flush()
+
+    tasks.run_ai_analysis.run(req.id)
+    assert res.status == 'COMPLETED'
+    assert res.system_size_kw and res.panel_layout_json and res.lead_tier
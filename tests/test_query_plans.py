@@ -0,0 +1,111 @@
+# tests/test_query_plans.py
+"""
+Query plan regression checks. Seeds a few tens of thousands of rows, calls
+the hot read routes, runs EXPLAIN on every SELECT they issue and fails if
+the plan reads one of the large tables with a sequential scan.
+
+Needs Postgres (SQLite plans say nothing about production), so it is
+skipped unless the suite runs against one:
+    DATABASE_URL=postgresql://localhost/solarmatch_plans pytest tests/test_query_plans.py
+Everything is seeded inside the test transaction and rolled back.
+"""
+from datetime import datetime, timedelta, timezone
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, insert, select, text
+from extensions import db
+from models.analysis import AnalysisRequest, AnalysisResult
+from models.login_code import LoginCode
+from models.quote_request import QuoteRequest
+from models.user import User
+
+# Tables big enough in production that a sequential scan on a request path is a bug
+LARGE_TABLES = {'users', 'analysis_requests', 'analysis_results', 'quote_requests', 'login_codes'}
+SEED_USERS, SEED_INSTALLERS = 20000, 200
+
+def _seed(session, customer, installer):
+    now = datetime.now(timezone.utc)
+    session.execute(insert(User), [{
+        "full_name": f"Plan User {i}", "email": f"plan{i}@plans.test", "password_hash": "x",
+        "user_name": f"PLN-{i}", "role": "installer" if i < SEED_INSTALLERS else "customer",
+        "created_at": now - timedelta(minutes=i)
+    } for i in range(SEED_USERS)])
+    seeded = session.execute(select(User.id, User.role).where(User.email.like('%@plans.test'))).all()
+    installers = [uid for uid, role in seeded if role == 'installer']
+    customers = [uid for uid, role in seeded if role == 'customer'] + [customer.id]
+
+    # Two analyses per customer, two leads per customer spread over the installers
+    session.execute(insert(AnalysisRequest), [{
+        "user_id": uid, "address": "Nairobi", "latitude": -1.29, "longitude": 36.82,
+        "energy_consumption": 500 + n, "created_at": now - timedelta(hours=n, minutes=uid % 60)
+    } for uid in customers for n in range(2)])
+    request_ids = session.execute(select(AnalysisRequest.id).where(AnalysisRequest.user_id.in_(customers))).scalars().all()
+    session.execute(insert(AnalysisResult), [{
+        "request_id": rid, "status": "COMPLETED", "solar_suitability_score": rid % 100,
+        "lead_score": float(rid % 100), "lead_tier": "Medium", "completed_at": now
+    } for rid in request_ids])
+
+    session.execute(insert(QuoteRequest), [{
+        "customer_id": uid, "installer_id": installers[(n * 7 + i) % len(installers)], "status": "New"
+    } for i, uid in enumerate(customers) for n in range(2)])
+    # The installer under test gets a realistic inbox rather than a share of every customer
+    session.execute(insert(QuoteRequest), [
+        {"customer_id": uid, "installer_id": installer.id, "status": "New"} for uid in customers[:50]
+    ])
+
+    session.execute(insert(LoginCode), [{
+        "user_id": uid, "code": f"{uid % 1000000:06d}", "expires_at": now + timedelta(minutes=10)
+    } for uid in installers + customers])
+
+    session.execute(text("ANALYZE " + ", ".join(sorted(LARGE_TABLES))))
+
+def _seq_scans(node):
+    if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in LARGE_TABLES:
+        yield node["Relation Name"]
+    for child in node.get("Plans", []):
+        yield from _seq_scans(child)
+
+def test_hot_routes_avoid_seq_scans(app, session, client, monkeypatch, customer_user, installer_user, admin_user):
+    """Test the hot read routes' queries are planned as index scans on the large tables."""
+    if session.bind.dialect.name != 'postgresql':
+        pytest.skip("Query plan checks need DATABASE_URL pointing at a local Postgres")
+    monkeypatch.setitem(app.config, 'CACHE_ENABLED', False) # Every request must reach the database
+
+    _seed(session, customer_user, installer_user)
+    auth = {user.role: {"Authorization": f"Bearer {create_access_token(identity=str(user.id))}"}
+            for user in (customer_user, installer_user, admin_user)}
+
+    routes = [
+        ("GET", "/api/analysis/latest", auth["customer"], None),
+        ("GET", "/api/installer-leads", auth["installer"], None),
+        ("GET", "/api/installer-leads?status=New", auth["installer"], None),
+        ("GET", "/api/installer-reports", auth["installer"], None),
+        ("GET", "/api/installer-reports?sort=score", auth["installer"], None),
+        ("GET", "/api/admin/installers", auth["admin"], None),
+        # Wrong code: the lookup runs, nothing is written
+        ("POST", "/api/auth/confirm", {}, {"user_name": customer_user.user_name, "code": "XXXXXX"}),
+    ]
+
+    captured = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            captured.append((route, statement, parameters))
+
+    failures = []
+    event.listen(db.engine, "before_cursor_execute", capture)
+    try:
+        for method, route, headers, body in routes:
+            before = len(captured)
+            response = client.open(route, method=method, headers=headers, json=body)
+            assert response.status_code < 500, f"{route}: {response.status_code}"
+            assert len(captured) > before, f"{route} ran no queries"
+    finally:
+        event.remove(db.engine, "before_cursor_execute", capture)
+
+    for route, statement, parameters in captured:
+        plan = session.connection().exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+        scanned = sorted(set(_seq_scans(plan[0]["Plan"])))
+        if scanned:
+            failures.append(f"{route}: Seq Scan on {', '.join(scanned)}\n    {statement}")
+
+    assert not failures, "Plans regressed to sequential scans:\n" + "\n".join(failures)
@@ -0,0 +1,83 @@
+# tests/test_rate_limit.py
+import uuid
+import pytest
+import redis
+from utils import rate_limit, redis_client
+
+@pytest.fixture
+def limits(app, monkeypatch):
+    """Rate limiting on, with the given limits, and empty fallback windows."""
+    monkeypatch.setitem(app.config, 'RATE_LIMIT_ENABLED', True)
+    monkeypatch.setitem(app.config, 'RATE_LIMITS', {})
+    rate_limit.reset()
+    yield app.config['RATE_LIMITS']
+    rate_limit.reset()
+
+@pytest.fixture
+def local_only(monkeypatch):
+    """The in-memory fallback, as when Redis is down."""
+    monkeypatch.setattr(rate_limit, 'get_redis', lambda: None)
+
+# === Test rate limited routes ===
+
+def _from(address):
+    return {'environ_base': {'REMOTE_ADDR': address}}
+
+def test_contact_limited_per_ip(client, limits, local_only, monkeypatch):
+    """Test a client over its limit gets 429 with Retry-After, while other addresses still get through."""
+    monkeypatch.setenv('CONTACT_EMAIL', 'support@solarmatch.test')
+    limits['contact'] = [('ip', 2, 60)]
+    form = {"name": "Wanjiru", "email": "wanjiru@example.com", "subject": "Quote", "message": "Hello"}
+
+    assert [client.post('/api/contact', json=form, **_from('203.0.113.7')).status_code for _ in range(2)] == [200, 200]
+    # Without TRUSTED_PROXIES a made-up X-Forwarded-For doesn't give the client a fresh address
+    blocked = client.post('/api/contact', json=form, headers={'X-Forwarded-For': '192.0.2.99'}, **_from('203.0.113.7'))
+    assert blocked.status_code == 429 and 'error' in blocked.json
+    assert 55 <= int(blocked.headers['Retry-After']) <= 60
+
+    assert client.post('/api/contact', json=form, **_from('198.51.100.20')).status_code == 200
+
+def test_login_limited_per_account_and_address(client, limits, local_only, customer_user):
+    """Test password guesses from one address are limited, and rejected attempts don't count."""
+    limits['login'] = [('user_ip', 2, 60), ('ip', 10, 60)]
+    attempt = {"user_name": customer_user.user_name, "password": "wrong"}
+
+    statuses = [client.post('/api/auth/login', json=attempt, **_from('192.0.2.1')).status_code for _ in range(4)]
+    assert statuses == [401, 401, 429, 429]
+    # The other limit only counted the attempts that got through
+    assert len(rate_limit._local_windows['ratelimit:login:ip:192.0.2.1:60']) == 2
+    other = client.post('/api/auth/login', json={"user_name": "CUS-nobody", "password": "x"}, **_from('192.0.2.1'))
+    assert other.status_code == 404
+
+def test_login_lockout_does_not_block_owner(client, limits, local_only, customer_user):
+    """Test an attacker locked out of an account doesn't stop its owner logging in from elsewhere."""
+    limits['login'] = [('user_ip', 2, 60), ('ip', 10, 60)]
+    guess = {"user_name": customer_user.user_name, "password": "wrong"}
+    for _ in range(3):
+        client.post('/api/auth/login', json=guess, **_from('203.0.113.66'))
+    assert client.post('/api/auth/login', json=guess, **_from('203.0.113.66')).status_code == 429
+
+    owner = {"user_name": customer_user.user_name, "password": "password"}
+    assert client.post('/api/auth/login', json=owner, **_from('198.51.100.8')).status_code == 200
+
+# === Test the Redis script ===
+
+def test_redis_sliding_window(app, monkeypatch):
+    """Test the Lua script counts a request in every window only when all have room (needs a local Redis)."""
+    monkeypatch.setattr(redis_client, '_down_until', 0.0) # Other tests' Redis failures back it off
+    client = redis_client.get_redis()
+    try:
+        client.ping()
+    except (AttributeError, redis.RedisError):
+        pytest.skip("Redis is not available")
+
+    hourly, burst = f"ratelimit:test:{uuid.uuid4().hex}:a", f"ratelimit:test:{uuid.uuid4().hex}:b"
+    try:
+        assert rate_limit.check([hourly], [(2, 3600)]) == 0
+        assert rate_limit.check([hourly, burst], [(2, 3600), (5, 60)]) == 0
+        wait = rate_limit.check([hourly, burst], [(2, 3600), (5, 60)])
+        assert 3590 < wait <= 3600
+        assert client.zcard(hourly) == 2 and client.zcard(burst) == 1 # The rejected request wasn't recorded
+        assert 0 < client.pttl(burst) <= 60000
+    finally:
+        client.delete(hourly, burst)
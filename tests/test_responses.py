@@ -0,0 +1,41 @@
+# tests/test_responses.py
+import gzip
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+import brotli
+
+# === Test the JSON provider ===
+
+def test_json_provider_types(app):
+    """Test jsonify writes datetimes as ISO 8601 and keeps Flask's handling of other types."""
+    moment = datetime(2026, 3, 1, 9, 30, 15, 250000, tzinfo=timezone.utc)
+    with app.test_request_context():
+        response = app.json.response({"at": moment, "day": moment.date(), "price": Decimal("1.50"), "counts": {3: "x"}})
+    assert response.mimetype == 'application/json' and response.data.endswith(b"\n")
+    assert json.loads(response.data) == {
+        "at": moment.isoformat(), "day": "2026-03-01", "price": "1.50", "counts": {"3": "x"},
+    }
+    assert app.json.loads(app.json.dumps({"b": [1, 2.5, None]})) == {"b": [1, 2.5, None]}
+
+# === Test compression ===
+
+def test_responses_compressed_as_negotiated(app, client, monkeypatch, admin_auth_headers, customer_user):
+    """Test large JSON responses are brotli/gzip encoded as the client accepts, small ones never."""
+    monkeypatch.setitem(app.config, 'COMPRESS_MIN_SIZE', 200)
+    plain = client.get('/api/admin/users', headers=admin_auth_headers)
+    assert len(plain.data) >= 200 and 'Content-Encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.headers['Vary']
+
+    br = client.get('/api/admin/users', headers={**admin_auth_headers, 'Accept-Encoding': 'gzip, deflate, br'})
+    assert br.headers['Content-Encoding'] == 'br'
+    assert json.loads(brotli.decompress(br.data)) == plain.json
+    assert int(br.headers['Content-Length']) == len(br.data) < len(plain.data)
+
+    gz = client.get('/api/admin/users', headers={**admin_auth_headers, 'Accept-Encoding': 'br;q=0.5, gzip'})
+    assert gz.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(gz.data)) == plain.json
+
+    monkeypatch.setitem(app.config, 'COMPRESS_MIN_SIZE', len(plain.data) + 1)
+    small = client.get('/api/admin/users', headers={**admin_auth_headers, 'Accept-Encoding': 'br'})
+    assert 'Content-Encoding' not in small.headers and small.data == plain.data
@@ -0,0 +1,35 @@
+# tests/test_sql_profiler.py
+from sqlalchemy import select
+from extensions import db
+from models.user import User
+from utils import sql_profiler
+
+# === Test statement counting ===
+
+def test_repeated_statements_flagged(app, session, customer_user, installer_user):
+    """Test statements are counted by shape and repeats and overruns are reported."""
+    with sql_profiler.collect('GET /api/example') as stats:
+        for _ in range(5):
+            db.session.execute(select(User.full_name).where(User.id == customer_user.id)).all()
+        # Different IN-list lengths are one shape
+        db.session.execute(select(User.id).where(User.id.in_([customer_user.id]))).all()
+        db.session.execute(select(User.id).where(User.id.in_([customer_user.id, installer_user.id]))).all()
+
+    assert stats.count == 7 and stats.seconds > 0
+    assert sorted(stats.shapes.values()) == [2, 5]
+
+    warnings = sql_profiler.check(stats, budget=6)
+    assert len(warnings) == 2
+    assert "7 SQL statements (budget 6)" in warnings[0]
+    assert "run 5x, likely an N+1" in warnings[1]
+    assert sql_profiler.check(stats, budget=10)[0].startswith("GET /api/example: same statement run 5x")
+
+def test_server_timing_header(client, app, monkeypatch, installer_auth_headers):
+    """Test request totals are only sent back when the debug header is switched on."""
+    response = client.get('/api/installer-leads', headers=installer_auth_headers)
+    assert 'Server-Timing' not in response.headers
+
+    monkeypatch.setitem(app.config, 'SQL_PROFILE_HEADER', True)
+    response = client.get('/api/installer-leads', headers=installer_auth_headers)
+    assert response.headers['Server-Timing'].startswith('db;dur=')
+    assert 'statements"' in response.headers['Server-Timing']
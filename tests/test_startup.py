@@ -0,0 +1,23 @@
+# tests/test_startup.py
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter, the way gunicorn loads the app
+LOAD_WSGI = """
+import sys
+import app, wsgi
+print(app.get_app() is wsgi.app, *sorted(m for m in ('google.generativeai', 'PIL', 'cloudinary', 'alembic') if m in sys.modules))
+"""
+
+# === Test startup ===
+
+def test_wsgi_builds_one_app_without_heavy_sdks():
+    """Test importing wsgi builds the process's single app, without REDIS_URL and without importing the SDKs only some requests need."""
+    env = {key: value for key, value in os.environ.items() if key not in ('REDIS_URL', 'FLASK_RUN_FROM_CLI')}
+    env.update(DATABASE_URL='sqlite://', SECRET_KEY='startup-test-secret-key-which-is-long-enough')
+    out = subprocess.run([sys.executable, '-c', LOAD_WSGI], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    assert out.split() == ['True']
@@ -0,0 +1,270 @@
+# solarmatch-server/utils/cache.py
+"""
+Two-tier cache for expensive read paths.
+
+L1 is a per-process LRU (cachetools); L2 is the shared Redis. Entries carry
+tags; invalidate_tags() drops them from Redis and broadcasts the tags over
+pub/sub so every gunicorn worker clears its L1 too. Concurrent misses on
+the same key are coalesced: one caller computes, the rest wait for it.
+
+Cached values are shared between requests, so treat them as read-only.
+"""
+import json
+import os
+import pickle
+import threading
+import time
+import uuid
+from functools import wraps
+import redis
+from cachetools import LRUCache
+from flask import current_app
+from utils.redis_client import get_redis, report_redis_error
+from utils.db_engines import primary_reads
+
+KEY_PREFIX = 'cache:'
+TAG_PREFIX = 'cache:tag:'
+LOCK_PREFIX = 'cache:lock:'
+CHANNEL = 'cache:invalidate'
+
+# L1: key -> (expires_at, tags, value)
+_local = LRUCache(maxsize=1024)
+_local_lock = threading.Lock()
+
+# Per-key locks for in-process single-flight: key -> [lock, threads using it].
+# An entry is dropped once its last thread is done, so the dict stays small.
+_flight_locks = {}
+_flight_guard = threading.Lock()
+
+# tag -> callbacks run whenever that tag is invalidated (in any process)
+_listeners = {}
+
+_subscriber_pid = None
+
+# Delete the lock only if we still own it
+_RELEASE_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def on_invalidate(tag, callback):
+    """Run callback() whenever `tag` is invalidated, here or in another worker."""
+    _listeners.setdefault(tag, []).append(callback)
+
+
+def clear_local():
+    with _local_lock:
+        _local.clear()
+
+
+def _drop_local(tags):
+    tags = set(tags)
+    with _local_lock:
+        stale = [k for k, (_, entry_tags, _) in _local.items() if tags & entry_tags]
+        for k in stale:
+            _local.pop(k, None)
+    for tag in tags:
+        for callback in _listeners.get(tag, []):
+            callback()
+
+
+def _local_get(key):
+    with _local_lock:
+        entry = _local.get(key)
+    if entry and entry[0] > time.monotonic():
+        return True, entry[2]
+    return False, None
+
+
+def _local_set(key, value, ttl, tags):
+    l1_ttl = min(ttl, current_app.config['CACHE_L1_TTL'])
+    with _local_lock:
+        _local[key] = (time.monotonic() + l1_ttl, frozenset(tags), value)
+
+
+def _listen_for_invalidations(url):
+    """Background thread: drop L1 entries for tags invalidated by other processes."""
+    while True:
+        subscribed = False
+        try:
+            client = redis.Redis.from_url(url, health_check_interval=30)
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(CHANNEL)
+            subscribed = True
+            for message in pubsub.listen():
+                message_data = json.loads(message['data'])
+                if message_data.get('pid') != os.getpid():
+                    _drop_local(message_data['tags'])
+        except Exception:
+            if subscribed:
+                # We may have missed invalidations while reconnecting
+                clear_local()
+            time.sleep(5)
+
+
+def _ensure_subscriber():
+    global _subscriber_pid
+    # One listener per process; a forked gunicorn worker starts its own
+    if _subscriber_pid == os.getpid():
+        return
+    url = current_app.config.get('REDIS_URL') or os.environ.get('REDIS_URL')
+    if not url:
+        return
+    _subscriber_pid = os.getpid()
+    threading.Thread(target=_listen_for_invalidations, args=(url,), name='cache-invalidation', daemon=True).start()
+
+
+def _redis_get(client, key):
+    raw = client.get(KEY_PREFIX + key)
+    if raw is None:
+        return False, None
+    return True, pickle.loads(raw)
+
+
+def _redis_set(client, key, value, ttl, tags):
+    pipe = client.pipeline(transaction=False)
+    pipe.set(KEY_PREFIX + key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ex=ttl)
+    for tag in tags:
+        pipe.sadd(TAG_PREFIX + tag, key)
+        pipe.expire(TAG_PREFIX + tag, max(ttl, 3600))
+    pipe.execute()
+
+
+def _compute_with_redis_lock(client, key, compute, ttl, tags):
+    """Cross-process single-flight: one worker computes, the others poll L2 briefly."""
+    token = uuid.uuid4().hex
+    lock_key = LOCK_PREFIX + key
+    if client.set(lock_key, token, nx=True, px=int(current_app.config['CACHE_LOCK_TIMEOUT'] * 1000)):
+        try:
+            value = compute()
+            try:
+                _redis_set(client, key, value, ttl, tags)
+            except redis.RedisError as e:
+                # Keep the value we already paid for; only the L2 write is lost
+                report_redis_error(e)
+            return value
+        finally:
+            try:
+                client.eval(_RELEASE_LOCK, 1, lock_key, token)
+            except redis.RedisError:
+                pass # The lock expires on its own after CACHE_LOCK_TIMEOUT
+
+    deadline = time.monotonic() + current_app.config['CACHE_LOCK_WAIT']
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        found, value = _redis_get(client, key)
+        if found:
+            return value
+    # The other worker is slow or died; compute rather than fail
+    return compute()
+
+
+def _flight_acquire(key):
+    with _flight_guard:
+        entry = _flight_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    entry[0].acquire()
+    return entry[0]
+
+
+def _flight_release(key, lock):
+    lock.release()
+    with _flight_guard:
+        entry = _flight_locks[key]
+        entry[1] -= 1
+        if not entry[1]:
+            del _flight_locks[key]
+
+
+def _fill(key, compute, ttl, tags):
+    found, value = _local_get(key)
+    if found:
+        return value
+
+    client = get_redis()
+    if client is not None:
+        _ensure_subscriber()
+        try:
+            found, value = _redis_get(client, key)
+            if not found:
+                value = _compute_with_redis_lock(client, key, compute, ttl, tags)
+            _local_set(key, value, ttl, tags)
+            return value
+        except redis.RedisError as e:
+            report_redis_error(e)
+
+    value = compute()
+    _local_set(key, value, ttl, tags)
+    return value
+
+
+def get_or_compute(key, compute, ttl, tags=()):
+    found, value = _local_get(key)
+    if found:
+        return value
+
+    # In-process single-flight: the first thread computes, the rest wait on its lock
+    flight_lock = _flight_acquire(key)
+    try:
+        return _fill(key, compute, ttl, tags)
+    finally:
+        _flight_release(key, flight_lock)
+
+
+def invalidate_tags(*tags):
+    """
+    Drop every entry carrying any of `tags`, in this process, in Redis and
+    (via pub/sub) in every other worker. Call it after the write commits.
+    """
+    tags = [t for t in tags if t]
+    if not tags:
+        return
+    _drop_local(tags)
+
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        keys = set()
+        for tag in tags:
+            keys.update(k.decode() for k in client.smembers(TAG_PREFIX + tag))
+        pipe = client.pipeline(transaction=False)
+        if keys:
+            pipe.delete(*[KEY_PREFIX + k for k in keys])
+        pipe.delete(*[TAG_PREFIX + t for t in tags])
+        pipe.publish(CHANNEL, json.dumps({"tags": tags, "pid": os.getpid()}))
+        pipe.execute()
+    except redis.RedisError as e:
+        report_redis_error(e)
+
+
+def _from_primary(fn, args, kwargs):
+    # A fill outlives the request, so it mustn't capture a lagging replica's view
+    with primary_reads():
+        return fn(*args, **kwargs)
+
+
+def cached(name, ttl=60, tags=(), key=None):
+    """
+    Cache a function's return value in L1 + L2.
+
+    name: key prefix, e.g. 'installers:directory'
+    ttl:  seconds in Redis (L1 keeps entries for at most CACHE_L1_TTL)
+    tags: list of tags, or a callable taking the function's arguments
+    key:  callable taking the function's arguments and returning the key
+          suffix; defaults to the positional arguments joined with ':'
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not current_app.config.get('CACHE_ENABLED', True):
+                return fn(*args, **kwargs)
+            suffix = key(*args, **kwargs) if key else ':'.join(str(a) for a in args)
+            cache_key = f"{name}:{suffix}" if suffix else name
+            entry_tags = tags(*args, **kwargs) if callable(tags) else tags
+            return get_or_compute(cache_key, lambda: _from_primary(fn, args, kwargs), ttl, entry_tags)
+        return wrapper
+    return decorator
@@ -0,0 +1,55 @@
+# solarmatch-server/utils/compression.py
+"""
+Negotiated response compression: JSON and other text responses of at
+least COMPRESS_MIN_SIZE bytes are sent brotli- or gzip-encoded, whichever
+the client's Accept-Encoding prefers (brotli on a tie).
+
+Streamed responses (the admin exports, which gzip themselves with
+?gzip=true) and anything already encoded are left alone. ETags stay
+valid: utils/http_cache.py sets weak ones.
+"""
+import gzip
+
+import brotli
+from flask import request
+
+
+def _encoding(accept_encodings):
+    """'br', 'gzip' or None for the request's Accept-Encoding."""
+    br, gz = accept_encodings.quality('br'), accept_encodings.quality('gzip')
+    if br and br >= gz:
+        return 'br'
+    if gz:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['COMPRESS_BROTLI_QUALITY'])
+    return gzip.compress(data, compresslevel=config['COMPRESS_GZIP_LEVEL'], mtime=0)
+
+
+def init_app(app):
+    """Compresses `app`'s responses for clients that accept it."""
+    if not app.config.get('COMPRESS_ENABLED', True):
+        return
+    config = app.config
+    mimetypes = set(config['COMPRESS_MIMETYPES'])
+
+    @app.after_request
+    def _compress_response(response):
+        if (response.direct_passthrough or response.is_streamed
+                or response.status_code < 200 or response.status_code in (204, 206, 304)
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in mimetypes
+                or (response.content_length or 0) < config['COMPRESS_MIN_SIZE']):
+            return response
+
+        response.vary.add('Accept-Encoding') # Caches must key on it, whatever this client gets
+        encoding = _encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+        response.set_data(compress(response.get_data(), encoding, config))
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,119 @@
+# solarmatch-server/utils/db_engines.py
+"""
+Engine settings per kind of process, and read-replica routing.
+
+Each process picks a profile with DB_ENGINE_PROFILE: gunicorn runs 'web'
+('web-gevent' with gevent workers), Celery workers 'worker', and
+run_tasks.py (the cron job that drains the queue and exits) 'cron-drain'. Settings only apply to Postgres; SQLite in
+development and tests keeps Flask-SQLAlchemy's defaults.
+
+Views decorated with @use_replica send their SELECTs to the 'replica' bind
+when DATABASE_REPLICA_URL is set, until the session writes anything.
+Cache fills read the primary (see utils/cache.py), so replication lag is
+never stored for a whole TTL.
+"""
+from contextlib import contextmanager
+from functools import wraps
+from flask import g, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.pool import NullPool
+from sqlalchemy.sql import Select
+
+REPLICA_BIND = 'replica'
+
+# pool_recycle stays under the ~5 minute idle timeouts of hosted Postgres and
+# PgBouncer; pool_pre_ping catches whatever gets closed before that.
+ENGINE_PROFILES = {
+    # Many short requests: fail fast on an exhausted pool or a runaway query
+    'web': {"pool_size": 5, "max_overflow": 10, "pool_timeout": 10, "pool_recycle": 280,
+            "statement_timeout_ms": 15000},
+    # The same requests, but up to worker_connections of them at once per process
+    'web-gevent': {"pool_size": 10, "max_overflow": 20, "pool_timeout": 10, "pool_recycle": 280,
+                   "statement_timeout_ms": 15000},
+    # Few long-lived connections; batch jobs may run slow queries
+    'worker': {"pool_size": 2, "max_overflow": 2, "pool_timeout": 30, "pool_recycle": 280,
+               "statement_timeout_ms": 300000},
+    # One short-lived process: no pool to keep warm, connect per checkout
+    'cron-drain': {"poolclass": NullPool, "statement_timeout_ms": 600000},
+}
+
+
+def engine_options(uri, profile='web', pgbouncer=False):
+    """
+    create_engine() keyword arguments for a database URI under a profile.
+    With pgbouncer=True the pooling is left to PgBouncer (transaction mode):
+    no client-side pool, and the statement timeout is set per transaction
+    because PgBouncer rejects the `options` startup parameter.
+    """
+    if not uri or not uri.startswith('postgresql'):
+        return {}
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown DB_ENGINE_PROFILE {profile!r}, expected one of: {', '.join(ENGINE_PROFILES)}")
+
+    settings = dict(ENGINE_PROFILES[profile])
+    timeout_ms = settings.pop('statement_timeout_ms')
+    connect_args = {"application_name": f"solarmatch-{profile}"}
+    if pgbouncer:
+        return {
+            "poolclass": NullPool,
+            "connect_args": connect_args,
+            "execution_options": {"statement_timeout_ms": timeout_ms},
+        }
+    connect_args["options"] = f"-c statement_timeout={timeout_ms}"
+    return {"pool_pre_ping": True, **settings, "connect_args": connect_args}
+
+
+def use_replica(view):
+    """Let a read-only view's queries go to the replica bind, if there is one."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_use_replica = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def primary_reads():
+    """Reads inside this block go to the primary even in a @use_replica view."""
+    if not has_request_context():
+        yield
+        return
+    previous = g.get('db_use_replica', False)
+    g.db_use_replica = False
+    try:
+        yield
+    finally:
+        g.db_use_replica = previous
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy's session, sending replica-eligible SELECTs to the replica bind."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._reads_from_replica(clause):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _reads_from_replica(self, clause):
+        return (
+            has_request_context() and g.get('db_use_replica', False)
+            and isinstance(clause, Select) and clause._for_update_arg is None
+            # Read-your-writes: once this session has written, stay on the primary
+            and not self.info.get('wrote') and not (self.new or self.dirty or self.deleted)
+        )
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_written(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_begin')
+def _set_transaction_timeout(session, transaction, connection):
+    # Only engines in PgBouncer mode carry this option (see engine_options)
+    timeout_ms = connection.get_execution_options().get('statement_timeout_ms')
+    if timeout_ms:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
@@ -0,0 +1,26 @@
+# solarmatch-server/utils/db_helpers.py
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from extensions import db
+
+
+def upsert_insert(model):
+    """
+    INSERT construct for the current database that supports
+    .on_conflict_do_update() / .on_conflict_do_nothing().
+    Postgres in production, SQLite in development and tests.
+    """
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+def utc_date(column):
+    """
+    Calendar date of a timestamp column in UTC. On Postgres, date() of a
+    timestamptz follows the session TimeZone, so convert to UTC first;
+    SQLite stores the UTC value as-is.
+    """
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return func.date(func.timezone('UTC', column))
+    return func.date(column)
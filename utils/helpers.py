@@ -16,4 +16,8 @@ def generate_username(full_name, role):
     else:
         prefix = "USR"
 
-    return f"{prefix}-{first_name}-{random_digits}"
\ No newline at end of file
+    return f"{prefix}-{first_name}-{random_digits}"
+
+def escape_like(term):
+    """Escape LIKE wildcards so user input is matched literally (use with escape='\\')."""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
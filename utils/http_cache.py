@@ -0,0 +1,46 @@
+# solarmatch-server/utils/http_cache.py
+import hashlib
+from datetime import timezone
+from flask import request, current_app
+
+
+def make_etag(*parts):
+    """Short stable ETag value from whatever identifies a representation's version."""
+    return hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:32]
+
+
+def _utc(moment):
+    if moment is None:
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc) # SQLite drops the offset
+    return moment.astimezone(timezone.utc)
+
+
+def is_not_modified(etag, last_modified=None):
+    """
+    True when the client's cached copy is still current. Call this with
+    cheap validators *before* loading/serializing the full resource.
+    If-None-Match wins over If-Modified-Since, as per RFC 9110.
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    last_modified = _utc(last_modified)
+    if last_modified and request.if_modified_since:
+        # HTTP dates have one-second resolution
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def with_validators(response, etag, last_modified=None, cache_control=None):
+    """Attach ETag / Last-Modified / Cache-Control to a response (or a 304)."""
+    response.set_etag(etag, weak=True) # Weak: compression may change the bytes
+    if last_modified:
+        response.last_modified = _utc(last_modified)
+    response.headers["Cache-Control"] = cache_control or current_app.config["PRIVATE_CACHE_CONTROL"]
+    return response
+
+
+def not_modified_response(etag, last_modified=None, cache_control=None):
+    response = current_app.response_class(status=304)
+    return with_validators(response, etag, last_modified, cache_control)
@@ -0,0 +1,40 @@
+# solarmatch-server/utils/json_provider.py
+"""
+Flask JSON provider backed by orjson: jsonify() and request.get_json()
+go through it. orjson serializes several times faster than the stdlib
+encoder and writes bytes straight into the response.
+
+Unlike Flask's default, datetimes and dates come out as ISO 8601 (the same
+strings .isoformat() gives) instead of HTTP dates, so views can return
+them as they are. Other types Flask knows about (Decimal, UUID, dataclasses)
+are handled as before, and sort_keys / compact are honoured.
+"""
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    def _options(self, indent=False):
+        option = orjson.OPT_NON_STR_KEYS # The stdlib encoder accepts int keys too
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Arguments only the stdlib encoder understands (cls, separators, ...)
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self.default, option=self._options(indent) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,72 @@
+# solarmatch-server/utils/kenya_counties.py
+"""
+Reference coordinates (county headquarters) for Kenya's 47 counties.
+Used to place installers who have not set an exact service location.
+"""
+
+COUNTY_CENTROIDS = {
+    "Mombasa": (-4.0435, 39.6682),
+    "Kwale": (-4.1816, 39.4606),
+    "Kilifi": (-3.5107, 39.9093),
+    "Tana River": (-1.5009, 40.0296),
+    "Lamu": (-2.2717, 40.9020),
+    "Taita Taveta": (-3.3961, 38.3580),
+    "Garissa": (-0.4536, 39.6401),
+    "Wajir": (1.7471, 40.0573),
+    "Mandera": (3.9366, 41.8670),
+    "Marsabit": (2.3284, 37.9899),
+    "Isiolo": (0.3546, 37.5822),
+    "Meru": (0.0463, 37.6559),
+    "Tharaka Nithi": (-0.3327, 37.6453),
+    "Embu": (-0.5310, 37.4506),
+    "Kitui": (-1.3667, 38.0106),
+    "Machakos": (-1.5177, 37.2634),
+    "Makueni": (-1.7833, 37.6333),
+    "Nyandarua": (-0.2667, 36.3833),
+    "Nyeri": (-0.4201, 36.9476),
+    "Kirinyaga": (-0.4986, 37.2803),
+    "Murang'a": (-0.7210, 37.1526),
+    "Kiambu": (-1.1714, 36.8356),
+    "Turkana": (3.1191, 35.5973),
+    "West Pokot": (1.2389, 35.1119),
+    "Samburu": (1.0968, 36.6982),
+    "Trans Nzoia": (1.0157, 35.0062),
+    "Uasin Gishu": (0.5143, 35.2698),
+    "Elgeyo Marakwet": (0.6703, 35.5081),
+    "Nandi": (0.2039, 35.1050),
+    "Baringo": (0.4919, 35.7430),
+    "Laikipia": (0.2725, 36.5381),
+    "Nakuru": (-0.3031, 36.0800),
+    "Narok": (-1.0875, 35.8711),
+    "Kajiado": (-1.8524, 36.7768),
+    "Kericho": (-0.3677, 35.2831),
+    "Bomet": (-0.7813, 35.3416),
+    "Kakamega": (0.2827, 34.7519),
+    "Vihiga": (0.0833, 34.7167),
+    "Bungoma": (0.5635, 34.5606),
+    "Busia": (0.4608, 34.1115),
+    "Siaya": (0.0607, 34.2881),
+    "Kisumu": (-0.0917, 34.7680),
+    "Homa Bay": (-0.5273, 34.4571),
+    "Migori": (-1.0634, 34.4731),
+    "Kisii": (-0.6817, 34.7667),
+    "Nyamira": (-0.5669, 34.9341),
+    "Nairobi": (-1.2864, 36.8172),
+}
+
+
+def _normalize(name):
+    name = name.strip().lower().replace("-", " ").replace("'", "")
+    if name.endswith(" county"):
+        name = name[:-len(" county")]
+    return " ".join(name.split())
+
+
+_BY_NORMALIZED_NAME = {_normalize(name): coords for name, coords in COUNTY_CENTROIDS.items()}
+
+
+def county_centroid(county):
+    """(lat, lon) for a county name as users type it ("Muranga", "nairobi county"), or None."""
+    if not county:
+        return None
+    return _BY_NORMALIZED_NAME.get(_normalize(county))
@@ -0,0 +1,133 @@
+# solarmatch-server/utils/metrics.py
+"""
+Prometheus metrics, served in text format at /metrics: request latency and
+in-flight requests per blueprint/route, Celery task duration and queue
+depth, and latency of calls to Gemini, Aerial View, Cloudinary and SMTP.
+
+Gunicorn workers are separate processes, so gunicorn.conf.py sets
+PROMETHEUS_MULTIPROC_DIR: every process writes its metrics to files there
+and /metrics adds them all up. Celery workers started with the same
+directory on the same host are included too. Without it (flask run,
+tests) /metrics serves this process's own registry.
+"""
+import hmac
+import os
+from contextlib import contextmanager
+from time import perf_counter
+from flask import Response, current_app, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Gauge, Histogram, generate_latest, multiprocess
+)
+from prometheus_client.core import GaugeMetricFamily
+
+HTTP_LATENCY = Histogram(
+    'solarmatch_http_request_duration_seconds', 'Time to handle a request',
+    ['blueprint', 'route', 'method', 'status']
+)
+# livesum: in multiprocess mode, the sum over the workers still running
+HTTP_IN_FLIGHT = Gauge(
+    'solarmatch_http_requests_in_flight', 'Requests being handled',
+    ['blueprint'], multiprocess_mode='livesum'
+)
+TASK_DURATION = Histogram(
+    'solarmatch_celery_task_duration_seconds', 'Time to run a Celery task',
+    ['task', 'outcome'], buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+)
+EXTERNAL_LATENCY = Histogram(
+    'solarmatch_external_call_duration_seconds', 'Time spent calling an outside service',
+    ['service', 'outcome'], buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+
+
+@contextmanager
+def _timed(histogram, **labels):
+    start = perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        histogram.labels(outcome=outcome, **labels).observe(perf_counter() - start)
+
+
+def external_call(service):
+    """Times a call to an outside service: `with external_call('gemini'): ...`. Exceptions count as outcome 'error'."""
+    return _timed(EXTERNAL_LATENCY, service=service)
+
+
+def task_timer(name):
+    """Times one Celery task run."""
+    return _timed(TASK_DURATION, task=name)
+
+
+class QueueDepthCollector:
+    """Tasks waiting in each Celery queue, read from the broker at scrape time."""
+
+    def __init__(self, queues):
+        self.queues = queues
+
+    def collect(self):
+        from celery_config import queue_depth
+
+        gauge = GaugeMetricFamily('solarmatch_celery_queue_depth', 'Tasks waiting in a Celery queue', labels=['queue'])
+        for queue in self.queues:
+            try:
+                gauge.add_metric([queue], queue_depth(queue))
+            except Exception as e:
+                print(f"Could not read the depth of Celery queue {queue}: {e}")
+        yield gauge
+
+
+def _process_registry():
+    if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics_view():
+    token = current_app.config.get('METRICS_TOKEN')
+    if not token:
+        # Open only in debug and tests: every scrape also opens a broker connection
+        if not (current_app.debug or current_app.testing):
+            return Response("Not Found\n", status=404, mimetype='text/plain')
+    elif not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return Response("Unauthorized\n", status=401, mimetype='text/plain')
+
+    broker = CollectorRegistry()
+    broker.register(QueueDepthCollector(current_app.config['METRICS_QUEUES']))
+    body = generate_latest(_process_registry()) + generate_latest(broker)
+    return Response(body, mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_app(app):
+    """Times every request of `app` and adds the /metrics endpoint."""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    @app.before_request
+    def _start_request_metrics():
+        g.metrics_blueprint = request.blueprint or 'app'
+        g.metrics_start = perf_counter()
+        HTTP_IN_FLIGHT.labels(g.metrics_blueprint).inc()
+
+    @app.after_request
+    def _observe_request(response):
+        start = g.get('metrics_start')
+        if start is not None:
+            # The rule, not the path, so ids in URLs don't become label values
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            HTTP_LATENCY.labels(g.metrics_blueprint, route, request.method, response.status_code).observe(perf_counter() - start)
+        return response
+
+    @app.teardown_request
+    def _end_request_metrics(exc):
+        g.pop('metrics_start', None)
+        blueprint = g.pop('metrics_blueprint', None)
+        if blueprint is not None:
+            HTTP_IN_FLIGHT.labels(blueprint).dec()
+
+    if not app.config.get('METRICS_TOKEN') and not (app.debug or app.testing):
+        app.logger.warning("METRICS_TOKEN is not set; /metrics answers 404 until it is.")
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -0,0 +1,94 @@
+# solarmatch-server/utils/pagination.py
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+from extensions import db
+
+MAX_PER_PAGE = 100
+
+
+def encode_cursor(created_at, row_id):
+    """
+    Opaque cursor pointing just after the (created_at, id) of the last row
+    served. `created_at` may also be a number, for listings sorted by a score.
+    """
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    payload = json.dumps([created_at, row_id])
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor, sort_type=datetime):
+    """
+    Reverse of encode_cursor. `sort_type` is what the listing sorts by
+    (datetime, or float for a score), so a cursor from another sort order
+    is rejected instead of compared against the wrong column. Raises
+    ValueError on anything malformed.
+    """
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if created_at is None:
+            pass
+        elif sort_type is datetime and isinstance(created_at, str):
+            created_at = datetime.fromisoformat(created_at)
+        elif sort_type is not float or isinstance(created_at, bool) or not isinstance(created_at, (int, float)):
+            raise ValueError("not from a page in this sort order")
+        return created_at, int(row_id)
+    except (TypeError, ValueError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def keyset_after(created_col, id_col, cursor, sort_type=datetime):
+    """
+    WHERE clause for the rows that come after `cursor` when ordering by
+    (created_col DESC, id_col DESC). Pair it with an index on (…, created_at, id).
+    """
+    created_at, row_id = decode_cursor(cursor, sort_type)
+    if created_at is None:
+        return id_col < row_id
+    return or_(
+        created_col < created_at,
+        and_(created_col == created_at, id_col < row_id)
+    )
+
+
+def fetch_page(query, per_page, created_col, id_col):
+    """
+    Runs `query` (already ordered newest first) for one page plus one
+    look-ahead row. Returns (rows, next_cursor).
+    """
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, created_col.key), getattr(last, id_col.key))
+    return rows, next_cursor
+
+
+def clamp_per_page(per_page, default=8):
+    if not per_page or per_page < 1:
+        return default
+    return min(per_page, MAX_PER_PAGE)
+
+
+def estimate_count(query):
+    """
+    Cheap row count for `query`. On Postgres this is the planner's estimate
+    (EXPLAIN, no table scan); other databases get an exact COUNT(*).
+    Returns (count, is_estimate).
+    """
+    bind = db.session.get_bind()
+    if bind.dialect.name != "postgresql":
+        return query.order_by(None).count(), False
+
+    compiled = query.order_by(None).statement.compile(dialect=bind.dialect)
+    plan = db.session.connection().exec_driver_sql(
+        "EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"]), True
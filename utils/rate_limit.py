@@ -0,0 +1,148 @@
+# solarmatch-server/utils/rate_limit.py
+"""
+Sliding-window rate limits for expensive and abusable endpoints.
+
+    @rate_limited('analysis_submit')
+    def submit_analysis(): ...
+
+RATE_LIMITS[name] lists (scope, requests, seconds) limits. Scope 'ip' is
+the client address; 'user' is the JWT identity, or what the `user`
+callable returns for routes without one (login: the submitted user_name);
+'user_ip' is that user from that address, for limits anyone could
+otherwise spend on someone else's account to lock them out.
+A request is let through only if every limit has room, and only then
+counted, so a client that keeps retrying can't lock itself out for good.
+Otherwise the view isn't called and the client gets 429 with Retry-After.
+
+Windows are sorted sets in Redis, checked and updated by one Lua script
+(a single round trip, atomic across workers). While Redis is unavailable
+each process keeps its own windows in memory, so limits hold per worker.
+"""
+import math
+import os
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+import redis
+from cachetools import LRUCache
+from flask import current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+from utils.redis_client import get_redis, report_redis_error
+
+# KEYS: one sorted set per limit. ARGV: requests and window (ms) of each limit, then a
+# unique member. Records the request in every window if all have room and returns 0,
+# otherwise returns the milliseconds until they do.
+SLIDING_WINDOW = """
+redis.replicate_commands()
+local time = redis.call('TIME')
+local now = time[1] * 1000 + math.floor(time[2] / 1000)
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local limit, window = tonumber(ARGV[2 * i - 1]), tonumber(ARGV[2 * i])
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    local count = redis.call('ZCARD', key)
+    if count >= limit then
+        -- Room opens when the oldest count - limit + 1 requests leave the window
+        local freed = redis.call('ZRANGE', key, count - limit, count - limit, 'WITHSCORES')
+        wait = math.max(wait, tonumber(freed[2]) + window - now)
+    end
+end
+if wait > 0 then
+    return wait
+end
+local member = now .. ':' .. ARGV[#ARGV]
+for i, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, member)
+    redis.call('PEXPIRE', key, ARGV[2 * i])
+end
+return 0
+"""
+
+_scripts = {}
+
+# Fallback windows: key -> deque of request times, for the most recently limited keys
+_local_lock = threading.Lock()
+_local_windows = LRUCache(maxsize=10000)
+
+
+def _redis_check(client, keys, limits):
+    script = _scripts.get(client)
+    if script is None:
+        script = _scripts[client] = client.register_script(SLIDING_WINDOW)
+    args = [value for requests, seconds in limits for value in (requests, int(seconds * 1000))]
+    return script(keys=keys, args=args + [os.urandom(6).hex()]) / 1000
+
+
+def _local_check(keys, limits):
+    now = time.monotonic()
+    wait = 0.0
+    with _local_lock:
+        windows = []
+        for key, (requests, seconds) in zip(keys, limits):
+            window = _local_windows.get(key)
+            if window is None:
+                window = _local_windows[key] = deque()
+            while window and window[0] <= now - seconds:
+                window.popleft()
+            if len(window) >= requests:
+                wait = max(wait, window[len(window) - requests] + seconds - now)
+            windows.append(window)
+        if wait <= 0:
+            for window in windows:
+                window.append(now)
+    return wait
+
+
+def check(keys, limits):
+    """
+    Counts a request against `limits` ((requests, seconds) for each of
+    `keys`) if all have room. Returns 0, or the seconds until they do.
+    """
+    client = get_redis()
+    if client is not None:
+        try:
+            return _redis_check(client, keys, limits)
+        except redis.RedisError as e:
+            report_redis_error(e)
+    return _local_check(keys, limits)
+
+
+def reset():
+    """Forgets the in-memory fallback windows (tests)."""
+    with _local_lock:
+        _local_windows.clear()
+
+
+def rate_limited(name, user=None):
+    """
+    Applies RATE_LIMITS[name] to a view. Put it under @jwt_required() so
+    'user' limits see the identity; `user` returns the user key otherwise.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            config = current_app.config
+            if not config['RATE_LIMIT_ENABLED']:
+                return view(*args, **kwargs)
+
+            keys, limits = [], []
+            for scope, requests, seconds in config['RATE_LIMITS'].get(name, ()):
+                ident = request.remote_addr if scope == 'ip' else (user() if user else get_jwt_identity())
+                if ident is None:
+                    continue
+                if scope == 'user_ip':
+                    ident = f"{request.remote_addr}:{ident}"
+                keys.append(f"ratelimit:{name}:{scope}:{str(ident)[:128]}:{seconds}")
+                limits.append((requests, seconds))
+
+            wait = check(keys, limits) if keys else 0
+            if wait > 0:
+                response = jsonify({"error": "Too many requests, please try again later"})
+                response.status_code = 429 # Not a (body, status) tuple: Flask-RESTful would re-serialize it
+                response.headers['Retry-After'] = str(math.ceil(wait))
+                return response
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
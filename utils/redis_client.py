@@ -0,0 +1,41 @@
+# solarmatch-server/utils/redis_client.py
+import os
+import time
+import redis
+from flask import current_app
+
+# How long to stop trying Redis after a connection error, in seconds
+RETRY_AFTER = 30
+
+_clients = {}
+_down_until = 0.0
+
+
+def get_redis():
+    """
+    Shared Redis client for caches/feeds, or None when Redis is not
+    configured or was unreachable recently. Callers must treat Redis as
+    optional: catch redis.RedisError, call report_redis_error() and fall
+    back to the database.
+    """
+    url = current_app.config.get('REDIS_URL') or os.environ.get('REDIS_URL')
+    if not url or time.monotonic() < _down_until:
+        return None
+
+    client = _clients.get(url)
+    if client is None:
+        client = redis.Redis.from_url(
+            url,
+            socket_timeout=0.25,
+            socket_connect_timeout=0.25,
+            health_check_interval=30
+        )
+        _clients[url] = client
+    return client
+
+
+def report_redis_error(error):
+    """Back off from Redis for RETRY_AFTER seconds after a failure."""
+    global _down_until
+    _down_until = time.monotonic() + RETRY_AFTER
+    current_app.logger.warning(f"Redis unavailable, falling back for {RETRY_AFTER}s: {error}")
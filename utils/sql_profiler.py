@@ -0,0 +1,142 @@
+# solarmatch-server/utils/sql_profiler.py
+"""
+Counts SQL statements and database time per request and per Celery task,
+from SQLAlchemy engine events.
+
+A request or task that runs more statements than its budget
+(SQL_REQUEST_STATEMENT_BUDGET / SQL_TASK_STATEMENT_BUDGET), or runs the
+same statement SQL_REPEAT_THRESHOLD times or more, usually a lazy load per
+row (N+1), is logged as a warning with the offending statements. With
+app.debug or SQL_PROFILE_HEADER the totals are also sent back in a
+Server-Timing header.
+
+Tests use collect() through the `max_statements` fixture to pin an
+endpoint's statement count.
+"""
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from flask import current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Every collector a statement counts towards: a test's collect() block and
+# the request it makes are both active at once
+_collectors = ContextVar('sql_collectors', default=())
+
+# Bind parameter lists, "IN (?, ?, ?)" or "IN (%(id_1)s, %(id_2)s)", so the
+# same query with a different number of ids is still one shape
+_PARAM = r"(?:\?|%s|%\(\w+\)s)"
+_PARAM_LIST = re.compile(rf"\(\s*{_PARAM}(?:\s*,\s*{_PARAM})*\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement):
+    return _SPACE.sub(' ', _PARAM_LIST.sub('(...)', statement)).strip()
+
+
+class StatementStats:
+    """Statements run inside one collect() block."""
+
+    def __init__(self, label=''):
+        self.label = label
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold):
+        """(shape, times) for statements run at least `threshold` times, most repeated first."""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+    def summary(self, limit=5):
+        lines = [f"{self.count} statements, {self.seconds * 1000:.1f} ms"]
+        lines += [f"  {n}x {shape[:200]}" for shape, n in self.shapes.most_common(limit)]
+        return "\n".join(lines)
+
+
+@contextmanager
+def collect(label=''):
+    """Counts the statements run inside the block, on any engine."""
+    stats = StatementStats(label)
+    token = _collectors.set(_collectors.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _collectors.reset(token)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if _collectors.get():
+        context._sql_profiler_start = perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    collectors = _collectors.get()
+    start = getattr(context, '_sql_profiler_start', None)
+    if not collectors or start is None:
+        return
+    elapsed = perf_counter() - start
+    for stats in collectors:
+        stats.record(statement, elapsed)
+
+
+def check(stats, budget):
+    """Warnings for a finished request or task: over budget, or repeated statements."""
+    warnings = []
+    if budget and stats.count > budget:
+        warnings.append(f"{stats.label}: {stats.count} SQL statements (budget {budget})\n{stats.summary()}")
+    for shape, n in stats.repeated(current_app.config['SQL_REPEAT_THRESHOLD']):
+        warnings.append(f"{stats.label}: same statement run {n}x, likely an N+1: {shape[:300]}")
+    for warning in warnings:
+        current_app.logger.warning(warning)
+    return warnings
+
+
+@contextmanager
+def profile_task(name):
+    """Wraps a Celery task run; checks it against SQL_TASK_STATEMENT_BUDGET."""
+    if not current_app.config.get('SQL_PROFILING', True):
+        yield None
+        return
+    with collect(f"task {name}") as stats:
+        yield stats
+    check(stats, current_app.config['SQL_TASK_STATEMENT_BUDGET'])
+
+
+def init_app(app):
+    """Profiles every request of `app`."""
+    if not app.config.get('SQL_PROFILING', True):
+        return
+
+    @app.before_request
+    def _start_sql_profile():
+        rule = request.url_rule.rule if request.url_rule else request.path
+        g.sql_stats = StatementStats(f"{request.method} {rule}")
+        g.sql_profile_token = _collectors.set(_collectors.get() + (g.sql_stats,))
+
+    @app.after_request
+    def _report_sql_profile(response):
+        stats = g.get('sql_stats')
+        if stats is None:
+            return response
+        check(stats, current_app.config['SQL_REQUEST_STATEMENT_BUDGET'])
+        if current_app.debug or current_app.config.get('SQL_PROFILE_HEADER'):
+            response.headers.add('Server-Timing', f'db;dur={stats.seconds * 1000:.1f};desc="{stats.count} statements"')
+        return response
+
+    @app.teardown_request
+    def _stop_sql_profile(exc):
+        token = g.pop('sql_profile_token', None)
+        g.pop('sql_stats', None)
+        if token is not None:
+            _collectors.reset(token)
+
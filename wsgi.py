@@ -1,9 +1,9 @@
 # wsgi.py
 
 import click
-from app import create_app
+from app import get_app
 
-app = create_app()
+app = get_app()
 
 @app.cli.command("create-admin")
 @click.argument("password")
@@ -16,6 +16,7 @@ def create_admin(password):
         from extensions import db, bcrypt  # <-- IMPORT BCRYPT
         from models.user import User 
         from utils.helpers import generate_username
+        from sevices import stats_service
 
         ADMIN_EMAIL = "solarmatchke@gmail.com"
         
@@ -43,8 +44,36 @@ def create_admin(password):
         
         try:
             db.session.add(new_admin)
+            stats_service.record_new_user(role)
             db.session.commit()
             print(f"Admin user {ADMIN_EMAIL} created with username {username}!")
         except Exception as e:
             db.session.rollback()
-            print(f"Error creating admin: {e}")
\ No newline at end of file
+            print(f"Error creating admin: {e}")
+
+
+@app.cli.command("rebuild-rollups")
+@click.option("--days", default=35, help="How many days of daily rows to recompute.")
+def rebuild_rollups(days):
+    """Recomputes the admin stats rollups and per-installer aggregates from the source tables."""
+    with app.app_context():
+        from sevices import stats_service, installer_stats_service
+
+        daily_rows, totals = stats_service.rebuild_rollups(days=days)
+        print(f"Rebuilt {daily_rows} daily rollup rows and {totals} totals.")
+        installers = installer_stats_service.rebuild_installer_stats()
+        print(f"Rebuilt stats for {installers} installers.")
+
+
+@app.cli.command("backfill-lead-scores")
+@click.option("--batch-size", default=1000, help="Results scored per query.")
+@click.option("--all", "rescore_all", is_flag=True, help="Rescore results that already have a score.")
+def backfill_lead_scores(batch_size, rescore_all):
+    """Scores completed analyses for installers' lead prioritisation."""
+    with app.app_context():
+        from sevices import lead_scoring
+        from utils.cache import invalidate_tags
+
+        scored = lead_scoring.backfill_scores(batch_size=batch_size, only_missing=not rescore_all)
+        invalidate_tags('installer-reports')
+        print(f"Scored {scored} analysis results.")